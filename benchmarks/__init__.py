@@ -0,0 +1,6 @@
+'''
+Benchmarks of the metadata generation, loading and querying on synthetic
+Markdown corpora of growing size.
+
+Run `python -m benchmarks --help` from the repository root for usage.
+'''
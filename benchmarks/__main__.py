@@ -0,0 +1,109 @@
+'''Command line interface of the benchmarks'''
+
+import json
+import sys
+
+from argparse import ArgumentParser
+
+from .compare import DEFAULT_THRESHOLD
+from .compare import compare_results
+from .compare import format_comparison
+from .compare import format_results
+from .corpus import CorpusConfig
+from .corpus import generate_corpus
+from .scenarios import run_benchmarks
+
+
+def _parse_scales(value: str) -> list:
+    return [float(scale) if '.' in scale else int(scale) for scale in value.split(',')]
+
+
+def _add_corpus_arguments(parser: ArgumentParser):
+    defaults = CorpusConfig()
+    parser.add_argument('--chapters', type=int, default=defaults.chapters,
+                        help='Number of chapters at scale 1.')
+    parser.add_argument('--sections', type=int, default=defaults.sections,
+                        help='Number of headings in each chapter.')
+    parser.add_argument('--max-depth', type=int, default=defaults.max_depth,
+                        help='Maximum heading level.')
+    parser.add_argument('--meta-density', type=float, default=defaults.meta_density,
+                        help='Probability of a meta tag in a section.')
+    parser.add_argument('--code-density', type=float, default=defaults.code_density,
+                        help='Probability of a large code block in a section.')
+    parser.add_argument('--seed', type=int, default=defaults.seed,
+                        help='Random seed of the corpus and the queries.')
+
+
+def _get_config(args) -> CorpusConfig:
+    return CorpusConfig(chapters=args.chapters,
+                        sections=args.sections,
+                        max_depth=args.max_depth,
+                        meta_density=args.meta_density,
+                        code_density=args.code_density,
+                        seed=args.seed)
+
+
+def run(args) -> int:
+    results = run_benchmarks(_get_config(args), args.scales, args.repeat,
+                             progress=lambda msg: print(msg, file=sys.stderr))
+    print(format_results(results))
+    if args.output:
+        with open(args.output, 'w', encoding='utf8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+def compare(args) -> int:
+    with open(args.baseline, encoding='utf8') as f:
+        baseline = json.load(f)
+    with open(args.current, encoding='utf8') as f:
+        current = json.load(f)
+    comparison = compare_results(baseline, current, args.threshold)
+    if not comparison:
+        print('No runs with matching scales to compare', file=sys.stderr)
+        return 2
+    print(format_comparison(comparison))
+    return 1 if any(item['regression'] for item in comparison) else 0
+
+
+def corpus(args) -> int:
+    chapters = generate_corpus(args.path, _get_config(args).scaled(args.scale))
+    print('\n'.join(chapters))
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = ArgumentParser(prog='python -m benchmarks', description=__doc__)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Run benchmarks on generated corpora.')
+    _add_corpus_arguments(run_parser)
+    run_parser.add_argument('--scales', type=_parse_scales, default=[1, 2, 4],
+                            help='Comma-separated corpus scales, default: 1,2,4.')
+    run_parser.add_argument('--repeat', type=int, default=3,
+                            help='Number of runs of each scenario, the best time is taken.')
+    run_parser.add_argument('--output', '-o', help='Save results to a JSON file.')
+    run_parser.set_defaults(func=run)
+
+    compare_parser = subparsers.add_parser(
+        'compare',
+        help='Compare two result files, exit with code 1 on regressions.'
+    )
+    compare_parser.add_argument('baseline', help='Baseline results JSON.')
+    compare_parser.add_argument('current', help='Current results JSON.')
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                                help='Relative slowdown counted as a regression, default: 0.2.')
+    compare_parser.set_defaults(func=compare)
+
+    corpus_parser = subparsers.add_parser('corpus', help='Only generate a corpus.')
+    _add_corpus_arguments(corpus_parser)
+    corpus_parser.add_argument('path', help='Directory for chapter files.')
+    corpus_parser.add_argument('--scale', type=float, default=1)
+    corpus_parser.set_defaults(func=corpus)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,98 @@
+'''Comparison of benchmark results'''
+
+from math import log
+
+DEFAULT_THRESHOLD = 0.2
+
+
+def get_scaling(runs: list, scenario: str) -> float or None:
+    '''
+    Estimate how the time of a scenario grows with the number of sections:
+    the exponent k in time ~ sections ** k, averaged over consecutive runs.
+    1 means linear growth, 2 — quadratic.
+
+    :param runs: list of runs from the results, sorted by scale.
+    :param scenario: scenario name.
+
+    :returns: the exponent or None if it can't be estimated.
+    '''
+    exponents = []
+    for first, second in zip(runs, runs[1:]):
+        t1 = first['timings'].get(scenario)
+        t2 = second['timings'].get(scenario)
+        n1, n2 = first['sections'], second['sections']
+        if not (t1 and t2) or n1 <= 0 or n2 <= n1:
+            continue
+        exponents.append(log(t2 / t1) / log(n2 / n1))
+    if not exponents:
+        return None
+    return sum(exponents) / len(exponents)
+
+
+def compare_results(baseline: dict, current: dict,
+                    threshold: float = DEFAULT_THRESHOLD) -> list:
+    '''
+    Compare timings of runs with the same scale.
+
+    :param baseline: results of the baseline benchmark run.
+    :param current: results of the current benchmark run.
+    :param threshold: relative slowdown which counts as a regression, 0.2
+                      means 20% slower.
+
+    :returns: list of dictionaries {'scale', 'scenario', 'baseline',
+              'current', 'ratio', 'regression'}, one for each scenario
+              present in both results.
+    '''
+    baseline_runs = {run['scale']: run for run in baseline['runs']}
+    result = []
+    for run in current['runs']:
+        baseline_run = baseline_runs.get(run['scale'])
+        if baseline_run is None:
+            continue
+        for scenario, current_time in run['timings'].items():
+            baseline_time = baseline_run['timings'].get(scenario)
+            if baseline_time is None:
+                continue
+            ratio = current_time / baseline_time if baseline_time else float('inf')
+            result.append({'scale': run['scale'],
+                           'scenario': scenario,
+                           'baseline': baseline_time,
+                           'current': current_time,
+                           'ratio': ratio,
+                           'regression': ratio > 1 + threshold})
+    return result
+
+
+def format_results(results: dict) -> str:
+    '''
+    :returns: a table of the timings of each run and the scaling exponents.
+    '''
+    runs = sorted(results['runs'], key=lambda run: run['scale'])
+    scenarios = list(runs[0]['timings']) if runs else []
+    header = ['scenario'] + [f'x{run["scale"]} ({run["sections"]} s.)' for run in runs] + ['scaling']
+    rows = [header]
+    for scenario in scenarios:
+        scaling = get_scaling(runs, scenario)
+        rows.append([scenario]
+                    + [f'{run["timings"].get(scenario, 0):.4f}' for run in runs]
+                    + ['-' if scaling is None else f'{scaling:.2f}'])
+    return _format_table(rows)
+
+
+def format_comparison(comparison: list) -> str:
+    ''':returns: a table of the comparison results.'''
+    rows = [['scale', 'scenario', 'baseline', 'current', 'ratio', '']]
+    for item in comparison:
+        rows.append([f'x{item["scale"]}',
+                     item['scenario'],
+                     f'{item["baseline"]:.4f}',
+                     f'{item["current"]:.4f}',
+                     f'{item["ratio"]:.2f}',
+                     'REGRESSION' if item['regression'] else ''])
+    return _format_table(rows)
+
+
+def _format_table(rows: list) -> str:
+    widths = [max(len(row[ind]) for row in rows) for ind in range(len(rows[0]))]
+    return '\n'.join('  '.join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip()
+                     for row in rows)
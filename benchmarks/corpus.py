@@ -0,0 +1,132 @@
+'''Generator of synthetic Markdown corpora for benchmarks'''
+
+import random
+
+from pathlib import Path
+from pathlib import PosixPath
+
+WORDS = ['api', 'request', 'response', 'parameters', 'example', 'overview',
+         'configuration', 'errors', 'usage', 'method', 'endpoint', 'field',
+         'value', 'limits', 'authentication', 'result', 'notes', 'release']
+
+# titles repeated across the corpus, as in real documentation
+COMMON_TITLES = ['Parameters', 'Example', 'Response', 'Errors', 'Notes']
+
+CODE_LINES = ['def handler(request):',
+              '    # process the request',
+              '    result = {"status": "ok", "items": []}',
+              '    for item in request.items:',
+              '        result["items"].append(item)',
+              '    return result',
+              '']
+
+
+class CorpusConfig:
+    '''
+    Parameters of a synthetic corpus. All counts are per chapter, except for
+    `chapters`.
+    '''
+
+    def __init__(self,
+                 chapters: int = 20,
+                 sections: int = 30,
+                 max_depth: int = 4,
+                 meta_density: float = 0.3,
+                 yfm_density: float = 0.5,
+                 code_density: float = 0.1,
+                 code_lines: int = 200,
+                 paragraphs: int = 3,
+                 seed: int = 0):
+        '''
+        :param chapters: number of chapter files.
+        :param sections: number of headings in each chapter.
+        :param max_depth: maximum heading level, 1 to 6.
+        :param meta_density: probability of a meta tag in a section.
+        :param yfm_density: probability of YAML Front Matter in a chapter.
+        :param code_density: probability of a large code block in a section.
+        :param code_lines: number of lines in each large code block.
+        :param paragraphs: number of text paragraphs in each section.
+        :param seed: random seed, the same seed gives the same corpus.
+        '''
+        self.chapters = chapters
+        self.sections = sections
+        self.max_depth = max_depth
+        self.meta_density = meta_density
+        self.yfm_density = yfm_density
+        self.code_density = code_density
+        self.code_lines = code_lines
+        self.paragraphs = paragraphs
+        self.seed = seed
+
+    def scaled(self, scale: float) -> 'CorpusConfig':
+        '''Get the same config with the number of chapters multiplied by scale.'''
+        result = CorpusConfig(**self.to_dict())
+        result.chapters = max(1, round(self.chapters * scale))
+        return result
+
+    def to_dict(self) -> dict:
+        return dict(vars(self))
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}: {self.chapters} chapters>'
+
+
+def generate_chapter(rnd: random.Random, config: CorpusConfig, ind: int) -> str:
+    '''
+    Generate the source of one chapter.
+
+    :param rnd: random generator.
+    :param config: corpus config.
+    :param ind: index of the chapter, used in its title.
+
+    :returns: chapter source.
+    '''
+    lines = []
+    if rnd.random() < config.yfm_density:
+        tags = ', '.join(rnd.sample(WORDS, 2))
+        lines += ['---', f'title: Chapter {ind}', f'tags: [{tags}]', f'weight: {ind}', '---', '']
+    lines += [f'# Chapter {ind}', '']
+
+    level = 1
+    for section_ind in range(config.sections):
+        level = rnd.randint(2, min(level + 1, config.max_depth)) if config.max_depth > 1 else 1
+        if rnd.random() < 0.3:
+            title = rnd.choice(COMMON_TITLES)
+        else:
+            title = ' '.join(rnd.sample(WORDS, rnd.randint(1, 4))).capitalize()
+        lines += [f'{"#" * level} {title}', '']
+        if rnd.random() < config.meta_density:
+            options = [f'type="{rnd.choice(["api", "guide", "reference"])}"',
+                       f'weight="{rnd.randint(1, 100)}"']
+            if rnd.random() < 0.2:
+                options.append(f'id="section-{ind}-{section_ind}"')
+            lines += [f'<meta {" ".join(options)}></meta>', '']
+        for _ in range(config.paragraphs):
+            words = [rnd.choice(WORDS) for _ in range(rnd.randint(20, 60))]
+            lines += [' '.join(words).capitalize() + '.', '']
+        if rnd.random() < config.code_density:
+            code = [CODE_LINES[i % len(CODE_LINES)] for i in range(config.code_lines)]
+            lines += ['```python', *code, '```', '']
+    return '\n'.join(lines)
+
+
+def generate_corpus(path_: str or PosixPath, config: CorpusConfig) -> list:
+    '''
+    Write chapter files of a corpus into a directory.
+
+    :param path_: directory for chapter files, created if it doesn't exist.
+    :param config: corpus config.
+
+    :returns: list of chapter names (relative to the directory), the same as
+              the chapters list in foliant.yml.
+    '''
+    path_ = Path(path_)
+    path_.mkdir(parents=True, exist_ok=True)
+    rnd = random.Random(config.seed)
+    chapters = []
+    for ind in range(config.chapters):
+        name = f'chapter_{ind:04}.md'
+        with open(path_ / name, 'w', encoding='utf8') as f:
+            f.write(generate_chapter(rnd, config, ind))
+        chapters.append(name)
+    return chapters
@@ -0,0 +1,146 @@
+'''Timed benchmark scenarios'''
+
+import os
+import platform
+import random
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from foliant.meta.classes import Meta
+from foliant.meta.generate import load_meta
+from foliant.meta.sources import source_cache
+from foliant.meta.tools import YAML_BACKEND
+from foliant.meta.tools import dump_yaml
+
+from .corpus import CorpusConfig
+from .corpus import generate_corpus
+
+RESULTS_VERSION = 1
+
+SCENARIOS = ['generate', 'dump', 'reload', 'reload_cached', 'get_by_id',
+             'get_section_by_offset', 'get_source']
+
+OFFSET_QUERIES = 10000
+
+
+def best_time(func, repeat: int) -> float:
+    '''
+    :returns: the best time of `repeat` runs of the function, in seconds.
+    '''
+    result = None
+    for _ in range(repeat):
+        start = perf_counter()
+        func()
+        elapsed = perf_counter() - start
+        result = elapsed if result is None else min(result, elapsed)
+    return result
+
+
+def run_scenarios(corpus_dir: Path, chapters: list, repeat: int, seed: int) -> (dict, int):
+    '''
+    Run all scenarios on a generated corpus.
+
+    :param corpus_dir: directory with chapter files.
+    :param chapters: list of chapter names.
+    :param repeat: number of runs of each scenario, the best time is taken.
+    :param seed: random seed for the queries.
+
+    :returns: tuple (dictionary {scenario: best time in seconds}, number of
+              sections in the corpus).
+    '''
+    timings = {}
+    meta = None
+
+    def generate():
+        nonlocal meta
+        meta = load_meta(chapters, corpus_dir)
+
+    timings['generate'] = best_time(generate, repeat)
+
+    meta_filename = corpus_dir / 'meta.yml'
+    source = None
+
+    def dump():
+        nonlocal source
+        source = dump_yaml(meta.dump(), default_flow_style=False,
+                           allow_unicode=True, sort_keys=False)
+
+    timings['dump'] = best_time(dump, repeat)
+    with open(meta_filename, 'w', encoding='utf8') as f:
+        f.write(source)
+
+    def reload(use_cache: bool):
+        Meta().load_meta_from_file(meta_filename, use_cache=use_cache)
+
+    timings['reload'] = best_time(lambda: reload(False), repeat)
+    reload(True)  # fill the cache
+    timings['reload_cached'] = best_time(lambda: reload(True), repeat)
+
+    rnd = random.Random(seed)
+    ids = [section.id for section in meta.iter_sections()]
+    rnd.shuffle(ids)
+
+    def get_by_id():
+        for id_ in ids:
+            meta.get_by_id(id_)
+
+    timings['get_by_id'] = best_time(get_by_id, repeat)
+
+    queries = []
+    for _ in range(OFFSET_QUERIES):
+        chapter = meta.chapters[rnd.randrange(len(meta.chapters))]
+        queries.append((chapter, rnd.randint(0, chapter.main_section.end)))
+
+    def get_section_by_offset():
+        for chapter, offset in queries:
+            chapter.get_section_by_offset(offset)
+
+    timings['get_section_by_offset'] = best_time(get_section_by_offset, repeat)
+
+    def get_source():
+        source_cache.clear()
+        for section in meta.iter_sections():
+            section.get_source()
+
+    timings['get_source'] = best_time(get_source, repeat)
+    return timings, len(ids)
+
+
+def run_benchmarks(config: CorpusConfig,
+                   scales: list,
+                   repeat: int = 3,
+                   progress=None) -> dict:
+    '''
+    Generate a corpus for each scale and run all scenarios on it.
+
+    :param config: corpus config for scale 1.
+    :param scales: list of corpus scales, multiplying the number of chapters.
+    :param repeat: number of runs of each scenario, the best time is taken.
+    :param progress: function called with a message before each corpus is
+                     processed.
+
+    :returns: results dictionary, ready to be saved as JSON.
+    '''
+    runs = []
+    for scale in scales:
+        scaled_config = config.scaled(scale)
+        if progress:
+            progress(f'Scale {scale}: {scaled_config.chapters} chapters')
+        with TemporaryDirectory() as tmp_dir:
+            corpus_dir = Path(tmp_dir)
+            chapters = generate_corpus(corpus_dir, scaled_config)
+            timings, sections = run_scenarios(corpus_dir, chapters, repeat, config.seed)
+            size = sum(os.path.getsize(corpus_dir / name) for name in chapters)
+        runs.append({'scale': scale,
+                     'chapters': len(chapters),
+                     'sections': sections,
+                     'bytes': size,
+                     'timings': timings})
+    return {'version': RESULTS_VERSION,
+            'python': platform.python_version(),
+            'yaml_backend': YAML_BACKEND,
+            'config': config.to_dict(),
+            'repeat': repeat,
+            'runs': runs}
@@ -8,6 +8,7 @@ from pkgutil import iter_modules
 from cliar import set_arg_map
 from cliar import set_help
 from cliar import set_metavars
+from cliar import set_sharg_map
 
 from foliant.cli.base import BaseCli
 from foliant.config import Parser
@@ -52,14 +53,26 @@ class Cli(BaseCli):
         return True
 
     @set_arg_map({'project_path': 'path', 'config_file_name': 'config', 'meta_command': 'cmd'})
-    @set_metavars({'meta_command': 'COMMAND', 'config_file_name': 'PATH'})
+    @set_metavars({'meta_command': 'COMMAND', 'config_file_name': 'PATH', 'profile_dump': 'PATH'})
+    @set_sharg_map({'profile': None, 'profile_dump': None})
     @set_help(
         {
             'meta_command': 'Meta command to run',
             'project_path': 'Path to the directory with the config file (default: ".").',
             'config_file_name': 'Name of the Foliant config file (default: "foliant.yml").',
             'quiet': 'Hide all output accept for the result. Useful for piping.',
-            'debug': 'Log all events during build. If not set, only warnings and errors are logged.'
+            'debug': 'Log all events during build. If not set, only warnings and errors are logged.',
+            'jobs': 'Number of parallel workers for parsing chapters, 0 — one per CPU ' +
+                    '(default: taken from config, or 1).',
+            'watch': 'Keep running and regenerate metadata when chapter files change ' +
+                     '(supported by the generate command).',
+            'old': 'Path to the previous meta file (required by the diff command).',
+            'new': 'Path to the new meta file (supported by the diff command, ' +
+                   'default: the meta file from config).',
+            'profile': 'Print timings of generation phases and the slowest chapters ' +
+                       '(supported by the generate command).',
+            'profile_dump': 'Profile function calls and save statistics in the pstats ' +
+                            'format to this file (supported by the generate command).'
         }
     )
     def meta(self,
@@ -68,6 +81,12 @@ class Cli(BaseCli):
              project_path=Path('.'),
              debug=False,
              quiet=False,
+             jobs=-1,
+             watch=False,
+             old='',
+             new='',
+             profile=False,
+             profile_dump='',
              ):
         '''Run meta command'''
         self.logger.setLevel(DEBUG if debug else WARNING)
@@ -79,9 +98,23 @@ class Cli(BaseCli):
         except MetaCommandError as exception:
             self.logger.critical(str(exception))
             exit(str(exception))
+        cli_options = {}
+        if jobs >= 0:
+            cli_options['jobs'] = jobs
+        if watch:
+            cli_options['watch'] = True
+        if old:
+            cli_options['old'] = old
+        if new:
+            cli_options['new'] = new
+        if profile:
+            cli_options['profile'] = True
+        if profile_dump:
+            cli_options['profile_dump'] = profile_dump
         context = {
             'project_path': Path(project_path),
             'config': config,
+            'cli_options': cli_options,
         }
         meta_command_module = import_module(f'foliant.meta_commands.{meta_command}')
         self.logger.debug(f'Imported meta command {meta_command_module}.')
@@ -0,0 +1,293 @@
+'''Module defining persistent on-disk caches of parsed chapters and loaded meta files'''
+
+import io
+import os
+import pickle
+
+from hashlib import sha256
+from logging import getLogger
+from pathlib import Path
+from pathlib import PosixPath
+from tempfile import NamedTemporaryFile
+
+from .classes import Section
+
+logger = getLogger('flt.meta')
+
+DEFAULT_SIZE_LIMIT = 100 * 1024 * 1024  # 100 MB
+
+# errors of writing a cache file: file system errors and objects which can't
+# be pickled
+WRITE_ERRORS = (OSError, pickle.PicklingError, TypeError, AttributeError, RecursionError)
+
+
+def write_atomically(filename: str or PosixPath, *objects):
+    '''
+    Pickle objects into a file: first into a temporary file in the same
+    directory, which then replaces the target one. The temporary file is
+    removed if anything fails.
+
+    :param filename: path to the target file.
+    :param objects: objects to be pickled one after another.
+    '''
+    filename = Path(filename)
+    with NamedTemporaryFile('wb', dir=filename.parent, suffix='.tmp', delete=False) as f:
+        temp_name = f.name
+        try:
+            for obj in objects:
+                pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except BaseException:
+            f.close()
+            os.unlink(temp_name)
+            raise
+    try:
+        os.replace(temp_name, filename)
+    except BaseException:
+        os.unlink(temp_name)
+        raise
+
+
+class ChapterCache:
+    '''
+    On-disk cache of chapter main sections (with all their subsections),
+    keyed by the hash of the chapter source and the parser version.
+
+    Each entry is stored in a separate file inside cache_dir, so the cache may
+    be shared between processes. Entry files are touched on each hit, and
+    `prune` removes least recently used entries when the size limit is
+    exceeded. If an entry can't be written, a warning is logged and the cache
+    is only read from then on.
+
+    Entries are pickled, and unpickling may run arbitrary code, so cache_dir
+    must only be writable by trusted users.
+    '''
+
+    suffix = '.pickle'
+
+    def __init__(self,
+                 cache_dir: str or PosixPath,
+                 parser_version: str,
+                 size_limit: int = DEFAULT_SIZE_LIMIT):
+        self.cache_dir = Path(cache_dir)
+        self.parser_version = parser_version
+        self.size_limit = size_limit
+        self.hits = 0
+        self.misses = 0
+        self.writable = True
+
+    def get_key(self, content: str, options: str = '') -> str:
+        '''
+        :param content: chapter source.
+        :param options: string representation of the parser options which
+                        affect the result.
+
+        :returns: cache key for the chapter source.
+        '''
+        hash_ = sha256(self.parser_version.encode('utf8'))
+        hash_.update(b'\0')
+        hash_.update(options.encode('utf8'))
+        hash_.update(b'\0')
+        hash_.update(content.encode('utf8'))
+        return hash_.hexdigest()
+
+    def get_file_key(self,
+                     filename: str or PosixPath,
+                     options: str = '',
+                     block_size: int = 1024 * 1024) -> str:
+        '''
+        Same as get_key, but the chapter source is hashed directly from the
+        file, block by block, without loading it into memory.
+
+        :param filename: path to the chapter file.
+        :param options: string representation of the parser options which
+                        affect the result.
+        :param block_size: size of the blocks read, in bytes.
+
+        :returns: cache key for the chapter source.
+        '''
+        hash_ = sha256(self.parser_version.encode('utf8'))
+        hash_.update(b'\0')
+        hash_.update(options.encode('utf8'))
+        hash_.update(b'\0')
+        with open(filename, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                hash_.update(block)
+        return hash_.hexdigest()
+
+    def get(self, key: str) -> Section or None:
+        '''
+        Load the main section from cache.
+
+        :param key: cache key, returned by get_key.
+
+        :returns: the main Section object or None if it is not cached or the
+                  cache entry is unreadable.
+        '''
+        entry_path = self._get_entry_path(key)
+        try:
+            with open(entry_path, 'rb') as f:
+                section = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.debug(f'Corrupt cache entry {entry_path}, ignoring: {e}')
+            return None
+        if not isinstance(section, Section):
+            return None
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return section
+
+    def set(self, key: str, section: Section):
+        '''
+        Save the main section into cache. The entry is written atomically.
+        Write errors are logged, after them the cache is no longer written.
+
+        :param key: cache key, returned by get_key.
+        :param section: the main Section object of the chapter.
+        '''
+        if not self.writable:
+            return
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            write_atomically(self._get_entry_path(key), section)
+        except WRITE_ERRORS as e:
+            self.writable = False
+            logger.warning(f'Failed to write chapter cache {self.cache_dir}, '
+                           f'continuing without caching: {e}')
+
+    def register(self, hit: bool):
+        '''Count a cache hit or miss.'''
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def prune(self) -> int:
+        '''
+        Remove least recently used entries until the total cache size fits
+        into size_limit.
+
+        :returns: number of removed entries.
+        '''
+        if not self.cache_dir.is_dir():
+            return 0
+        entries = []
+        total_size = 0
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.endswith(self.suffix):
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total_size += stat.st_size
+
+        removed = 0
+        for _, size, path_ in sorted(entries):
+            if total_size <= self.size_limit:
+                break
+            try:
+                os.remove(path_)
+            except OSError:
+                continue
+            total_size -= size
+            removed += 1
+        if removed:
+            logger.debug(f'Removed {removed} entries from cache {self.cache_dir}')
+        return removed
+
+    def _get_entry_path(self, key: str) -> PosixPath:
+        return self.cache_dir / (key + self.suffix)
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}: {self.cache_dir}>'
+
+
+class MetaFileCache:
+    '''
+    Binary sidecar cache of a loaded meta file, stored next to it. Holds the
+    Chapter objects with all their sections, so they can be restored without
+    parsing and validating YAML.
+
+    The cache entry is valid while the meta file's mtime, size and hash are
+    the same as they were when the file was loaded.
+
+    The cache is pickled, and unpickling may run arbitrary code, so it must
+    only be used in directories writable by trusted users.
+    '''
+
+    # Must be increased whenever the pickled classes change
+    format_version = '7'
+
+    def __init__(self, meta_filename: str or PosixPath):
+        self.meta_filename = Path(meta_filename)
+        self.cache_filename = self.meta_filename.with_name(f'.{self.meta_filename.name}.cache')
+
+    def read_meta_file(self) -> (str, dict):
+        '''
+        Read the meta file the same way as open(filename).read() does.
+
+        :returns: a tuple (meta file source, file state to save the cache with).
+        '''
+        stat = os.stat(self.meta_filename)
+        with open(self.meta_filename, 'rb') as f:
+            raw_source = f.read()
+        state = self._get_state(stat, raw_source)
+        with io.TextIOWrapper(io.BytesIO(raw_source)) as f:
+            source = f.read()
+        return source, state
+
+    def load(self) -> list or None:
+        '''
+        Load chapters from the cache.
+
+        :returns: list of Chapter objects or None if the cache is missing,
+                  outdated or unreadable.
+        '''
+        try:
+            with open(self.cache_filename, 'rb') as f:
+                state = pickle.load(f)
+                stat = os.stat(self.meta_filename)
+                if (state.get('format_version') != self.format_version
+                        or state.get('mtime') != stat.st_mtime_ns
+                        or state.get('size') != stat.st_size):
+                    logger.debug(f'Meta file cache {self.cache_filename} is outdated')
+                    return None
+                with open(self.meta_filename, 'rb') as meta_file:
+                    raw_source = meta_file.read()
+                if state != self._get_state(stat, raw_source):
+                    logger.debug(f'Meta file cache {self.cache_filename} is outdated')
+                    return None
+                chapters = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.debug(f'Corrupt meta file cache {self.cache_filename}, ignoring: {e}')
+            return None
+        if not isinstance(chapters, list):
+            return None
+        logger.debug(f'Loaded meta from cache {self.cache_filename}')
+        return chapters
+
+    def save(self, state: dict, chapters: list):
+        '''
+        Save chapters into the cache. The cache file is written atomically.
+        Errors are ignored, the cache is optional.
+
+        :param state: meta file state, returned by read_meta_file.
+        :param chapters: list of Chapter objects loaded from the meta file.
+        '''
+        try:
+            write_atomically(self.cache_filename, state, chapters)
+        except Exception as e:
+            logger.debug(f'Failed to save meta file cache {self.cache_filename}: {e}')
+
+    def _get_state(self, stat: os.stat_result, raw_source: bytes) -> dict:
+        return {'format_version': self.format_version,
+                'mtime': stat.st_mtime_ns,
+                'size': stat.st_size,
+                'hash': sha256(raw_source).hexdigest()}
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}: {self.cache_filename}>'
@@ -2,16 +2,31 @@
 
 from __future__ import annotations
 
-import yaml
+import os
 
+from bisect import insort
+from logging import getLogger
 from pathlib import Path
 from pathlib import PosixPath
 from schema import Optional
 from schema import Schema
-
-from .tools import convert_to_id
+from schema import SchemaError
+from weakref import WeakSet
+
+from .data_index import EXISTS
+from .data_index import DataIndex
+from .data_index import matches
+from .intervals import SectionIntervalIndex
+from .lazy import index_meta_file
+from .lazy import read_chapter_source
+from .sources import source_cache
+from .tools import YAML_BACKEND
+from .tools import IdGenerator
+from .tools import load_yaml
 from .tools import remove_meta
+from .tools import translate_newlines
 
+logger = getLogger('flt.meta')
 
 SECTION_SCHEMA = Schema(
     {
@@ -20,6 +35,8 @@ SECTION_SCHEMA = Schema(
         'end': int,
         'level': int,
         'id': str,
+        Optional('start_byte'): int,
+        Optional('end_byte'): int,
         Optional('children', default=[]): [dict],
         Optional('data', default={}): dict
     }
@@ -38,6 +55,30 @@ META_SCHEMA = Schema(
     }
 )
 
+# Field types of the meta file, checked by _check_fields. Same constraints as
+# in META_SCHEMA and SECTION_SCHEMA.
+META_FIELDS = ({'version': str, 'chapters': list}, {})
+
+CHAPTER_FIELDS = ({'name': str, 'section': dict, 'filename': str}, {})
+
+SECTION_FIELDS = (
+    {'title': str, 'start': int, 'end': int, 'level': int, 'id': str},
+    {'start_byte': int, 'end_byte': int, 'children': list, 'data': dict}
+)
+
+
+def _schema_accepts_bool_as_int() -> bool:
+    try:
+        Schema(int).validate(True)
+    except SchemaError:
+        return False
+    return True
+
+
+# whether bool values pass for int fields: older versions of schema accept
+# them, newer ones don't, and _check_fields does the same as the installed one
+BOOL_IS_INT = _schema_accepts_bool_as_int()
+
 
 class MetaHierarchyError(Exception):
     pass
@@ -59,52 +100,281 @@ class MetaChapterDoesNotExistError(Exception):
     pass
 
 
+class MetaSectionNoByteOffsetsError(Exception):
+    pass
+
+
+class MetaSchemaError(SchemaError):
+    pass
+
+
+def _check_fields(value, fields: tuple, get_location):
+    '''
+    Check that value is a dictionary with the required and optional fields of
+    the correct types, the same way as Schema does.
+
+    :param value: value to check.
+    :param fields: tuple (dictionary {key: type} of required fields,
+                   dictionary {key: type} of optional fields).
+    :param get_location: function returning the description of the checked
+                         part of the meta file for the error message.
+    '''
+    required, optional = fields
+    if type(value) is not dict:
+        raise MetaSchemaError(f'{get_location()}: {value!r} should be instance of \'dict\'')
+    for key in required:
+        if key not in value:
+            raise MetaSchemaError(f'{get_location()}: Missing key: {key!r}')
+    for key, field_value in value.items():
+        type_ = required.get(key) or optional.get(key)
+        if type_ is None:
+            raise MetaSchemaError(f'{get_location()}: Wrong key {key!r}')
+        if not isinstance(field_value, type_) or \
+                (type_ is int and not BOOL_IS_INT and isinstance(field_value, bool)):
+            raise MetaSchemaError(f'{get_location()}: Key {key!r} error:\n'
+                                  f'{field_value!r} should be instance of {type_.__name__!r}')
+
+
+def _add_position(index: dict, key, ind: int):
+    insort(index.setdefault(key, []), ind)
+
+
+def _remove_position(index: dict, key, ind: int):
+    positions = index[key]
+    positions.remove(ind)
+    if not positions:
+        del index[key]
+
+
 class Meta:
     syntax_version = '1.0'
 
     def __init__(self):
-        self.chapters = []
+        self._chapters = []
         self.filename = None
+        self._chapter_index = None  # list of ChapterIndexEntry in lazy mode
+        self._trusted = False
+        self._id_index = None
+        self._id_index_version = None
+        self._data_index = None
+        self._data_index_version = None
+        self._path_index = None  # {resolved path: sorted chapter positions}
+        self._chapter_paths = None  # (resolved path, filename) of each chapter
+        self._path_index_cwd = None
+        self._name_index = None  # {name: sorted chapter positions}
+        self._chapter_names = None  # name of each chapter
+        self._lazy_loaded = 0
+        # counter of changes in section trees of the chapters, increased by
+        # the chapters; indexes are rebuilt when it changes
+        self._version = 0
 
-    def load_meta_from_file(self, filename: str or PosixPath):
+    @property
+    def chapters(self) -> list:
+        '''list of Chapter objects. In lazy mode all chapters are loaded.'''
+        if self._chapter_index is not None:
+            for ind in range(len(self._chapter_index)):
+                self._get_lazy_chapter(ind)
+            self._chapter_index = None
+        return self._chapters
+
+    @chapters.setter
+    def chapters(self, value: list):
+        self._chapter_index = None
+        self._chapters = value
+        self._path_index = self._name_index = None
+        self._register_chapters()
+        self._changed()
+
+    def _changed(self):
+        '''Called by the chapters when their section trees change.'''
+        self._version += 1
+
+    def _register_chapters(self):
+        '''Subscribe to changes in section trees of all loaded chapters.'''
+        for chapter in self._chapters:
+            if chapter is not None:
+                chapter._metas.add(self)
+
+    def load_meta_from_file(self,
+                            filename: str or PosixPath,
+                            use_cache: bool = False,
+                            trusted: bool = False,
+                            lazy: bool = False):
         '''
         Load metadata from yaml-file into the Chapter and Section objects and
         save them into the attributes of this Meta object instance.
 
         :param filename: the name of the yaml-file with metadata.
+        :param use_cache: if True, the loaded objects are saved into a binary
+                          sidecar cache next to the yaml-file, and restored
+                          from it on the next load if the file didn't change.
+                          The directory of the yaml-file must be writable, and
+                          only by trusted users: the cache is unpickled, which
+                          may run arbitrary code.
+        :param trusted: if True, the file is not validated. Use only for the
+                        files generated by the meta generate command.
+        :param lazy: if True, only the index of chapters is loaded, and each
+                     chapter is loaded when it is first accessed. Section ids
+                     are taken from the file as is. The cache is not used.
         '''
-        def load_section(section_dict: dict) -> Section:
+        self.filename = Path(filename)
+
+        if lazy and self._load_index(trusted):
+            return
+
+        cache = None
+        if use_cache:
+            # imported here because the cache module depends on this one
+            from .cache import MetaFileCache
+            cache = MetaFileCache(filename)
+            chapters = cache.load()
+            if chapters is not None:
+                self.chapters = chapters
+                return
+            source, state = cache.read_meta_file()
+        else:
+            with open(filename) as f:
+                source = f.read()
+
+        logger.debug(f'Loading meta from {filename}, YAML backend: {YAML_BACKEND}')
+        data = load_yaml(source)
+        if not trusted:
+            _check_fields(data, META_FIELDS, lambda: f'Meta file {filename}')
+
+        for ind, chapter_dict in enumerate(data['chapters']):
+            self.chapters.append(self._create_chapter(chapter_dict, ind, trusted))
+        self._register_chapters()
+
+        self.process_ids()
+        if cache is not None and not trusted:
+            # only validated files are cached
+            cache.save(state, self.chapters)
+
+    def _load_index(self, trusted: bool) -> bool:
+        '''
+        Index chapters of the meta file for lazy loading.
+
+        :returns: False if the file layout is not recognized and the file
+                  must be loaded as a whole.
+        '''
+        logger.debug(f'Indexing meta file {self.filename}')
+        index = index_meta_file(self.filename)
+        if index is None:
+            logger.debug('Meta file layout is not recognized, loading all chapters')
+            return False
+        rest_source, entries = index
+        data = load_yaml(rest_source)
+        if not entries or type(data) is not dict or data.get('chapters') is not None:
+            logger.debug('Meta file layout is not recognized, loading all chapters')
+            return False
+        if not trusted:
+            _check_fields({**data, 'chapters': []}, META_FIELDS,
+                          lambda: f'Meta file {self.filename}')
+        self._chapters = [None] * len(entries)
+        self._chapter_index = entries
+        self._trusted = trusted
+        return True
+
+    def _get_lazy_chapter(self, ind: int) -> Chapter:
+        '''Get chapter by index, loading it from the meta file if needed'''
+        chapter = self._chapters[ind]
+        if chapter is None:
+            entry = self._chapter_index[ind]
+            logger.debug('Loading chapter %s from %s', entry.name, self.filename)
+            chapter_list = load_yaml(read_chapter_source(self.filename, entry))
+            if type(chapter_list) is not list or len(chapter_list) != 1:
+                raise MetaSchemaError(f'Chapter #{ind}: unexpected layout of the meta file')
+            chapter = self._create_chapter(chapter_list[0], ind, self._trusted, stored_ids=True)
+            chapter._metas.add(self)
+            self._chapters[ind] = chapter
+            self._lazy_loaded += 1
+            if self._lazy_loaded == len(self._chapters):
+                # all chapters are loaded, lookups may use the indexes now
+                self._chapter_index = None
+        return chapter
+
+    def _create_chapter(self,
+                        chapter_dict: dict,
+                        ind: int,
+                        trusted: bool,
+                        stored_ids: bool = False) -> Chapter:
+        '''
+        Create a chapter with all its sections from the dictionary, loaded
+        from meta yaml.
+
+        :param chapter_dict: dictionary with chapter data.
+        :param ind: index of the chapter, for error messages.
+        :param trusted: if True, the dictionary is not validated.
+        :param stored_ids: if True, section ids are taken from the dictionary.
+
+        :returns: a constructed Chapter object
+        '''
+        location = []  # chapter name and titles of the parent sections
+
+        def create_section(section_dict: dict, index: int) -> Section:
             '''
-            Create a section from the dictionary with its data, recursively
-            creating all the child sections and connecting them together.
+            Create a section without children from the dictionary with its
+            data. The dictionary is validated, unless the file is trusted.
 
             :param section_dict: dictionary with section data, loaded from meta yaml
+            :param index: index of the section among its siblings, for error messages.
 
             :returns: a constructed Section object
             '''
-            data = SECTION_SCHEMA.validate(section_dict)
-            section = Section(level=data['level'],
-                              start=data['start'],
-                              end=data['end'],
-                              data=data['data'],
-                              title=data['title'])
-            for child in data['children']:
-                section.add_child(load_section(child))
+            if not trusted:
+                def get_location():
+                    title = section_dict.get('title') if type(section_dict) is dict else None
+                    titles = [*location[1:], title if isinstance(title, str) else f'#{index}']
+                    return f'Chapter {location[0]!r}, section {" > ".join(map(repr, titles))}'
+
+                _check_fields(section_dict, SECTION_FIELDS, get_location)
+            section = Section(level=section_dict['level'],
+                              start=section_dict['start'],
+                              end=section_dict['end'],
+                              data=section_dict.get('data', {}),
+                              title=section_dict['title'],
+                              start_byte=section_dict.get('start_byte'),
+                              end_byte=section_dict.get('end_byte'))
+            if stored_ids:
+                section.id = section_dict['id']
             return section
 
-        self.filename = Path(filename)
-
-        with open(filename) as f:
-            unchecked_data = yaml.load(f, yaml.Loader)
-        data = META_SCHEMA.validate(unchecked_data)
+        def load_section(section_dict: dict) -> Section:
+            '''
+            Create a section from the dictionary with its data, creating all
+            the child sections and connecting them together. The tree is
+            walked with an explicit stack, so its depth is not limited by the
+            recursion limit. Each section is added to its parent after all its
+            children are loaded.
 
-        for chapter_dict in data['chapters']:
-            chapter = Chapter(filename=chapter_dict['filename'],
-                              name=chapter_dict['name'])
-            chapter.main_section = load_section(section_dict=chapter_dict['section'])
-            self.chapters.append(chapter)
+            :param section_dict: dictionary with section data, loaded from meta yaml
 
-        self.process_ids()
+            :returns: a constructed Section object
+            '''
+            root = create_section(section_dict, 0)
+            location.append(root.title)
+            stack = [(root, enumerate(section_dict.get('children', [])))]
+            while stack:
+                section, children = stack[-1]
+                for ind, child_dict in children:
+                    child = create_section(child_dict, ind)
+                    location.append(child.title)
+                    stack.append((child, enumerate(child_dict.get('children', []))))
+                    break
+                else:
+                    stack.pop()
+                    location.pop()
+                    if stack:
+                        stack[-1][0].add_child(section)
+            return root
+
+        if not trusted:
+            _check_fields(chapter_dict, CHAPTER_FIELDS, lambda: f'Chapter #{ind}')
+        chapter = Chapter(filename=chapter_dict['filename'],
+                          name=chapter_dict['name'])
+        location.append(chapter.name)
+        chapter.main_section = load_section(chapter_dict['section'])
+        return chapter
 
     def add_chapter(self, chapter: Chapter):
         '''
@@ -112,15 +382,37 @@ class Meta:
 
         :param chapter: a Chapter object to be added
         '''
-        self.chapters.append(chapter)
+        chapters = self.chapters
+        chapters.append(chapter)
+        chapter._metas.add(self)
+        self._changed()
+        ind = len(chapters) - 1
+        if self._path_index is not None and len(self._chapter_paths) == ind and \
+                self._path_index_cwd == os.getcwd():
+            self._set_chapter_path(ind, chapter.filename)
+        if self._name_index is not None and len(self._chapter_names) == ind:
+            self._set_chapter_name(ind, chapter.name)
 
     def iter_sections(self):
         '''
         :yields: each section of each chapter in the correct order
         '''
-        for chapter in self.chapters:
+        for chapter in self:
             yield from chapter.iter_sections()
 
+    def iter_sources(self, without_meta=True):
+        '''
+        Get sources of all sections, reading each chapter file only once.
+
+        :param without_meta: if True — all meta tags will be removed from the
+                             returned sources.
+
+        :yields: tuples (section, section source) for each section of each
+                 chapter in the correct order
+        '''
+        for chapter in self:
+            yield from chapter.iter_sources(without_meta)
+
     def get_chapter(self, filename: str or PosixPath) -> Chapter:
         '''
         Get Chapter by its filename.
@@ -129,32 +421,130 @@ class Meta:
 
         :returns: Chapter object for this filename or raises MetaChapterDoesNotExistError.
         '''
-        for chapter in self.chapters:
-            p1 = Path(chapter.filename).resolve()
-            p2 = Path(filename).resolve()
-            if p1 == p2:
+        resolved = Path(filename).resolve()
+        for rebuild in (False, True):
+            positions = self._get_path_index(rebuild).get(resolved)
+            if not positions:
+                break
+            chapter = self[positions[0]]
+            if chapter.filename == self._chapter_paths[positions[0]][1]:
+                return chapter
+            # the list of chapters was changed in place, index it again
+        raise MetaChapterDoesNotExistError(f"Chapter {filename} does not exist")
+
+    def get_chapter_by_name(self, name: str) -> Chapter:
+        '''
+        Get Chapter by its name.
+
+        :param name: chapter name, e.g. path to file relative to md_root.
+
+        :returns: Chapter object with this name or raises MetaChapterDoesNotExistError.
+        '''
+        for rebuild in (False, True):
+            positions = self._get_name_index(rebuild).get(name)
+            if not positions:
+                break
+            chapter = self[positions[0]]
+            if chapter.name == name:
                 return chapter
+            # the list of chapters was changed in place, index it again
+        raise MetaChapterDoesNotExistError(f"Chapter with name {name} does not exist")
+
+    def _get_chapter_entries(self) -> list:
+        ''':returns: list of chapters or, in lazy mode, of chapter index entries'''
+        if self._chapter_index is not None:
+            return self._chapter_index
+        return self._chapters
+
+    def _get_path_index(self, rebuild: bool = False) -> dict:
+        '''
+        Get the index of chapter positions by resolved filenames, building it
+        if needed. The index is rebuilt when the working dir or the number of
+        chapters changes. Renamed chapters update it themselves.
+        '''
+        cwd = os.getcwd()
+        if rebuild or self._path_index is None or self._path_index_cwd != cwd or \
+                len(self._chapter_paths) != len(self._chapters):
+            self._path_index = {}
+            self._chapter_paths = []
+            self._path_index_cwd = cwd
+            self._register_chapters()
+            for ind, chapter in enumerate(self._get_chapter_entries()):
+                self._set_chapter_path(ind, chapter.filename)
+        return self._path_index
+
+    def _get_name_index(self, rebuild: bool = False) -> dict:
+        '''
+        Get the index of chapter positions by names, building it if needed.
+        The index is rebuilt when the number of chapters changes. Renamed
+        chapters update it themselves.
+        '''
+        if rebuild or self._name_index is None or len(self._chapter_names) != len(self._chapters):
+            self._name_index = {}
+            self._chapter_names = []
+            self._register_chapters()
+            for ind, chapter in enumerate(self._get_chapter_entries()):
+                self._set_chapter_name(ind, chapter.name)
+        return self._name_index
+
+    def _set_chapter_path(self, ind: int, filename: str):
+        '''Index the chapter at position ind by its filename.'''
+        if ind < len(self._chapter_paths):
+            _remove_position(self._path_index, self._chapter_paths[ind][0], ind)
+        else:
+            self._chapter_paths.append(None)
+        resolved = Path(filename).resolve()
+        self._chapter_paths[ind] = (resolved, filename)
+        _add_position(self._path_index, resolved, ind)
+
+    def _set_chapter_name(self, ind: int, name: str):
+        '''Index the chapter at position ind by its name.'''
+        if ind < len(self._chapter_names):
+            _remove_position(self._name_index, self._chapter_names[ind], ind)
         else:
-            raise MetaChapterDoesNotExistError(f"Chapter {filename} does not exist")
+            self._chapter_names.append(None)
+        self._chapter_names[ind] = name
+        _add_position(self._name_index, name, ind)
+
+    def _chapter_renamed(self, chapter: Chapter):
+        '''
+        Called by the chapter when its filename or name changes. Only the
+        entries of this chapter are updated in the indexes.
+        '''
+        for ind, item in enumerate(self._chapters):
+            if item is not chapter:
+                continue
+            if self._path_index is not None and ind < len(self._chapter_paths) and \
+                    self._chapter_paths[ind][1] != chapter.filename:
+                self._set_chapter_path(ind, chapter.filename)
+            if self._name_index is not None and ind < len(self._chapter_names) and \
+                    self._chapter_names[ind] != chapter.name:
+                self._set_chapter_name(ind, chapter.name)
 
     def process_ids(self):
         '''
         Validate section ids for dublicates;
         Fill up missing section ids based on their titles.
         '''
-        ids = []
+        ids = set()
         for section in self.iter_sections():
             if 'id' in section.data:
                 if section.data['id'] in ids:
                     raise MetaDublicateIDError(f'Dublicate ids: {section.data["id"]}')
                 else:
-                    section.id = section.data['id']
-                    ids.append(section.id)
+                    # ids are set without notifying the chapters about each
+                    # section, they are notified once below
+                    section._id = section.data['id']
+                    ids.add(section.id)
 
-        for section in self.iter_sections():
-            if section.id is None:
-                section.id = convert_to_id(section.title, ids)
-                ids.append(section.id)
+        missing = [section for section in self.iter_sections() if section.id is None]
+        new_ids = IdGenerator(ids).generate_all(section.title for section in missing)
+        for section, id_ in zip(missing, new_ids):
+            section._id = id_
+
+        for chapter in self:
+            chapter._changed()
+        self._get_id_index()
 
     def get_by_id(self, id_: str) -> Section:
         '''
@@ -164,46 +554,161 @@ class Meta:
 
         :returns: Section object of queried id
         '''
-        for section in self.iter_sections():
-            if section.id == id_:
-                return section
+        if self._chapter_index is not None:
+            # lazy mode: load chapters only until the section is found. When
+            # the last chapter is loaded, lazy mode ends and the id index is
+            # used from then on
+            for section in self.iter_sections():
+                if section.id == id_:
+                    return section
         else:
-            raise MetaSectionDoesNotExistError(f"Can't find section with id {id_}")
+            id_index = self._get_id_index()
+            if id_ in id_index:
+                return id_index[id_]
+        raise MetaSectionDoesNotExistError(f"Can't find section with id {id_}")
 
-    def dump(self):
+    def find(self, *paths, **values) -> list:
         '''
+        Find sections by their data. Keys of nested dictionaries are joined
+        with dots, e.g. `confluence.page_id`. All conditions must be
+        satisfied.
+
+        >>> meta.find('confluence.page_id', type='api')
+
+        :param paths: keys which must be present in section data.
+        :param values: keys and values which must be present in section data.
+                       To use dotted keys, pass a dictionary: `**{'a.b': 1}`.
+
+        :returns: list of found sections in the correct order.
+        '''
+        filters = [(path_, EXISTS) for path_ in paths] + list(values.items())
+        if self._data_index is not None:
+            if self._data_index_version != (self._version, len(self._chapters)):
+                self.index_data()
+            return self._data_index.find(filters)
+        return [section for section in self.iter_sections() if matches(section.data, filters)]
+
+    def index_data(self) -> DataIndex:
+        '''
+        Build the index of section data, used by `find` from now on. The index
+        is rebuilt when sections or their data are replaced, but not when data
+        dictionaries are changed in place; call this method again after that.
+
+        :returns: DataIndex object.
+        '''
+        self._register_chapters()
+        self._data_index = DataIndex(list(self.iter_sections()))
+        self._data_index_version = (self._version, len(self._chapters))
+        return self._data_index
+
+    def _get_id_index(self) -> dict:
+        '''
+        Get the dictionary {section id: section}, rebuilding it if section
+        trees changed since it was built. If there are several sections with
+        the same id, the first one is indexed.
+        '''
+        version = (self._version, len(self._chapters))
+        if self._id_index is None or self._id_index_version != version:
+            # chapters may have been added to the list directly
+            self._register_chapters()
+            id_index = {}
+            for section in self.iter_sections():
+                id_index.setdefault(section.id, section)
+            self._id_index = id_index
+            self._id_index_version = version
+        return self._id_index
+
+    def dump(self, byte_offsets: bool = True):
+        '''
+        :param byte_offsets: if False, byte offsets of sections are left out,
+                             so that the file can be read by versions older
+                             than 1.4.0.
+
         :returns: a meta dictionary ready to be saved into yaml-file
         '''
         return {'version': self.syntax_version,
-                'chapters': [ch.to_dict() for ch in self.chapters]}
+                'chapters': [ch.to_dict(byte_offsets) for ch in self.chapters]}
 
     def __repr__(self):
         return f'<{self.__class__.__name__}: {self.filename or "file name not specified"}>'
 
     def __getitem__(self, ind: int):
+        if self._chapter_index is not None:
+            indices = range(len(self._chapter_index))[ind]
+            if isinstance(ind, slice):
+                return [self._get_lazy_chapter(i) for i in indices]
+            return self._get_lazy_chapter(indices)
         return self.chapters[ind]
 
     def __iter__(self):
+        if self._chapter_index is not None:
+            return (self._get_lazy_chapter(ind) for ind in range(len(self._chapters)))
         return iter(self.chapters)
 
     def __len__(self):
-        return len(self.chapters)
+        return len(self._chapters)
 
 
 class Chapter:
+    __slots__ = ['_name', '_filename', '_main_section', '_interval_index',
+                 '_interval_index_version', '_sections', '_sections_version',
+                 '_version', '_structure_version', '_metas']
+
     def __init__(self, filename: str, name: str, main_section: Section = None):
-        self.name = name
-        self.filename = filename
+        self._name = name
+        self._filename = filename
         self._main_section = None
+        self._interval_index = None
+        self._interval_index_version = None
+        self._sections = None
+        self._sections_version = None
+        # counters of changes in the section tree: section ids, offsets and
+        # data; and of changes in its structure: children and main section
+        self._version = 0
+        self._structure_version = 0
+        self._metas = WeakSet()  # Meta objects which index this chapter
         if main_section:
             self.main_section = main_section
 
+    def _changed(self, structure: bool = False):
+        '''
+        Called by the sections when the section tree changes. Indexes of this
+        chapter and of the Meta objects which contain it are rebuilt after
+        that.
+        '''
+        self._version += 1
+        if structure:
+            self._structure_version += 1
+        for meta in self._metas:
+            meta._changed()
+
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, value: str):
+        self._name = value
+        for meta in self._metas:
+            meta._chapter_renamed(self)
+
+    @property
+    def filename(self):
+        return self._filename
+
+    @filename.setter
+    def filename(self, value: str):
+        self._filename = value
+        for meta in self._metas:
+            meta._chapter_renamed(self)
+
     @property
     def main_section(self):
         return self._main_section
 
     @main_section.setter
     def main_section(self, value: Section):
+        self._changed(structure=True)
         self._main_section = value
         self._main_section.chapter = self
         for child in self._main_section.iter_children():
@@ -223,6 +728,9 @@ class Chapter:
         if offset > self.main_section.end:
             raise IndexError("Offset cannot be bigger than the chapter's length"
                              f" ({offset} > {self.main_section.end})")
+        interval_index = self._get_interval_index()
+        if interval_index is not None:
+            return interval_index.find(offset)
         result = None
         for section in self.iter_sections():
             if (section.start <= offset) and (section.end >= offset):
@@ -231,39 +739,312 @@ class Chapter:
                 break
         return result
 
-    def to_dict(self):
-        ''' :returns: a dictionary ready to be saved into yaml-file'''
+    def get_sections_in_range(self, start: int, end: int) -> list:
+        '''
+        Get all meta-sections which overlap the part of text between start
+        and end offsets, including the parent sections.
+
+        :param start: start offset of the part of text.
+        :param end: end offset of the part of text (not included).
+
+        :returns: list of sections in the correct order.
+        '''
+        interval_index = self._get_interval_index()
+        if interval_index is not None:
+            return interval_index.find_overlapping(start, end)
+        return [section for section in self.iter_sections()
+                if section.start < end and section.end > start]
+
+    def _get_interval_index(self) -> SectionIntervalIndex or None:
+        '''
+        Get the interval index of sections, rebuilding it if the section tree
+        changed since it was built.
+
+        :returns: SectionIntervalIndex object or None if sections are not
+                  sorted by their start offsets and can't be indexed.
+        '''
+        if self._interval_index_version != self._version:
+            sections = list(self.iter_sections())
+            if SectionIntervalIndex.is_sorted(sections):
+                self._interval_index = SectionIntervalIndex(sections)
+            else:
+                self._interval_index = None
+            self._interval_index_version = self._version
+        return self._interval_index
+
+    def to_dict(self, byte_offsets: bool = True):
+        '''
+        :param byte_offsets: if False, byte offsets of sections are left out.
+
+        :returns: a dictionary ready to be saved into yaml-file
+        '''
         return {'name': self.name,
                 'filename': self.filename,
-                'section': self._main_section.to_dict()}
+                'section': self._main_section.to_dict(byte_offsets)}
+
+    def iter_sources(self, without_meta=True):
+        '''
+        Get sources of all sections, reading the chapter file only once.
+
+        :param without_meta: if True — all meta tags will be removed from the
+                             returned sources.
+
+        :yields: tuples (section, section source) in the correct order
+        '''
+        if without_meta:
+            chapter_source, meta_spans = source_cache.get_with_spans(self.filename)
+            for section in self.iter_sections():
+                if meta_spans is None:
+                    # the chapter is not cached, spans were not found
+                    yield section, remove_meta(chapter_source[section.start: section.end])
+                else:
+                    yield section, meta_spans.remove_meta(chapter_source,
+                                                          section.start, section.end)
+        else:
+            chapter_source = source_cache.get(self.filename)
+            for section in self.iter_sections():
+                yield section, chapter_source[section.start: section.end]
+
+    def __getstate__(self):
+        # indexes and subscribed Meta objects are not saved
+        return {'name': self.name,
+                'filename': self.filename,
+                '_main_section': self._main_section}
+
+    def __setstate__(self, state: dict):
+        self.__init__(state['filename'], state['name'])
+        self._main_section = state['_main_section']
 
     def iter_sections(self):
-        ''':yields: the main section and each subsection in the correct order'''
-        yield self._main_section
-        for child in self._main_section.children:
-            yield child
-            yield from child.iter_children()
+        ''':returns: iterator over the main section and each subsection in the correct order'''
+        return iter(self._get_sections())
+
+    def _get_sections(self) -> list:
+        '''
+        Get the flattened list of the main section and all subsections,
+        rebuilding it if the section tree structure changed since it was
+        built.
+        '''
+        if self._sections is None or self._sections_version != self._structure_version:
+            self._sections = [self._main_section, *self._main_section.iter_children()]
+            self._sections_version = self._structure_version
+        return self._sections
 
     def __repr__(self):
         return f'<{self.__class__.__name__}: {self.name}>'
 
 
-class Section:
+class BaseSection:
+    '''
+    Methods shared by Section and read-only section views. Subclasses define
+    the title, level, start, end, start_byte, end_byte, id, data, parent,
+    children and chapter attributes.
+    '''
+    __slots__ = []
+
+    @property
+    def filename(self):
+        '''link to this section's chapter filename'''
+        return self.chapter.filename
+
+    @property
+    def span(self) -> (int, int):
+        '''section's (start, end) character offsets'''
+        return self.start, self.end
+
+    @property
+    def byte_span(self) -> (int, int) or None:
+        '''section's (start, end) byte offsets in the chapter file, if known'''
+        if self.start_byte is None or self.end_byte is None:
+            return None
+        return self.start_byte, self.end_byte
+
+    def is_main(self) -> bool:
+        '''Determine whether the section is main or not'''
+        return self.level == 0 and self.parent is None
+
+    def to_dict(self, byte_offsets: bool = True):
+        '''
+        :param byte_offsets: if False, byte offsets are left out.
+
+        :returns: a dictionary ready to be saved into yaml-file
+        '''
+        result = self._get_fields_dict(byte_offsets)
+        stack = [(self, result)]
+        while stack:
+            section, section_dict = stack.pop()
+            section_dict['children'] = []
+            for child in section.children:
+                child_dict = child._get_fields_dict(byte_offsets)
+                section_dict['children'].append(child_dict)
+                stack.append((child, child_dict))
+        return result
+
+    def _get_fields_dict(self, byte_offsets: bool = True) -> dict:
+        ''':returns: a dictionary with section fields, without children'''
+        result = {'id': self.id,
+                  'title': self.title,
+                  'level': self.level,
+                  'data': self.data,
+                  'start': self.start,
+                  'end': self.end}
+        if byte_offsets and self.byte_span:
+            result['start_byte'] = self.start_byte
+            result['end_byte'] = self.end_byte
+        return result
+
+    def get_source(self, without_meta=True) -> str:
+        '''
+        Get section source text. Section title is included.
+
+        :param without_meta: if True — all meta tags will be removed from the
+                             returned source.
+
+        :returns: section source
+        '''
+
+        self._check_chapter()
+        if not source_cache.fits(self.chapter.filename):
+            # chapter is too big to be cached: read only the section part if
+            # byte offsets are known, and search only the section for meta
+            if self.byte_span:
+                source = translate_newlines(self.get_source_bytes().decode('utf8'))
+            else:
+                source = source_cache.get(self.chapter.filename)[self.start: self.end]
+            if without_meta:
+                source = remove_meta(source)
+            return source
+        if without_meta:
+            chapter_source, meta_spans = source_cache.get_with_spans(self.chapter.filename)
+            if meta_spans is None:
+                # the file has grown too big to be cached since the check
+                return remove_meta(chapter_source[self.start: self.end])
+            return meta_spans.remove_meta(chapter_source, self.start, self.end)
+        chapter_source = source_cache.get(self.chapter.filename)
+        return chapter_source[self.start: self.end]
+
+    def get_source_bytes(self) -> bytes:
+        '''
+        Get raw section source from the chapter file. Only the section part of
+        the file is read.
+
+        :returns: section source bytes (utf8-encoded).
+        '''
+        self._check_chapter()
+        if not self.byte_span:
+            raise MetaSectionNoByteOffsetsError(
+                'Byte offsets are not known for this section. Regenerate meta.'
+            )
+        with open(self.chapter.filename, 'rb') as f:
+            f.seek(self.start_byte)
+            return f.read(self.end_byte - self.start_byte)
+
+    def _check_chapter(self):
+        if not self.chapter:
+            raise MetaChapterNotAssignedError('Chapter is not assigned. Can\'t determine filename.')
+
+    def __repr__(self):
+        short_name = self.title[:20] + '...' if len(self.title) > 23 else self.title
+        return f'<{self.__class__.__name__}: [{self.level}] {short_name}>'
+
+
+class SectionChildren(list):
+    '''
+    List of child sections, which notifies the chapter of its section when
+    it is changed in place.
+    '''
+    __slots__ = ['_section']
+
+    def __init__(self, section: Section, children=()):
+        super().__init__(children)
+        self._section = section
+
+    def _changed(self):
+        self._section._changed(structure=True)
+
+    def __reduce__(self):
+        return self.__class__, (self._section, list(self))
+
+    def append(self, section):
+        super().append(section)
+        self._changed()
+
+    def extend(self, sections):
+        super().extend(sections)
+        self._changed()
+
+    def insert(self, ind: int, section):
+        super().insert(ind, section)
+        self._changed()
+
+    def remove(self, section):
+        super().remove(section)
+        self._changed()
+
+    def pop(self, ind: int = -1):
+        result = super().pop(ind)
+        self._changed()
+        return result
+
+    def clear(self):
+        super().clear()
+        self._changed()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._changed()
+
+    def reverse(self):
+        super().reverse()
+        self._changed()
+
+    def __setitem__(self, ind, value):
+        super().__setitem__(ind, value)
+        self._changed()
+
+    def __delitem__(self, ind):
+        super().__delitem__(ind)
+        self._changed()
+
+    def __iadd__(self, sections):
+        result = super().__iadd__(sections)
+        self._changed()
+        return result
+
+    def __imul__(self, count: int):
+        result = super().__imul__(count)
+        self._changed()
+        return result
+
+
+class Section(BaseSection):
+    __slots__ = ['title', 'level', '_start', '_end', 'start_byte', 'end_byte',
+                 '_children', '_parent', '_id', 'chapter', '_data']
+
     def __init__(self,
                  level: int,
                  start: int,
                  end: int,
                  data: dict = {},
-                 title: str = ''):
+                 title: str = '',
+                 start_byte: int or None = None,
+                 end_byte: int or None = None):
         self.title = title
         self.level = level
-        self.start = start
-        self.end = end
-        self.children = []
+        self._start = start
+        self._end = end
+        self.start_byte = start_byte
+        self.end_byte = end_byte
+        self._children = SectionChildren(self)
         self._parent = None
-        self.id = None
+        self._id = None
         self.chapter = None
-        self.data = data
+        self._data = data
+
+    def _changed(self, structure: bool = False):
+        '''Notify the chapter about a change in the section tree.'''
+        if self.chapter is not None:
+            self.chapter._changed(structure)
 
     def add_child(self, section):
         '''
@@ -277,63 +1058,76 @@ class Section:
         if section.level <= self.level:
             raise MetaHierarchyError("Error adding child. Child level must be"
                                      f" higher than parent's. {section.level} <= {self.level}")
-        self.children.append(section)
+        list.append(self._children, section)
         section.chapter = self.chapter
         section.parent = self
+        self._changed(structure=True)
 
     @property
-    def parent(self):
-        return self._parent
+    def children(self) -> list:
+        '''
+        list of child sections. Changes of the list are tracked, but the
+        children must be added with add_child to be connected to this section.
+        '''
+        return self._children
 
-    @parent.setter
-    def parent(self, section):
-        self._parent = section
+    @children.setter
+    def children(self, value: list):
+        self._children = SectionChildren(self, value)
+        self._changed(structure=True)
 
     @property
-    def filename(self):
-        '''link to this section's chapter filename'''
-        return self.chapter.filename
+    def start(self):
+        return self._start
 
-    def is_main(self) -> bool:
-        '''Determine whether the section is main or not'''
-        return self.level == 0 and self.parent is None
+    @start.setter
+    def start(self, value: int):
+        self._start = value
+        self._changed()
 
-    def to_dict(self):
-        ''':returns: a dictionary ready to be saved into yaml-file'''
-        return {'id': self.id,
-                'title': self.title,
-                'level': self.level,
-                'data': self.data,
-                'start': self.start,
-                'end': self.end,
-                'children': [child.to_dict() for child in self.children]}
+    @property
+    def end(self):
+        return self._end
 
-    def iter_children(self):
-        ''':yields: each subsection in the correct order'''
-        for child in self.children:
-            yield child
-            yield from child.iter_children()
+    @end.setter
+    def end(self, value: int):
+        self._end = value
+        self._changed()
 
-    def get_source(self, without_meta=True) -> str:
-        '''
-        Get section source text. Section title is included.
+    @property
+    def data(self):
+        return self._data
 
-        :param without_meta: if True — all meta tags will be removed from the
-                             returned source.
+    @data.setter
+    def data(self, value: dict):
+        self._data = value
+        self._changed()
 
-        :returns: section source
-        '''
+    @property
+    def id(self):
+        return self._id
 
-        if not self.chapter:
-            raise MetaChapterNotAssignedError('Chapter is not assigned. Can\'t determine filename.')
-        with open(self.chapter.filename) as f:
-            chapter_source = f.read()
+    @id.setter
+    def id(self, value: str or None):
+        self._id = value
+        self._changed()
 
-        source = chapter_source[self.start: self.end]
-        if without_meta:
-            source = remove_meta(source)
-        return source
+    @property
+    def parent(self):
+        return self._parent
 
-    def __repr__(self):
-        short_name = self.title[:20] + '...' if len(self.title) > 23 else self.title
-        return f'<{self.__class__.__name__}: [{self.level}] {short_name}>'
+    @parent.setter
+    def parent(self, section):
+        self._parent = section
+
+    def iter_children(self):
+        ''':yields: each subsection in the correct order'''
+        stack = [iter(self.children)]
+        while stack:
+            for child in stack[-1]:
+                yield child
+                if child._children:
+                    stack.append(iter(child._children))
+                break
+            else:
+                stack.pop()
@@ -0,0 +1,121 @@
+'''
+Inverted index of section metadata.
+
+Section data is flattened into (path, value) pairs, where path is a
+dot-separated sequence of keys, e.g. `confluence.page_id`. Values of nested
+dictionaries are indexed too, under their own paths. The index maps each path
+and each (path, value) pair to the positions of sections in iteration order.
+'''
+
+
+class _Exists:
+    def __repr__(self):
+        return 'EXISTS'
+
+
+# filter value for paths which only have to be present
+EXISTS = _Exists()
+
+
+def iter_data_items(data: dict):
+    '''
+    Flatten section data into (path, value) pairs.
+
+    :param data: section data dictionary.
+
+    :yields: tuples (path, value) for each key of the data and of the nested
+             dictionaries.
+    '''
+    stack = [('', data)]
+    while stack:
+        prefix, item = stack.pop()
+        if not isinstance(item, dict):
+            continue
+        for key, value in item.items():
+            path_ = f'{prefix}{key}'
+            yield path_, value
+            if isinstance(value, dict):
+                stack.append((f'{path_}.', value))
+
+
+def matches(data: dict, filters: list) -> bool:
+    '''
+    Check that section data satisfies all the filters.
+
+    :param data: section data dictionary.
+    :param filters: list of tuples (path, value), where value is EXISTS if
+                    the path only has to be present.
+
+    :returns: True if all filters are satisfied.
+    '''
+    items = list(iter_data_items(data))
+    return all(any(path_ == filter_path and (filter_value is EXISTS or value == filter_value)
+                   for path_, value in items)
+               for filter_path, filter_value in filters)
+
+
+class DataIndex:
+    '''
+    Index of section data, answering AND-combined queries in time
+    proportional to the number of sections matching the most selective
+    filter.
+    '''
+
+    def __init__(self, sections: list):
+        '''
+        :param sections: list of Section objects in the iteration order.
+        '''
+        self.sections = sections
+        self.paths = {}  # {path: [positions]}
+        self.values = {}  # {(path, value): [positions]}
+        for pos, section in enumerate(sections):
+            for path_, value in iter_data_items(section.data):
+                positions = self.paths.setdefault(path_, [])
+                if not positions or positions[-1] != pos:
+                    positions.append(pos)
+                try:
+                    positions = self.values.setdefault((path_, value), [])
+                except TypeError:
+                    # unhashable values are compared when queried
+                    continue
+                if not positions or positions[-1] != pos:
+                    positions.append(pos)
+
+    def find(self, filters: list) -> list:
+        '''
+        Find sections which satisfy all the filters.
+
+        :param filters: list of tuples (path, value), where value is EXISTS if
+                        the path only has to be present.
+
+        :returns: list of Section objects in the iteration order.
+        '''
+        if not filters:
+            return list(self.sections)
+        best = None
+        for ind, (path_, value) in enumerate(filters):
+            positions, exact = self._get_candidates(path_, value)
+            if best is None or len(positions) < len(best[0]):
+                best = (positions, exact, ind)
+        positions, exact, best_ind = best
+        # the filter which gave the candidates is satisfied by exact ones
+        rest = [filter_ for ind, filter_ in enumerate(filters) if ind != best_ind or not exact]
+        if not rest:
+            return [self.sections[pos] for pos in positions]
+        return [self.sections[pos] for pos in positions
+                if matches(self.sections[pos].data, rest)]
+
+    def _get_candidates(self, path_: str, value) -> (list, bool):
+        '''
+        :returns: a tuple (positions of sections which may satisfy the
+                  filter, True if all of them satisfy it).
+        '''
+        if value is EXISTS:
+            return self.paths.get(path_, []), True
+        try:
+            return self.values.get((path_, value), []), True
+        except TypeError:
+            return self.paths.get(path_, []), False
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}: {len(self.sections)} sections, {len(self.paths)} paths>'
@@ -0,0 +1,221 @@
+'''
+Structural diff between two Meta registries.
+
+Chapters are matched by their names. Sections with ids set in their data are
+matched by the ids, and sections with generated ids — by the chapter name and
+the titles of the section and its parents, since generated ids shift when
+other headings change. Changes are reported as events — dictionaries which
+may be serialized into JSON lines:
+
+    {"event": "added" | "removed" | "moved" | "changed",
+     "type": "chapter" | "section",
+     ...}
+
+Chapter events hold the chapter `name`. Section events hold the section `id`
+and the `chapter` name. `moved` events hold the old and the new positions in
+`from` and `to`, and `changed` events hold `fields`: a dictionary
+{field: [old value, new value]}.
+'''
+
+from bisect import bisect_left
+
+from .classes import Meta
+from .classes import Section
+
+# Section fields compared by the diff. Offsets are not compared, as they
+# change whenever preceding text changes; the section length is compared
+# instead.
+SECTION_FIELDS = ('title', 'level', 'data', 'length')
+
+
+def get_unordered(sequence: list) -> set:
+    '''
+    Find elements which have to be moved to sort the sequence: all elements
+    except for the longest increasing subsequence.
+
+    :param sequence: list of distinct numbers.
+
+    :returns: set of indexes of the elements to be moved.
+    '''
+    tails = []  # values ending the increasing subsequences of each length
+    tail_indexes = []
+    previous = [None] * len(sequence)
+    for ind, value in enumerate(sequence):
+        length = bisect_left(tails, value)
+        if length == len(tails):
+            tails.append(value)
+            tail_indexes.append(ind)
+        else:
+            tails[length] = value
+            tail_indexes[length] = ind
+        previous[ind] = tail_indexes[length - 1] if length else None
+
+    ordered = set()
+    ind = tail_indexes[-1] if tail_indexes else None
+    while ind is not None:
+        ordered.add(ind)
+        ind = previous[ind]
+    return set(range(len(sequence))) - ordered
+
+
+def _get_section_fields(section: Section) -> dict:
+    return {'title': section.title,
+            'level': section.level,
+            'data': section.data,
+            'length': section.end - section.start}
+
+
+def _get_parent_id(section: Section) -> str or None:
+    return section.parent.id if section.parent else None
+
+
+def _index_sections(meta: Meta) -> dict:
+    '''
+    Index sections by their keys: ('id', section id) for sections with ids
+    in their data, and ('title', chapter name, titles of the section and its
+    parents below the main section, number of the same titles before) for
+    sections with generated ids. The title of the main section is left out,
+    so renaming the chapter heading doesn't change the keys; the main section
+    itself is keyed by the chapter name only.
+
+    :returns: dictionary {section key: (section, chapter name, parent key)}.
+              If there are several sections with the same key, the first one
+              is indexed.
+    '''
+    result = {}
+    for chapter in meta:
+        keys = {}  # {section: key}
+        title_paths = {}  # {section: titles below the main section}
+        title_counts = {}
+        for section in chapter.iter_sections():
+            parent = section.parent
+            if parent is None:
+                title_path = ()
+            else:
+                title_path = (*title_paths[parent], section.title)
+            title_paths[section] = title_path
+            if 'id' in section.data:
+                key = ('id', section.id)
+            else:
+                count = title_counts.get(title_path, 0)
+                title_counts[title_path] = count + 1
+                key = ('title', chapter.name, title_path, count)
+            keys[section] = key
+            result.setdefault(key, (section, chapter.name, keys.get(parent)))
+    return result
+
+
+def iter_chapter_changes(old: Meta, new: Meta):
+    '''
+    Compare chapters of two registries by their names.
+
+    :param old: the previous Meta object.
+    :param new: the new Meta object.
+
+    :yields: change events.
+    '''
+    old_positions = {}
+    for ind, chapter in enumerate(old):
+        old_positions.setdefault(chapter.name, (ind, chapter))
+    new_positions = {}
+    for ind, chapter in enumerate(new):
+        new_positions.setdefault(chapter.name, (ind, chapter))
+
+    for name, (ind, chapter) in old_positions.items():
+        if name not in new_positions:
+            yield {'event': 'removed', 'type': 'chapter', 'name': name,
+                   'filename': chapter.filename, 'position': ind}
+
+    common = []
+    for name, (ind, chapter) in new_positions.items():
+        if name not in old_positions:
+            yield {'event': 'added', 'type': 'chapter', 'name': name,
+                   'filename': chapter.filename, 'position': ind}
+        else:
+            common.append(name)
+
+    old_order = [old_positions[name][0] for name in common]
+    for ind in sorted(get_unordered(old_order)):
+        name = common[ind]
+        yield {'event': 'moved', 'type': 'chapter', 'name': name,
+               'from': old_positions[name][0], 'to': new_positions[name][0]}
+
+    for name in common:
+        old_chapter = old_positions[name][1]
+        new_chapter = new_positions[name][1]
+        if old_chapter.filename != new_chapter.filename:
+            yield {'event': 'changed', 'type': 'chapter', 'name': name,
+                   'fields': {'filename': [old_chapter.filename, new_chapter.filename]}}
+
+
+def iter_section_changes(old: Meta, new: Meta):
+    '''
+    Compare sections of two registries. A section is moved if its chapter or
+    parent changed, or if its order among the siblings present in both
+    registries changed. If a matched section got a new generated id, the id
+    is reported among the changed fields.
+
+    :param old: the previous Meta object.
+    :param new: the new Meta object.
+
+    :yields: change events.
+    '''
+    old_sections = _index_sections(old)
+    new_sections = _index_sections(new)
+
+    for key, (section, chapter_name, parent_key) in old_sections.items():
+        if key not in new_sections:
+            yield {'event': 'removed', 'type': 'section', 'id': section.id,
+                   'chapter': chapter_name, 'title': section.title}
+
+    # old positions of the siblings which kept their parents, in new order
+    siblings = {}
+    for key, (section, chapter_name, parent_key) in new_sections.items():
+        old_item = old_sections.get(key)
+        if old_item and parent_key is not None and old_item[1:] == (chapter_name, parent_key):
+            siblings.setdefault(parent_key, []).append(key)
+    reordered = set()
+    for parent_key, keys in siblings.items():
+        old_siblings = old_sections[keys[0]][0].parent.children
+        old_order = {id(section): ind for ind, section in enumerate(old_siblings)}
+        unordered = get_unordered([old_order.get(id(old_sections[key][0]), -1) for key in keys])
+        reordered.update(keys[ind] for ind in unordered)
+
+    for key, (section, chapter_name, parent_key) in new_sections.items():
+        old_item = old_sections.get(key)
+        if old_item is None:
+            yield {'event': 'added', 'type': 'section', 'id': section.id,
+                   'chapter': chapter_name, 'parent': _get_parent_id(section),
+                   'title': section.title}
+            continue
+
+        old_section, old_chapter_name, old_parent_key = old_item
+        if old_item[1:] != (chapter_name, parent_key) or key in reordered:
+            yield {'event': 'moved', 'type': 'section', 'id': section.id,
+                   'from': {'chapter': old_chapter_name, 'parent': _get_parent_id(old_section)},
+                   'to': {'chapter': chapter_name, 'parent': _get_parent_id(section)}}
+
+        old_fields = _get_section_fields(old_section)
+        new_fields = _get_section_fields(section)
+        fields = {field: [old_fields[field], new_fields[field]]
+                  for field in SECTION_FIELDS
+                  if old_fields[field] != new_fields[field]}
+        if old_section.id != section.id:
+            fields = {'id': [old_section.id, section.id], **fields}
+        if fields:
+            yield {'event': 'changed', 'type': 'section', 'id': section.id,
+                   'chapter': chapter_name, 'fields': fields}
+
+
+def diff_meta(old: Meta, new: Meta):
+    '''
+    Compare two registries: chapters by their names and sections by their
+    ids or, for generated ids, by their titles.
+
+    :param old: the previous Meta object.
+    :param new: the new Meta object.
+
+    :yields: change events, chapter events first.
+    '''
+    yield from iter_chapter_changes(old, new)
+    yield from iter_section_changes(old, new)
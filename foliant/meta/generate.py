@@ -1,135 +1,500 @@
 '''Module defining load_meta function for generating metadata from md-sources'''
 
+import os
 import re
 
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
 from logging import getLogger
 from pathlib import Path
 from pathlib import PosixPath
+from time import perf_counter
 
 from foliant.contrib.chapters import Chapters
 
+from .cache import ChapterCache
 from .classes import Chapter
 from .classes import Meta
 from .classes import Section
+from .patterns import CHUNK_PATTERN
+from .profiling import MetaHooks
+from .profiling import phase
+from .scanner import scan
+from .tools import YAML_BACKEND
+from .tools import get_byte_offsets
 from .tools import get_header_content
 from .tools import get_meta_dict_from_meta_tag
+from .tools import get_meta_dict_from_options
 from .tools import get_meta_dict_from_yfm
 from .tools import iter_chunks
+from .tools import translate_newlines
 
 logger = getLogger('flt.meta')
 
+# value of Chunk.meta_tag when the chunk was not scanned for meta tags
+NOT_SCANNED = object()
+
+# Version of the chapter parser. Must be increased whenever parsing results
+# change, so that cached chapters are parsed again.
+PARSER_VERSION = '7'
+
+
+class MetaChapterParseError(Exception):
+    pass
+
 
 class Chunk:
     '''
     Mini-class for a part of MD-source from one heading to the next of same
-    or lower level
+    or lower level.
+
+    `meta_tag` is the first meta tag in the content found by the scanner:
+    a tuple (start, end, options string or None) relative to the content,
+    None if there is no meta tag, or NOT_SCANNED if the content must be
+    searched for it.
     '''
 
-    __slots__ = ['title', 'level', 'content', 'start', 'end']
+    __slots__ = ['title', 'level', 'content', 'start', 'end', 'meta_tag']
 
     def __init__(self, title: str, level: int,
-                 content: str, start: int, end: int):
+                 content: str, start: int, end: int,
+                 meta_tag: tuple or None or object = NOT_SCANNED):
         self.title = title
         self.level = level
         self.content = content
         self.start = start
         self.end = end
+        self.meta_tag = meta_tag
 
     def __repr__(self):
         return f'<Chunk: [{self.level}] {self.title[:15]}>'
 
 
-def load_meta(chapters: list, md_root: str or PosixPath = 'src') -> Meta:
+def load_meta(chapters: list,
+              md_root: str or PosixPath = 'src',
+              jobs: int = 1,
+              use_threads: bool = False,
+              cache: ChapterCache or None = None,
+              meta_search_limit: int or None = None,
+              stream_threshold: int or None = None,
+              hooks: MetaHooks or None = None) -> Meta:
     '''
     Collect metadata from chapters list and load them into Meta class.
 
     :param chapters: list of chapters from foliant.yml
     :param md_root: root folder where the md-files are stored. Usually either
                     <workingdir> or <srcdir>
+    :param jobs: number of parallel workers for parsing chapters. 1 means
+                 serial parsing, 0 or None — one worker per CPU.
+    :param use_threads: use a thread pool instead of a process pool when
+                        jobs != 1.
+    :param cache: ChapterCache object. If specified, unchanged chapters are
+                  loaded from cache instead of being parsed.
+    :param meta_search_limit: if specified, meta tags are only looked for
+                              within this number of characters from the
+                              beginning of each section.
+    :param stream_threshold: if specified, chapter files of this size in
+                             bytes or larger are parsed in streaming mode
+                             without reading them into memory.
+    :param hooks: MetaHooks object, which is notified of each chapter and
+                  parsing phase (see the profiling module). Chapters are
+                  parsed serially when hooks are specified.
 
     :returns: Meta object
     '''
-    logger.debug(f'LOAD_META start.\nchapters: {chapters}\nmd_root: {md_root}')
+    logger.debug('LOAD_META start.\nchapters: %s\nmd_root: %s\nYAML backend: %s',
+                 chapters, md_root, YAML_BACKEND)
 
-    c = Chapters(chapters)
+    if hooks is not None and jobs != 1:
+        logger.debug('Hooks are specified, parsing chapters serially')
+        jobs = 1
+    tasks = [(path_, name, cache, meta_search_limit, stream_threshold, hooks)
+             for path_, name in iter_chapter_paths(chapters, md_root)]
 
     meta = Meta()
-    for path_ in c.paths(md_root):
-        name = str(path_.relative_to(md_root))
-        chapter = get_meta_for_chapter(path_, name)
+    for chapter, cache_hit in iter_parsed_chapters(tasks, jobs, use_threads):
+        if cache is not None and cache_hit is not None:
+            cache.register(cache_hit)
         if chapter:
             meta.add_chapter(chapter)
 
-    meta.process_ids()
+    if cache is not None:
+        logger.debug('Chapter cache: %s hits, %s misses', cache.hits, cache.misses)
+        cache.prune()
+
+    with phase(hooks, 'process_ids'):
+        meta.process_ids()
     return meta
 
 
+def iter_chapter_paths(chapters: list, md_root: str or PosixPath = 'src'):
+    '''
+    :param chapters: list of chapters from foliant.yml
+    :param md_root: root folder where the md-files are stored.
+
+    :yields: tuples (chapter path, chapter name) for each chapter in the
+             correct order.
+    '''
+    for path_ in Chapters(chapters).paths(md_root):
+        yield path_, str(path_.relative_to(md_root))
+
+
+def iter_parsed_chapters(tasks: list, jobs: int = 1, use_threads: bool = False):
+    '''
+    Parse chapters, possibly in parallel, keeping the original order.
+
+    :param tasks: list of (chapter path, chapter name, ChapterCache or None,
+                  meta search limit, stream threshold, MetaHooks or None)
+                  tuples.
+    :param jobs: number of parallel workers. 1 means serial parsing, 0 or None —
+                 one worker per CPU.
+    :param use_threads: use a thread pool instead of a process pool.
+
+    :yields: tuples (Chapter object or None for missing files,
+                     cache hit flag or None if cache was not used)
+             in the order of tasks.
+    '''
+    if not jobs:
+        jobs = os.cpu_count() or 1
+    jobs = min(jobs, len(tasks))
+    if jobs <= 1:
+        yield from map(_parse_chapter_task, tasks)
+        return
+
+    executor_class = ThreadPoolExecutor if use_threads else ProcessPoolExecutor
+    logger.debug('Parsing %s chapters with %s workers (%s)',
+                 len(tasks), jobs, executor_class.__name__)
+    with executor_class(max_workers=jobs) as executor:
+        # map preserves the order of tasks, so the result is identical to
+        # the serial run
+        chunksize = 1 if use_threads else max(1, len(tasks) // (jobs * 4))
+        yield from executor.map(_parse_chapter_task, tasks, chunksize=chunksize)
+
+
+def _parse_chapter_task(task: tuple) -> (Chapter or None, bool or None):
+    '''
+    Worker wrapper around get_meta_for_chapter which points to the failed
+    chapter in the error message.
+
+    :param task: tuple of (chapter path, chapter name, ChapterCache or None,
+                 meta search limit, stream threshold, MetaHooks or None).
+
+    :returns: a tuple (Chapter object or None, cache hit flag or None).
+    '''
+    path_, name, cache, meta_search_limit, stream_threshold, hooks = task
+    try:
+        return _load_chapter(path_, name, cache, meta_search_limit, stream_threshold, hooks)
+    except Exception as e:
+        raise MetaChapterParseError(f'Error parsing chapter {path_}: '
+                                    f'{e.__class__.__name__}: {e}') from e
+
+
 def get_meta_for_chapter(ch_path: str or PosixPath,
-                         name: str or None = None) -> Chapter:
+                         name: str or None = None,
+                         cache: ChapterCache or None = None,
+                         meta_search_limit: int or None = None,
+                         stream_threshold: int or None = None,
+                         hooks: MetaHooks or None = None) -> Chapter:
     '''
     Get metadata for one chapter.
 
     :param ch_path: path to chapter source file.
     :param name:    chapter name. If None — it's equal to ch_path.
+    :param cache:   ChapterCache object to load the parsed chapter from
+                    and to save it to.
+    :param meta_search_limit: if specified, meta tags are only looked for
+                              within this number of characters from the
+                              beginning of each section.
+    :param stream_threshold: if specified, chapter files of this size in
+                             bytes or larger are parsed in streaming mode.
+    :param hooks:   MetaHooks object, notified of the chapter and its parsing
+                    phases.
 
     :returns: a Chapter object.
     '''
+    return _load_chapter(ch_path, name, cache, meta_search_limit, stream_threshold, hooks)[0]
+
+
+def _load_chapter(ch_path: str or PosixPath,
+                  name: str or None = None,
+                  cache: ChapterCache or None = None,
+                  meta_search_limit: int or None = None,
+                  stream_threshold: int or None = None,
+                  hooks: MetaHooks or None = None) -> (Chapter or None, bool or None):
+    '''
+    Get metadata for one chapter, using cache if specified, and notify hooks
+    of the chapter.
+
+    :returns: a tuple (Chapter object or None, cache hit flag or None if cache
+              was not used).
+    '''
+    if hooks is None:
+        return _read_chapter(ch_path, name, cache, meta_search_limit, stream_threshold)
+    name = name or str(ch_path)
+    hooks.chapter_start(name)
+    start = perf_counter()
+    chapter, cache_hit = _read_chapter(ch_path, name, cache, meta_search_limit,
+                                       stream_threshold, hooks)
+    hooks.chapter_finish(name, chapter, perf_counter() - start)
+    return chapter, cache_hit
+
+
+def _read_chapter(ch_path: str or PosixPath,
+                  name: str or None = None,
+                  cache: ChapterCache or None = None,
+                  meta_search_limit: int or None = None,
+                  stream_threshold: int or None = None,
+                  hooks: MetaHooks or None = None) -> (Chapter or None, bool or None):
+    '''
+    Get metadata for one chapter, using cache if specified.
+
+    :returns: a tuple (Chapter object or None, cache hit flag or None if cache
+              was not used).
+    '''
     chapter_path = Path(ch_path)
-    logger.debug(f'Getting meta for chapter {chapter_path}')
+    logger.debug('Getting meta for chapter %s', chapter_path)
     if not chapter_path.exists():
-        logger.debug(f'Chapter does not exist, skipping')
-        return None
-    with open(chapter_path, encoding='utf8') as f:
-        content = f.read()
+        logger.debug('Chapter does not exist, skipping')
+        return None, None
+    if stream_threshold is not None and chapter_path.stat().st_size >= stream_threshold:
+        return _load_chapter_streaming(chapter_path, name, cache, meta_search_limit, hooks)
+    # newlines are translated manually to be able to find byte offsets in
+    # the raw source
+    with phase(hooks, 'read'):
+        with open(chapter_path, encoding='utf8', newline='') as f:
+            raw_content = f.read()
+        content = translate_newlines(raw_content)
 
     chapter = Chapter(filename=str(chapter_path),
                       name=name or str(chapter_path))
-    header, chunks = split_by_headings(content)
 
-    main_section = get_section(header)
-    if chunks and not get_section(chunks[0]) and chunks[0].level == 1:
-        # if the first heading is of level 1 (#) and doesn't have meta, set main
-        #  section's title to this heading value
-        main_section.title = chunks[0].title
+    cache_hit = None
+    main_section = None
+    if cache is not None:
+        with phase(hooks, 'cache'):
+            key = cache.get_key(raw_content, f'meta_search_limit={meta_search_limit}')
+            main_section = cache.get(key)
+        cache_hit = main_section is not None
+    if main_section is None:
+        main_section = get_main_section(content, meta_search_limit, hooks)
+        with phase(hooks, 'byte_offsets'):
+            set_byte_offsets(main_section, raw_content)
+        if cache is not None:
+            with phase(hooks, 'cache'):
+                cache.set(key, main_section)
+
     chapter.main_section = main_section
+    return chapter, cache_hit
+
+
+def _load_chapter_streaming(chapter_path: PosixPath,
+                            name: str or None = None,
+                            cache: ChapterCache or None = None,
+                            meta_search_limit: int or None = None,
+                            hooks: MetaHooks or None = None) -> (Chapter, bool or None):
+    '''
+    Streaming counterpart of _load_chapter for large chapters: the file is
+    never read into memory as a whole.
+    '''
+    # imported here because the stream module depends on this one
+    from .stream import get_main_section_from_file
+
+    chapter = Chapter(filename=str(chapter_path),
+                      name=name or str(chapter_path))
+
+    cache_hit = None
+    main_section = None
+    if cache is not None:
+        with phase(hooks, 'cache'):
+            key = cache.get_file_key(chapter_path, f'meta_search_limit={meta_search_limit}')
+            main_section = cache.get(key)
+        cache_hit = main_section is not None
+    if main_section is None:
+        with phase(hooks, 'stream'):
+            main_section = get_main_section_from_file(chapter_path, meta_search_limit)
+        if cache is not None:
+            with phase(hooks, 'cache'):
+                cache.set(key, main_section)
+
+    chapter.main_section = main_section
+    return chapter, cache_hit
+
+
+def get_main_section(content: str,
+                     meta_search_limit: int or None = None,
+                     hooks: MetaHooks or None = None) -> Section:
+    '''
+    Parse chapter source and build the tree of its meta sections.
 
-    current_section = main_section
+    :param content: chapter source.
+    :param meta_search_limit: if specified, meta tags are only looked for
+                              within this number of characters from the
+                              beginning of each section.
+    :param hooks: MetaHooks object, notified of the `split` and `sections`
+                  phases.
+
+    :returns: the main Section object with all subsections attached.
+    '''
+    if '<meta' not in content and not content.startswith('---'):
+        # fast path: no meta in chapter, so only the main section is present
+        logger.debug('No meta markers in chapter, skipping sections parsing')
+        main_section = Section(0, 0, len(content), {}, title='')
+        first_chunk = CHUNK_PATTERN.search(content)
+        if first_chunk and len(first_chunk.group('level')) == 1:
+            main_section.title = first_chunk.group('title')
+        return main_section
+
+    with phase(hooks, 'split'):
+        header, chunks = get_header_and_chunks(content)
+    with phase(hooks, 'sections'):
+        for section in iter_sections(header, chunks, meta_search_limit):
+            pass
+    # main section is always the last one
+    return section
+
+
+def set_byte_offsets(main_section: Section, raw_content: str):
+    '''
+    Fill up `start_byte` and `end_byte` attributes of the main section and all
+    its subsections.
+
+    :param main_section: the main Section object of the chapter.
+    :param raw_content: chapter source with original line endings.
+    '''
+    sections = [main_section, *main_section.iter_children()]
+    offsets = get_byte_offsets(raw_content,
+                               [o for s in sections for o in (s.start, s.end)])
+    for section in sections:
+        section.start_byte = offsets[section.start]
+        section.end_byte = offsets[section.end]
+
+
+def iter_sections(header: Chunk,
+                  chunks,
+                  meta_search_limit: int or None = None,
+                  main_section: Section or None = None):
+    '''
+    Build the tree of meta sections in a single forward pass over the chunks.
+
+    Chunks may be supplied by a generator; their `end` parameters are fixed on
+    the way, like fix_chunk_ends does. Two stacks are used: the stack of open
+    chunks determines where each chunk ends, and the stack of open sections
+    determines the parent of each new section.
+
+    :param header: header Chunk object.
+    :param chunks: iterable of title Chunk objects in the order of appearance,
+                   with `end` pointing to the beginning of the next heading.
+    :param meta_search_limit: if specified, meta tags are only looked for
+                              within this number of characters from the
+                              beginning of each chunk.
+    :param main_section: main Section object, if it is already parsed from
+                         the header.
+
+    :yields: Section objects as soon as they are complete, e.g. their end is
+             fixed and no more children may be added. The main section is
+             yielded last.
+    '''
+    if main_section is None:
+        main_section = get_section(header, meta_search_limit)
+    section_stack = [main_section]
+    chunk_stack = []  # tuples (chunk, section or None)
+    prev_end = None
+    first = True
     for chunk in chunks:
-        section = get_section(chunk)
+        while chunk_stack and chunk_stack[-1][0].level >= chunk.level:
+            _close_chunk(*chunk_stack.pop(), prev_end)
+        prev_end = chunk.end
+
+        section = get_section(chunk, meta_search_limit)
+        if first:
+            first = False
+            if not section and chunk.level == 1:
+                # if the first heading is of level 1 (#) and doesn't have meta,
+                # set main section's title to this heading value
+                main_section.title = chunk.title
+
         if section:  # look for parent section
-            while section.level <= current_section.level:
-                current_section = current_section.parent
-            current_section.add_child(section)
-            current_section = section
+            while section.level <= section_stack[-1].level:
+                yield section_stack.pop()
+            section_stack[-1].add_child(section)
+            section_stack.append(section)
+        chunk_stack.append((chunk, section))
+
+    while chunk_stack:
+        _close_chunk(*chunk_stack.pop(), prev_end)
+    while section_stack:
+        yield section_stack.pop()
 
-    return chapter
 
+def _close_chunk(chunk: Chunk, section: Section or None, end: int):
+    '''Set the fixed end to the chunk and its section'''
+    chunk.end = end
+    if section:
+        section.end = end
 
-def split_by_headings(content: str) -> (Chunk, [Chunk]):
+
+def get_header_and_chunks(content: str, use_regex: bool = False):
     '''
-    Split content string into Chunk objects by headings. Return a tuple of
-    (header, chunks), where header is a Chunk object for header (content before
-    first heading), and chunks is a list of Chunk objects for other headings.
+    Split content string into Chunk objects by headings lazily. Chunks' `end`
+    parameters are not fixed (see fix_chunk_ends).
 
     :param content: content string to be split into chunks
+    :param use_regex: use the regex pipeline from the tools module instead of
+                      the single-pass scanner. Results are the same.
 
     :returns: a tuple with two elements:
         (a header Chunk object,
-         a list of title Chunk objects)
+         an iterator of title Chunk objects)
     '''
-
+    if use_regex:
+        header = Chunk(title='',
+                       level=0,
+                       content=get_header_content(content),
+                       start=0,
+                       end=len(content))
+        chunks = (Chunk(title, level, chunk_content, start, end)
+                  for title, level, chunk_content, start, end in iter_chunks(content))
+        return header, chunks
+
+    # meta tags found by the scanner are passed on, so that chunks are not
+    # searched for them again
+    scan_result = scan(content)
     header = Chunk(title='',
                    level=0,
-                   content=get_header_content(content),
+                   content=content[:scan_result.header_end],
                    start=0,
-                   end=len(content))
+                   end=len(content),
+                   meta_tag=scan_result.header_meta)
+    chunks = (Chunk(title, level, content[content_start:end], start, end,
+                    _get_relative_span(meta_tag, content_start))
+              for title, level, start, content_start, end, meta_tag in scan_result.chunks)
+    return header, chunks
 
-    chunks = []
-    for title, level, content, start, end in iter_chunks(content):
-        chunks.append(Chunk(title, level, content, start, end))
 
-    fix_chunk_ends(chunks)
+def _get_relative_span(meta_tag: tuple or None, offset: int) -> tuple or None:
+    if meta_tag is None:
+        return None
+    start, end, options = meta_tag
+    return start - offset, end - offset, options
+
+
+def split_by_headings(content: str, use_regex: bool = False) -> (Chunk, [Chunk]):
+    '''
+    Split content string into Chunk objects by headings. Return a tuple of
+    (header, chunks), where header is a Chunk object for header (content before
+    first heading), and chunks is a list of Chunk objects for other headings.
 
+    :param content: content string to be split into chunks
+    :param use_regex: use the regex pipeline from the tools module instead of
+                      the single-pass scanner. Results are the same.
+
+    :returns: a tuple with two elements:
+        (a header Chunk object,
+         a list of title Chunk objects)
+    '''
+    header, chunks = get_header_and_chunks(content, use_regex)
+    chunks = list(chunks)
+    fix_chunk_ends(chunks)
     return header, chunks
 
 
@@ -141,36 +506,71 @@ def fix_chunk_ends(chunks: list):
     the beginning of next heading. We need to fix that to the beginning of
     the next heading _of the same or higher level_.
 
+    Open chunks are kept in a stack, so each chunk is processed once.
+
     :param chunks: list of Chunk objects to be fixed
     '''
 
-    for i in range(len(chunks) - 1):
-        j = i + 1
-        while (chunks[j].level > chunks[i].level):
-            j += 1
-            if j == len(chunks):  # reached the end of the document
-                break
-        chunks[i].end = chunks[j - 1].end
+    stack = []
+    prev_end = None
+    for chunk in chunks:
+        while stack and stack[-1].level >= chunk.level:
+            stack.pop().end = prev_end
+        prev_end = chunk.end
+        stack.append(chunk)
+    for chunk in stack:
+        chunk.end = prev_end
 
 
-def get_section(chunk: Chunk) -> Section or None:
+def get_section(chunk: Chunk, meta_search_limit: int or None = None) -> Section or None:
     '''
     Parse chunk content and create a Section object from its metadata.
     If no metadata in chunk — return None.
+
+    :param chunk: Chunk object to parse.
+    :param meta_search_limit: if specified, meta tag is only looked for within
+                              this number of characters from the beginning
+                              of the chunk content.
     '''
-    logger.debug(f'Parsing chunk {chunk}')
+    logger.debug('Parsing chunk %s', chunk)
     yfm_data = None
     if chunk.level == 0:  # main section
         # main section must always be present in header (0-level chunk), but it
         # may be overriden by metadata in <meta> tag, which has higher priority
         yfm_data = get_meta_dict_from_yfm(chunk.content)
 
-    tag_data = get_meta_dict_from_meta_tag(chunk.content)
+    if chunk.meta_tag is NOT_SCANNED:
+        tag_data = get_meta_dict_from_meta_tag(chunk.content, meta_search_limit)
+    else:
+        tag_data = get_meta_dict_from_scanned_tag(chunk.meta_tag, meta_search_limit)
 
     data = tag_data if tag_data is not None else yfm_data
-    title = re.sub('{#.+?}$', '', chunk.title).strip()
     if data is not None:
-        logger.debug(f'Adding section. Title: {title}, data: {data}')
+        title = re.sub('{#.+?}$', '', chunk.title).strip()
+        logger.debug('Adding section. Title: %s, data: %s', title, data)
         result = Section(chunk.level, chunk.start, chunk.end,
                          data, title=title)
         return result
+
+
+def get_meta_dict_from_scanned_tag(meta_tag: tuple or None,
+                                   meta_search_limit: int or None = None) -> dict or None:
+    '''
+    Scanner counterpart of tools.get_meta_dict_from_meta_tag: load metadata
+    from the meta tag already found in the chunk.
+
+    :param meta_tag: Chunk.meta_tag of a scanned chunk.
+    :param meta_search_limit: if specified, the meta tag is only considered if
+                              it starts within this number of characters from
+                              the beginning of the chunk content.
+
+    :returns: meta dict or None if there is no meta tag.
+    '''
+    if meta_tag is None:
+        return None
+    start, _, option_string = meta_tag
+    if meta_search_limit is not None and start >= meta_search_limit:
+        # the first tag is beyond the limit, so all the others are too
+        return None
+    logger.debug('Found meta tag at %s', start)
+    return get_meta_dict_from_options(option_string)
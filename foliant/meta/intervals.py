@@ -0,0 +1,101 @@
+'''
+Interval index of chapter sections for looking up sections by offset.
+
+Sections are stored in the order of Chapter.iter_sections, which is the order
+of their start offsets. Section ends are kept in a max segment tree, so the
+last section containing an offset, and all sections overlapping a range, are
+found without scanning the whole chapter.
+'''
+
+from bisect import bisect_left
+from bisect import bisect_right
+
+NO_END = float('-inf')
+
+
+class SectionIntervalIndex:
+    '''
+    Index of sections, given in the order of their start offsets, answering
+    offset queries in O(log n).
+    '''
+
+    def __init__(self, sections: list):
+        '''
+        :param sections: list of Section objects, sorted by their start
+                         offsets (use is_sorted to check).
+        '''
+        self.sections = sections
+        self.starts = [section.start for section in sections]
+        size = 1
+        while size < len(sections):
+            size *= 2
+        self._size = size
+        self._tree = [NO_END] * (2 * size)
+        for ind, section in enumerate(sections):
+            self._tree[size + ind] = section.end
+        for node in range(size - 1, 0, -1):
+            self._tree[node] = max(self._tree[2 * node], self._tree[2 * node + 1])
+
+    @staticmethod
+    def is_sorted(sections: list) -> bool:
+        '''Check whether the sections are sorted by their start offsets.'''
+        return all(sections[i].start <= sections[i + 1].start
+                   for i in range(len(sections) - 1))
+
+    def find(self, offset: int):
+        '''
+        Find the last section (in the original order) which starts before or
+        at the offset and ends after or at it. For a section tree this is the
+        lowest-level section containing the offset.
+
+        :param offset: offset of the place in source.
+
+        :returns: Section object or None if there's no such section.
+        '''
+        limit = bisect_right(self.starts, offset)
+        ind = self._find_last(1, 0, self._size, limit, offset)
+        return self.sections[ind] if ind is not None else None
+
+    def find_overlapping(self, start: int, end: int) -> list:
+        '''
+        Find all sections overlapping the range [start, end), that is starting
+        before its end and ending after its start.
+
+        :param start: start of the range.
+        :param end: end of the range.
+
+        :returns: list of Section objects in the original order.
+        '''
+        result = []
+        limit = bisect_left(self.starts, end)
+        self._collect(1, 0, self._size, limit, start, result)
+        return [self.sections[ind] for ind in result]
+
+    def _find_last(self, node: int, lo: int, hi: int, limit: int, offset: int) -> int or None:
+        '''Index of the last section before limit with end >= offset'''
+        if lo >= limit or self._tree[node] < offset:
+            return None
+        if hi - lo == 1:
+            return lo
+        mid = (lo + hi) // 2
+        result = self._find_last(2 * node + 1, mid, hi, limit, offset)
+        if result is None:
+            result = self._find_last(2 * node, lo, mid, limit, offset)
+        return result
+
+    def _collect(self, node: int, lo: int, hi: int, limit: int, start: int, result: list):
+        '''Add indexes of all sections before limit with end > start'''
+        if lo >= limit or self._tree[node] <= start:
+            return
+        if hi - lo == 1:
+            result.append(lo)
+            return
+        mid = (lo + hi) // 2
+        self._collect(2 * node, lo, mid, limit, start, result)
+        self._collect(2 * node + 1, mid, hi, limit, start, result)
+
+    def __len__(self):
+        return len(self.sections)
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}: {len(self.sections)} sections>'
@@ -0,0 +1,129 @@
+'''
+Indexing of meta files for loading chapters on demand.
+
+The index records which part of the meta file belongs to each chapter, so
+that chapters may be parsed one by one later. It relies on the layout of the
+files produced by the meta generate command: the `chapters` list is a
+top-level block sequence, and each chapter is a mapping with the `section`
+key after `name` and `filename`.
+'''
+
+import io
+
+from pathlib import PosixPath
+
+from .tools import load_yaml
+
+
+class ChapterIndexEntry:
+    '''
+    Mini-class for the part of the meta file which holds one chapter: its
+    name, filename and the byte offsets of the part.
+    '''
+
+    __slots__ = ['name', 'filename', 'start', 'end']
+
+    def __init__(self, name: str, filename: str, start: int, end: int):
+        self.name = name
+        self.filename = filename
+        self.start = start
+        self.end = end
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}: {self.name}>'
+
+
+def decode(raw_source: bytes) -> str:
+    '''Decode part of the meta file the same way as open(filename).read() does'''
+    with io.TextIOWrapper(io.BytesIO(raw_source)) as f:
+        return f.read()
+
+
+def index_meta_file(filename: str or PosixPath) -> (str, list) or None:
+    '''
+    Find the part of the meta file which belongs to each chapter, reading the
+    file line by line. Only the name and the filename of each chapter are
+    parsed.
+
+    :param filename: path to the meta file.
+
+    :returns: a tuple (source of the meta file without the chapters list
+              items, list of ChapterIndexEntry objects) or None if the file
+              layout is not recognized.
+    '''
+    rest = []
+    entries = []
+    in_chapters = False
+    header = None  # lines of the current chapter before the section key
+    start = None  # offset of the current chapter
+    pos = 0
+
+    def close_chapter() -> bool:
+        if header is not None:
+            # section key not found
+            return False
+        entries[-1].end = pos
+        return True
+
+    with open(filename, 'rb') as f:
+        for line in f:
+            if in_chapters and line[:1] not in (b' ', b'-', b'#', b'\r', b'\n'):
+                # next top-level key
+                if entries and not close_chapter():
+                    return None
+                in_chapters = False
+
+            if not in_chapters:
+                rest.append(line)
+                if line.rstrip() == b'chapters:':
+                    in_chapters = True
+            elif line.startswith(b'- '):
+                if entries and not close_chapter():
+                    return None
+                header = [line]
+                start = pos
+                entries.append(None)
+            elif header is not None:
+                if line.startswith(b'  section:'):
+                    entry = _parse_chapter_header(b''.join(header), start)
+                    if entry is None:
+                        return None
+                    entries[-1] = entry
+                    header = None
+                else:
+                    header.append(line)
+            elif not entries and line.strip():
+                return None
+            pos += len(line)
+
+    if in_chapters and entries and not close_chapter():
+        return None
+    return decode(b''.join(rest)), entries
+
+
+def _parse_chapter_header(raw_header: bytes, start: int) -> ChapterIndexEntry or None:
+    try:
+        header = load_yaml(decode(raw_header))
+    except Exception:
+        return None
+    if type(header) is not list or len(header) != 1 or type(header[0]) is not dict:
+        return None
+    name = header[0].get('name')
+    filename = header[0].get('filename')
+    if not isinstance(name, str) or not isinstance(filename, str):
+        return None
+    return ChapterIndexEntry(name, filename, start, None)
+
+
+def read_chapter_source(filename: str or PosixPath, entry: ChapterIndexEntry) -> str:
+    '''
+    Read the part of the meta file which belongs to the chapter.
+
+    :param filename: path to the meta file.
+    :param entry: ChapterIndexEntry of the chapter.
+
+    :returns: YAML source of a list with one chapter.
+    '''
+    with open(filename, 'rb') as f:
+        f.seek(entry.start)
+        return decode(f.read(entry.end - entry.start))
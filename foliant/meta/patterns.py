@@ -16,8 +16,42 @@ OPTION_PATTERN = re.compile(
     flags=re.DOTALL
 )
 
+# Option values which YAML loads as a single plain scalar equal to the value
+# itself (before resolving its type): no indicators, comments, line breaks or
+# leading/trailing spaces.
+PLAIN_SCALAR_PATTERN = re.compile(r'(?:\w|[-+.](?=\w))[\w .,+\-/()\'"]*(?<! )')
+
+DECIMAL_INT_PATTERN = re.compile(r'[-+]?(?:0|[1-9][0-9]*)')
+
+DECIMAL_FLOAT_PATTERN = re.compile(r'[-+]?[0-9]+\.[0-9]*(?:[eE][-+][0-9]+)?')
+
+# YAML sources which may be loaded differently by libyaml and by the pure-Python
+# loader: tabs, BOMs, tags (a bare non-specific `!` tag gives '' in libyaml
+# and None in the pure-Python loader), comments right after block scalar
+# headers or flow indicators.
+LIBYAML_UNSAFE_SOURCE_PATTERN = re.compile(r'[\t\ufeff!]|[|>][-+0-9]*#|[\[\]{},]#')
+
+# Strings which may be dumped differently by libyaml and by the pure-Python
+# emitter: anything that requires double-quoted style.
+LIBYAML_UNSAFE_STRING_PATTERN = re.compile(
+    '[^\x20-\x7e\xa0-\u2027\u202a-\ud7ff\ue000-\ufefe\uff00-\ufffd]'
+)
+
+# Parts of a title which make up its id
+ID_WORD_PATTERN = re.compile(r'\w+')
+
 HEADER_PATTERN = re.compile(r'^(?P<content>[\s\S]*?)(?=^#{1,6} .+)',
                             flags=re.MULTILINE)
 
 CHUNK_PATTERN = re.compile(r'^(?P<level>#{1,6}) (?P<title>.+)\n(?P<content>(^(?!#{1,6} ).*\n?)+)',
                            flags=re.MULTILINE)
+
+# Structural tokens of a Markdown source for the single-pass scanner: heading
+# markers at line starts, opening and closing meta tags. The pattern starts
+# with a character set to let the regex engine skip plain text quickly.
+STRUCTURE_PATTERN = re.compile(
+    r'[#\<](?:(?<=^#)(?P<heading>#{0,5}) |(?P<close>\/meta\>)|(?<!\<\<)(?P<open>meta))',
+    flags=re.MULTILINE
+)
+
+META_OPEN_TAG_PATTERN = re.compile(r'\<meta(\s(?P<options>[^\<\>]*))?\>')
@@ -0,0 +1,175 @@
+'''
+Hooks called during metadata generation and a profiler built on them.
+
+Hooks are passed to load_meta and are called in the main process:
+
+    chapter_start(name), phase_start(phase), phase_finish(phase, elapsed),
+    chapter_finish(name, chapter, elapsed)
+
+Phases of each chapter are `read` (reading the file), `cache` (looking up and
+saving the chapter in the chapter cache), `split` (splitting the source by
+headings), `sections` (parsing meta tags and YAML Front Matter and building
+the section tree), `byte_offsets` and `stream` (parsing a large chapter in
+streaming mode). Phases outside of chapters are `process_ids`, and, in the
+generate command, `to_dict` and `yaml_dump`. When no hooks are passed, nothing
+is measured.
+'''
+
+import cProfile
+
+from contextlib import nullcontext
+from pathlib import PosixPath
+from time import perf_counter
+
+# returned by phase() when no hooks are passed
+NULL_PHASE = nullcontext()
+
+
+class MetaHooks:
+    '''
+    Base class of metadata generation hooks. All methods do nothing,
+    subclasses override the ones they need.
+    '''
+
+    def chapter_start(self, name: str):
+        '''Called before a chapter is loaded.'''
+
+    def chapter_finish(self, name: str, chapter, elapsed: float):
+        '''
+        Called after a chapter is loaded.
+
+        :param name: chapter name.
+        :param chapter: loaded Chapter object or None if the file is missing.
+        :param elapsed: time spent on the chapter, in seconds.
+        '''
+
+    def phase_start(self, phase: str):
+        '''Called before a phase starts.'''
+
+    def phase_finish(self, phase: str, elapsed: float):
+        '''
+        Called after a phase is finished.
+
+        :param phase: phase name.
+        :param elapsed: time spent in the phase, in seconds.
+        '''
+
+
+class _Phase:
+    __slots__ = ['hooks', 'name', 'start']
+
+    def __init__(self, hooks: MetaHooks, name: str):
+        self.hooks = hooks
+        self.name = name
+
+    def __enter__(self):
+        self.hooks.phase_start(self.name)
+        self.start = perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.hooks.phase_finish(self.name, perf_counter() - self.start)
+
+
+def phase(hooks: MetaHooks or None, name: str):
+    '''
+    Context manager which reports a phase to the hooks.
+
+    :param hooks: MetaHooks object or None.
+    :param name: phase name.
+
+    :returns: a context manager, which does nothing if hooks are None.
+    '''
+    if hooks is None:
+        return NULL_PHASE
+    return _Phase(hooks, name)
+
+
+class Profiler(MetaHooks):
+    '''
+    Hooks which collect timings and call counts of phases and chapters. May be
+    used as a context manager to measure the total time and, optionally, to
+    profile all function calls with cProfile.
+    '''
+
+    def __init__(self, calls: bool = False):
+        '''
+        :param calls: profile function calls with cProfile while the profiler
+                      is used as a context manager.
+        '''
+        self.phases = {}  # {phase: [calls, seconds]}
+        self.chapters = {}  # {chapter name: {'time', 'sections', 'phases'}}
+        self.total = None
+        self.profile = cProfile.Profile() if calls else None
+        self._chapter = None
+        self._start = None
+
+    def chapter_start(self, name: str):
+        self._chapter = self.chapters[name] = {'time': 0.0, 'sections': 0, 'phases': {}}
+
+    def chapter_finish(self, name: str, chapter, elapsed: float):
+        record = self.chapters[name]
+        record['time'] = elapsed
+        if chapter is not None:
+            record['sections'] = sum(1 for _ in chapter.iter_sections())
+        self._chapter = None
+
+    def phase_finish(self, phase: str, elapsed: float):
+        stats = self.phases.setdefault(phase, [0, 0.0])
+        stats[0] += 1
+        stats[1] += elapsed
+        if self._chapter is not None:
+            phases = self._chapter['phases']
+            phases[phase] = phases.get(phase, 0.0) + elapsed
+
+    def get_slowest_chapters(self, count: int = 10) -> list:
+        '''
+        :returns: list of tuples (chapter name, record) for the slowest
+                  chapters, the slowest first.
+        '''
+        items = sorted(self.chapters.items(), key=lambda item: item[1]['time'], reverse=True)
+        return items[:count]
+
+    def dump_stats(self, filename: str or PosixPath):
+        '''Save cProfile statistics in the pstats format.'''
+        if self.profile is None:
+            raise ValueError('Function calls were not profiled')
+        self.profile.dump_stats(str(filename))
+
+    def format_report(self, top: int = 10) -> str:
+        '''
+        :param top: number of the slowest chapters to show.
+
+        :returns: human-readable report of the phases and the slowest
+                  chapters.
+        '''
+        total = self.total
+        if total is None:
+            total = sum(seconds for _, seconds in self.phases.values())
+        lines = [f'Total: {total:.3f} s, {len(self.chapters)} chapters', '',
+                 f'{"phase":<16}{"calls":>8}{"time, s":>12}{"share":>8}']
+        for name, (calls, seconds) in sorted(self.phases.items(),
+                                             key=lambda item: item[1][1],
+                                             reverse=True):
+            share = seconds / total * 100 if total else 0
+            lines.append(f'{name:<16}{calls:>8}{seconds:>12.4f}{share:>7.1f}%')
+
+        slowest = self.get_slowest_chapters(top)
+        if slowest:
+            lines += ['', 'Slowest chapters:']
+            for name, record in slowest:
+                phases = ', '.join(f'{phase} {seconds:.4f}'
+                                   for phase, seconds in record['phases'].items())
+                lines.append(f'{record["time"]:.4f} s  {name} '
+                             f'({record["sections"]} sections; {phases})')
+        return '\n'.join(lines)
+
+    def __enter__(self):
+        self._start = perf_counter()
+        if self.profile is not None:
+            self.profile.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.profile is not None:
+            self.profile.disable()
+        self.total = perf_counter() - self._start
@@ -0,0 +1,253 @@
+'''
+Single-pass scanner of Markdown structure.
+
+The scanner finds YAML Front Matter, headings, chunk boundaries and meta tags
+in one pass of STRUCTURE_PATTERN over the source, instead of applying
+HEADER_PATTERN, CHUNK_PATTERN, YFM_PATTERN and META_TAG_PATTERN separately.
+Results are identical to the regex pipeline in the tools module, which is
+still available as a fallback.
+'''
+
+from bisect import bisect_left
+from time import perf_counter
+
+from .patterns import CHUNK_PATTERN
+from .patterns import HEADER_PATTERN
+from .patterns import META_OPEN_TAG_PATTERN
+from .patterns import META_TAG_PATTERN
+from .patterns import STRUCTURE_PATTERN
+from .patterns import YFM_PATTERN
+from .tools import get_header_content
+from .tools import iter_chunks
+
+CLOSE_TAG_LENGTH = len('</meta>')
+
+
+class ScanResult:
+    '''
+    Mini-class for the structure of a Markdown source found by the scanner.
+
+    yfm         — (start, end) of the YAML Front Matter, including the dashes,
+                  as found by YFM_PATTERN, or None;
+    yfm_offset  — offset of the first position after the YFM, which is cut out
+                  before splitting into chunks (0 if there's no YFM);
+    header_end  — end of the header (content before the first heading);
+    header_meta — span of the first meta tag in the header;
+    chunks      — list of tuples (title, level, start, content start, end,
+                  meta tag span) for each heading;
+    tokens      — number of structural tokens found.
+
+    Meta tag spans are tuples (start, end, options string or None).
+    '''
+
+    __slots__ = ['yfm', 'yfm_offset', 'header_end', 'header_meta', 'chunks', 'tokens']
+
+    def __init__(self, yfm, yfm_offset, header_end, header_meta, chunks, tokens):
+        self.yfm = yfm
+        self.yfm_offset = yfm_offset
+        self.header_end = header_end
+        self.header_meta = header_meta
+        self.chunks = chunks
+        self.tokens = tokens
+
+    def __repr__(self):
+        return f'<ScanResult: {len(self.chunks)} chunks>'
+
+
+def find_yfm(source: str) -> (tuple or None, int):
+    '''
+    Find YAML Front Matter boundaries the same way as YFM_PATTERN (for the
+    metadata) and iter_chunks (for the chunk offsets) do.
+
+    :param source: source string to search.
+
+    :returns: a tuple (YFM span or None, offset after the YFM cut out
+              before splitting into chunks).
+    '''
+    yfm = None
+    if source.startswith('---'):
+        # YFM_PATTERN is lazy: the first `---` at a line start closes YFM
+        pos = source.find('\n---', 4)
+        if pos != -1:
+            yfm = (0, pos + 4)
+
+    yfm_offset = 0
+    if source.startswith('---\n'):
+        # iter_chunks pattern is greedy: the last line consisting of `---`
+        # closes YFM
+        length = len(source)
+        pos = source.rfind('\n---')
+        while pos >= 4:
+            if pos + 4 == length or source[pos + 4] == '\n':
+                yfm_offset = pos + 4
+                break
+            pos = source.rfind('\n---', 0, pos + 3)
+    return yfm, yfm_offset
+
+
+def find_meta_tag(source: str,
+                  opens: list,
+                  closes: list,
+                  start: int,
+                  end: int) -> tuple or None:
+    '''
+    Find the first meta tag inside source[start:end], which is what
+    META_TAG_PATTERN.search(source[start:end]) would find.
+
+    :param source: the whole source string.
+    :param opens: sorted positions of opening meta tags.
+    :param closes: sorted positions of closing meta tags.
+    :param start: start of the searched range.
+    :param end: end of the searched range.
+
+    :returns: tuple (tag start, tag end, options string or None) or None.
+    '''
+    ind = bisect_left(opens, start)
+    while ind < len(opens) and opens[ind] < end:
+        open_match = META_OPEN_TAG_PATTERN.match(source, opens[ind], end)
+        ind += 1
+        if not open_match:
+            continue
+        close_ind = bisect_left(closes, open_match.end())
+        if close_ind == len(closes) or closes[close_ind] + CLOSE_TAG_LENGTH > end:
+            # tags opened later can't be closed before `end` either
+            break
+        return (open_match.start(),
+                closes[close_ind] + CLOSE_TAG_LENGTH,
+                open_match.group('options'))
+    return None
+
+
+def scan(source: str) -> ScanResult:
+    '''
+    Scan Markdown source and find its structure in one pass.
+
+    :param source: source string to scan.
+
+    :returns: a ScanResult object.
+    '''
+    headings = []
+    opens = []
+    closes = []
+    tokens = 0
+    for match in STRUCTURE_PATTERN.finditer(source):
+        tokens += 1
+        kind = match.lastgroup
+        if kind == 'heading':
+            headings.append((match.start(), len(match.group('heading')) + 1))
+        elif kind == 'open':
+            opens.append(match.start())
+        else:
+            closes.append(match.start())
+
+    length = len(source)
+    yfm, yfm_offset = find_yfm(source)
+
+    header_end = length
+    for pos, level in headings:
+        # heading must have a title to end the header
+        title_start = pos + level + 1
+        if title_start < length and source[title_start] != '\n':
+            header_end = pos
+            break
+    header_meta = find_meta_tag(source, opens, closes, 0, header_end)
+
+    boundaries = [h for h in headings if h[0] >= yfm_offset]
+    chunks = []
+    for ind, (pos, level) in enumerate(boundaries):
+        if ind + 1 < len(boundaries):
+            end = boundaries[ind + 1][0]
+        else:
+            end = length
+        line_end = source.find('\n', pos, end)
+        if line_end == -1:
+            # heading must end with a line break
+            continue
+        title = source[pos + level + 1:line_end]
+        content_start = line_end + 1
+        if not title or (ind + 1 < len(boundaries) and content_start == end):
+            # heading must have a title and must not be followed by
+            # another heading
+            continue
+        meta_tag = find_meta_tag(source, opens, closes, content_start, end)
+        chunks.append((title, level, pos, content_start, end, meta_tag))
+
+    return ScanResult(yfm, yfm_offset, header_end, header_meta, chunks, tokens)
+
+
+def iter_scanned_chunks(source: str, scan_result: ScanResult or None = None):
+    '''
+    Scanner counterpart of tools.iter_chunks.
+
+    :param source: source string to parse.
+    :param scan_result: ScanResult for this source, if it is already scanned.
+
+    :returns: iterator yielding tuple:
+        (heading title,
+         heading level,
+         heading content,
+         start position,
+         end position)
+    '''
+    if scan_result is None:
+        scan_result = scan(source)
+    for title, level, start, content_start, end, _ in scan_result.chunks:
+        yield title, level, source[content_start:end], start, end
+
+
+def compare_with_regex(source: str, repeat: int = 5) -> dict:
+    '''
+    Measure the scanner against the regex pipeline (header, chunks and meta
+    tags search) on the source.
+
+    Passes are counted as the number of characters examined by all pattern
+    applications, divided by the source length.
+
+    :param source: source string to measure on.
+    :param repeat: number of runs, the best time is taken.
+
+    :returns: dictionary {'scanner': stats, 'regex': stats}, where stats is
+              a dictionary with `passes`, `seconds` and `chars_per_second`
+              keys.
+    '''
+    def run_regex():
+        header = get_header_content(source)
+        YFM_PATTERN.search(header)
+        META_TAG_PATTERN.search(header)
+        for chunk in iter_chunks(source):
+            META_TAG_PATTERN.search(chunk[2])
+
+    def run_scanner():
+        scan(source)
+
+    def best_time(func) -> float:
+        result = None
+        for _ in range(repeat):
+            start = perf_counter()
+            func()
+            elapsed = perf_counter() - start
+            result = elapsed if result is None else min(result, elapsed)
+        return result
+
+    length = len(source) or 1
+    result = scan(source)
+    header_match = HEADER_PATTERN.search(source)
+    header_length = header_match.end() if header_match else len(source)
+    regex_chars = header_length * 3  # HEADER, YFM and META_TAG patterns
+    if result.yfm_offset:
+        regex_chars += len(source)  # greedy YFM cut-out pattern
+    regex_chars += len(source) - result.yfm_offset  # CHUNK_PATTERN
+    regex_chars += sum(len(m.group('content'))
+                       for m in CHUNK_PATTERN.finditer(source[result.yfm_offset:]))
+    scanner_chars = len(source)
+    if result.yfm_offset:
+        scanner_chars += len(source) - result.yfm_offset  # backward YFM search
+
+    stats = {}
+    for name, func, chars in (('scanner', run_scanner, scanner_chars),
+                              ('regex', run_regex, regex_chars)):
+        seconds = best_time(func)
+        stats[name] = {'passes': chars / length,
+                       'seconds': seconds,
+                       'chars_per_second': len(source) / seconds if seconds else None}
+    return stats
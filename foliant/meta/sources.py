@@ -0,0 +1,183 @@
+'''Module defining in-memory cache of chapter sources and meta tag spans'''
+
+import os
+import re
+
+from bisect import bisect_left
+from bisect import bisect_right
+from collections import OrderedDict
+from pathlib import PosixPath
+
+from .patterns import META_TAG_PATTERN
+from .tools import remove_meta
+
+DEFAULT_SIZE_LIMIT = 64 * 1024 * 1024  # 64 MB
+
+LEADING_SPACE_PATTERN = re.compile(r'[ \n]*')
+
+
+class MetaSpans:
+    '''
+    Positions of all meta tags in a chapter source, found in one pass. Used to
+    cut meta out of parts of the source without searching for tags again.
+    '''
+
+    __slots__ = ['starts', 'ends']
+
+    def __init__(self, source: str):
+        '''
+        :param source: chapter source.
+        '''
+        self.starts = []
+        self.ends = []
+        for match in META_TAG_PATTERN.finditer(source):
+            self.starts.append(match.start())
+            self.ends.append(match.end())
+
+    def remove_meta(self, source: str, start: int, end: int) -> str:
+        '''
+        Same as tools.remove_meta(source[start:end]), but known meta tags are
+        spliced out instead of searching for them.
+
+        :param source: chapter source the spans were found in.
+        :param start: start of the part of the source.
+        :param end: end of the part of the source.
+
+        :returns: the part of the source with meta tags removed.
+        '''
+        if not 0 <= start <= end <= len(source):
+            return remove_meta(source[start:end])
+
+        text_start = start
+        if source.startswith('---', start):
+            # same as YFM_PATTERN: the first `---` at a line start closes YFM
+            yfm_end = source.find('\n---', start + 4, end)
+            if yfm_end != -1:
+                text_start = yfm_end + 4
+        text_start = LEADING_SPACE_PATTERN.match(source, text_start, end).end()
+
+        first = bisect_right(self.ends, text_start)
+        last = bisect_left(self.starts, end)
+        if ((text_start > 0 and source[text_start - 1] == '<')
+                or (first < len(self.starts) and self.starts[first] < text_start)
+                or (last > first and self.ends[last - 1] > end)):
+            # tags crossing the part boundaries may be found differently in
+            # the part alone
+            return remove_meta(source[start:end])
+
+        pieces = []
+        pos = text_start
+        for ind in range(first, last):
+            pieces.append(source[pos:self.starts[ind]])
+            pos = self.ends[ind]
+        pieces.append(source[pos:end])
+        return ''.join(pieces)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}: {len(self.starts)} tags>'
+
+
+class ChapterSourceCache:
+    '''
+    LRU cache of chapter sources, read the same way as
+    open(filename, encoding='utf8').read() does, and their meta tag spans.
+
+    Entries are keyed by the absolute chapter path and are valid while the
+    file's mtime and size are the same as they were when it was read. The
+    total size of cached files is kept under size_limit; files larger than
+    the limit are not cached.
+    '''
+
+    def __init__(self, size_limit: int = DEFAULT_SIZE_LIMIT):
+        '''
+        :param size_limit: maximum total size of cached files in bytes.
+        '''
+        self.size_limit = size_limit
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, filename: str or PosixPath) -> str:
+        '''
+        Get chapter source, reading the file if it is not cached or changed
+        since it was cached.
+
+        :param filename: path to the chapter file.
+
+        :returns: chapter source.
+        '''
+        return self._get_entry(filename)[0][1]
+
+    def get_with_spans(self, filename: str or PosixPath) -> (str, MetaSpans or None):
+        '''
+        Same as get, but meta tag spans of the source are returned too. Spans
+        are found on the first call and cached with the source. Spans are not
+        found for files which are too large to be cached, since they would be
+        thrown away after one use.
+
+        :param filename: path to the chapter file.
+
+        :returns: a tuple (chapter source, MetaSpans object or None if the
+                  file is not cached).
+        '''
+        entry, cached = self._get_entry(filename)
+        if not cached:
+            return entry[1], None
+        if entry[2] is None:
+            entry[2] = MetaSpans(entry[1])
+        return entry[1], entry[2]
+
+    def _get_entry(self, filename: str or PosixPath) -> (list, bool):
+        '''
+        :returns: a tuple (entry [file state, source, MetaSpans object or
+                  None], True if the entry is cached).
+        '''
+        path_ = os.path.abspath(filename)
+        stat = os.stat(path_)
+        state = (stat.st_mtime_ns, stat.st_size)
+        entry = self._entries.get(path_)
+        if entry is not None:
+            if entry[0] == state:
+                self._entries.move_to_end(path_)
+                self.hits += 1
+                return entry, True
+            self._remove(path_)
+
+        self.misses += 1
+        with open(path_, encoding='utf8') as f:
+            entry = [state, f.read(), None]
+        cached = stat.st_size <= self.size_limit
+        if cached:
+            self._entries[path_] = entry
+            self.size += stat.st_size
+        # the limit may have been lowered since the last call
+        while self.size > self.size_limit:
+            self._remove(next(iter(self._entries)))
+        return entry, cached
+
+    def fits(self, filename: str or PosixPath) -> bool:
+        '''Check whether the chapter file is small enough to be cached.'''
+        return os.path.getsize(filename) <= self.size_limit
+
+    def clear(self):
+        '''Remove all entries.'''
+        self._entries.clear()
+        self.size = 0
+
+    def _remove(self, path_: str):
+        state = self._entries.pop(path_)[0]
+        self.size -= state[1]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}: {len(self._entries)} files, {self.size} bytes>'
+
+
+# cache shared by all Section objects
+source_cache = ChapterSourceCache()
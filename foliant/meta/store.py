@@ -0,0 +1,225 @@
+'''
+Compact read-only storage of sections.
+
+Numeric fields of all sections (level, offsets, parent index) are kept in
+array columns, titles, ids and data in plain lists, so a large registry takes
+a fraction of the memory used by Section objects. Sections are stored in the
+order of Meta.iter_sections, which makes each subtree a contiguous range.
+Section objects are materialized as light views on access.
+'''
+
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_right
+
+from .classes import BaseSection
+from .classes import Chapter
+from .classes import MetaSectionDoesNotExistError
+
+NO_VALUE = -1  # None in numeric columns
+
+
+class SectionStore:
+    '''
+    Read-only compact storage of the sections of a list of chapters.
+
+    Chapters restored from the store are StoreChapter objects with
+    SectionView main sections, so they support the same methods as the
+    original ones.
+    '''
+
+    def __init__(self, chapters):
+        '''
+        :param chapters: iterable of Chapter objects, e.g. a Meta object.
+        '''
+        self.levels = array('b')
+        self.starts = array('q')
+        self.ends = array('q')
+        self.start_bytes = array('q')
+        self.end_bytes = array('q')
+        self.parents = array('q')
+        self.titles = []
+        self.ids = []
+        self.data = []
+        self.chapters = []
+        self.main_indices = array('q')  # index of the main section of each chapter
+        self._id_index = None
+
+        for chapter in chapters:
+            self._add_chapter(chapter)
+
+        # each section's subtree ends where the subtree of its last child does
+        self.subtree_ends = array('q', range(1, len(self.levels) + 1))
+        for ind in range(len(self.levels) - 1, -1, -1):
+            parent_ind = self.parents[ind]
+            if parent_ind != NO_VALUE and self.subtree_ends[parent_ind] < self.subtree_ends[ind]:
+                self.subtree_ends[parent_ind] = self.subtree_ends[ind]
+
+    def _add_chapter(self, chapter: Chapter):
+        main_ind = len(self.levels)
+        stack = [(chapter.main_section, NO_VALUE)]
+        while stack:
+            section, parent_ind = stack.pop()
+            ind = len(self.levels)
+            self.levels.append(section.level)
+            self.starts.append(section.start)
+            self.ends.append(section.end)
+            self.start_bytes.append(NO_VALUE if section.start_byte is None else section.start_byte)
+            self.end_bytes.append(NO_VALUE if section.end_byte is None else section.end_byte)
+            self.parents.append(parent_ind)
+            self.titles.append(section.title)
+            self.ids.append(section.id)
+            self.data.append(section.data)
+            stack.extend((child, ind) for child in reversed(section.children))
+
+        result = StoreChapter(chapter.filename, chapter.name)
+        result._main_section = SectionView(self, main_ind)
+        self.chapters.append(result)
+        self.main_indices.append(main_ind)
+
+    def get_by_id(self, id_: str) -> SectionView:
+        '''
+        Get section by its id. If there are several sections with the same
+        id, the first one is returned.
+
+        :param id_: section id.
+
+        :returns: SectionView object or raises MetaSectionDoesNotExistError.
+        '''
+        if self._id_index is None:
+            self._id_index = {}
+            for ind, section_id in enumerate(self.ids):
+                self._id_index.setdefault(section_id, ind)
+        if id_ not in self._id_index:
+            raise MetaSectionDoesNotExistError(f"Can't find section with id {id_}")
+        return self[self._id_index[id_]]
+
+    def iter_sections(self):
+        ''':yields: each section of each chapter in the correct order'''
+        for chapter in self.chapters:
+            yield from chapter.iter_sections()
+
+    def _get_chapter(self, ind: int) -> StoreChapter:
+        '''Chapter of the section with index ind'''
+        return self.chapters[bisect_right(self.main_indices, ind) - 1]
+
+    def __getitem__(self, ind: int) -> SectionView:
+        if not -len(self.levels) <= ind < len(self.levels):
+            raise IndexError('Section index out of range')
+        ind %= len(self.levels)
+        chapter = self._get_chapter(ind)
+        if chapter._main_section._ind == ind:
+            return chapter.main_section
+        return SectionView(self, ind)
+
+    def __len__(self):
+        return len(self.levels)
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}: {len(self.chapters)} chapters, {len(self.levels)} sections>'
+
+
+class StoreChapter(Chapter):
+    '''
+    Chapter restored from a SectionStore. Section views are created on each
+    access instead of being kept in a list, so that iterating over a large
+    store doesn't keep a view alive for every section.
+    '''
+
+    __slots__ = []
+
+    def iter_sections(self):
+        ''':yields: the main section and each subsection in the correct order'''
+        yield self._main_section
+        yield from self._main_section.iter_children()
+
+
+class SectionView(BaseSection):
+    '''
+    Section stored in a SectionStore. Has the same attributes and methods as
+    Section, but can't be changed.
+    '''
+
+    __slots__ = ['_store', '_ind']
+
+    def __init__(self, store: SectionStore, ind: int):
+        '''
+        :param store: SectionStore object holding the section.
+        :param ind: index of the section in the store.
+        '''
+        self._store = store
+        self._ind = ind
+
+    @property
+    def title(self):
+        return self._store.titles[self._ind]
+
+    @property
+    def level(self):
+        return self._store.levels[self._ind]
+
+    @property
+    def start(self):
+        return self._store.starts[self._ind]
+
+    @property
+    def end(self):
+        return self._store.ends[self._ind]
+
+    @property
+    def start_byte(self):
+        value = self._store.start_bytes[self._ind]
+        return None if value == NO_VALUE else value
+
+    @property
+    def end_byte(self):
+        value = self._store.end_bytes[self._ind]
+        return None if value == NO_VALUE else value
+
+    @property
+    def id(self):
+        return self._store.ids[self._ind]
+
+    @property
+    def data(self):
+        return self._store.data[self._ind]
+
+    @property
+    def chapter(self):
+        return self._store._get_chapter(self._ind)
+
+    @property
+    def parent(self):
+        parent_ind = self._store.parents[self._ind]
+        if parent_ind == NO_VALUE:
+            return None
+        return self._store[parent_ind]
+
+    @property
+    def children(self):
+        return list(self._iter_child_views())
+
+    def _iter_child_views(self):
+        store = self._store
+        ind = self._ind + 1
+        end = store.subtree_ends[self._ind]
+        while ind < end:
+            yield SectionView(store, ind)
+            ind = store.subtree_ends[ind]
+
+    def iter_children(self):
+        ''':yields: each subsection in the correct order'''
+        for ind in range(self._ind + 1, self._store.subtree_ends[self._ind]):
+            yield SectionView(self._store, ind)
+
+    def add_child(self, section: BaseSection):
+        raise AttributeError('Sections in SectionStore are read-only')
+
+    def __eq__(self, other):
+        return (isinstance(other, SectionView)
+                and self._store is other._store
+                and self._ind == other._ind)
+
+    def __hash__(self):
+        return hash((id(self._store), self._ind))
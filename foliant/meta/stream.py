@@ -0,0 +1,274 @@
+'''
+Streaming parser for very large chapters.
+
+The chapter file is read line by line, keeping track of character and byte
+offsets. Chunks are emitted as soon as the next heading is reached, and only
+the text needed to get metadata is kept for each chunk: the YAML Front Matter
+for the header and the meta tag for each chunk. So the memory used does not
+depend on the chapter size. Results are identical to the ones of
+generate.get_main_section.
+'''
+
+import re
+
+from logging import getLogger
+from pathlib import PosixPath
+
+from .classes import Section
+from .generate import Chunk
+from .generate import iter_sections
+from .patterns import META_OPEN_TAG_PATTERN
+from .tools import get_meta_dict_from_meta_tag
+from .tools import get_meta_dict_from_yfm
+from .tools import translate_newlines
+
+logger = getLogger('flt.meta')
+
+BOUNDARY_PATTERN = re.compile(r'(?P<level>#{1,6}) ')
+OPEN_TAG_PREFIX_PATTERN = re.compile(r'\<meta(\s[^\<\>]*)?')
+
+
+class MetaTagFinder:
+    '''
+    Finds the first meta tag in the text fed to it line by line, the same way
+    as META_TAG_PATTERN.search does. Only the text of the opening tag is kept
+    in memory.
+    '''
+
+    def __init__(self, search_limit: int or None = None):
+        '''
+        :param search_limit: if specified, only tags starting within this
+                             number of characters are considered.
+        '''
+        self.search_limit = search_limit
+        self.tag = None
+        self._fed = 0
+        self._buffer = None
+        self._buffer_start = 0
+        self._open_tag = None
+
+    def feed(self, line: str):
+        '''Process the next line of text.'''
+        if self.tag is None:
+            if self._open_tag is not None:
+                if '</meta>' in line:
+                    self.tag = self._open_tag + '</meta>'
+            elif self._buffer is not None:
+                self._process(self._buffer + line, self._buffer_start)
+            else:
+                ind = self._find_candidate(line, 0)
+                if ind != -1:
+                    self._process(line[ind:], self._fed + ind)
+        self._fed += len(line)
+
+    @staticmethod
+    def _find_candidate(text: str, start: int) -> int:
+        '''Find `<meta` which is not preceded by `<`'''
+        ind = text.find('<meta', start)
+        while ind > 0 and text[ind - 1] == '<':
+            ind = text.find('<meta', ind + 1)
+        return ind
+
+    def _process(self, text: str, start: int):
+        '''
+        :param text: text beginning with a tag candidate.
+        :param start: offset of the candidate from the beginning of the text
+                      fed.
+        '''
+        while True:
+            if self.search_limit is not None and start >= self.search_limit:
+                self._buffer = None
+                return
+            open_match = META_OPEN_TAG_PATTERN.match(text)
+            if open_match:
+                self._buffer = None
+                self._open_tag = open_match.group(0)
+                if '</meta>' in text[open_match.end():]:
+                    self.tag = self._open_tag + '</meta>'
+                return
+            if OPEN_TAG_PREFIX_PATTERN.fullmatch(text):
+                # opening tag continues on the next line
+                self._buffer = text
+                self._buffer_start = start
+                return
+            ind = self._find_candidate(text, 1)
+            if ind == -1:
+                self._buffer = None
+                return
+            text = text[ind:]
+            start += ind
+
+
+def iter_lines(filename: str or PosixPath):
+    '''
+    :param filename: path to the chapter file.
+
+    :yields: tuples (line with translated newlines, line length in bytes).
+    '''
+    with open(filename, encoding='utf8', newline='') as f:
+        for raw_line in f:
+            if raw_line.isascii():
+                byte_length = len(raw_line)
+            else:
+                byte_length = len(raw_line.encode('utf8'))
+            yield translate_newlines(raw_line), byte_length
+
+
+def get_yfm_offset(filename: str or PosixPath) -> int:
+    '''
+    Find the offset of the end of YAML Front Matter which is cut out before
+    splitting into chunks (see tools.iter_chunks). Like the original pattern,
+    YFM is closed by the last line consisting of `---`.
+
+    :returns: the offset or 0 if there's no YFM.
+    '''
+    result = 0
+    pos = 0
+    for line, _ in iter_lines(filename):
+        if pos == 0 and line != '---\n':
+            return 0
+        if pos >= 5 and line in ('---\n', '---'):
+            result = pos + 3
+        pos += len(line)
+    return result
+
+
+class ChapterStream:
+    '''
+    Splits chapter file into chunks in one pass over its lines.
+
+    Chunk objects produced contain only the metadata part of the content (the
+    YFM and the meta tag), not the full content.
+    '''
+
+    def __init__(self, filename: str or PosixPath, meta_search_limit: int or None = None):
+        self.filename = filename
+        self.meta_search_limit = meta_search_limit
+        self.byte_offsets = {0: 0}
+        self.length = 0
+
+    def get_header_and_chunks(self):
+        '''
+        Streaming counterpart of generate.get_header_and_chunks. The header is
+        read before returning, chunks are read lazily.
+
+        :returns: a tuple with two elements:
+            (a header Chunk object,
+             an iterator of title Chunk objects)
+        '''
+        yfm_offset = get_yfm_offset(self.filename)
+        self._lines = iter_lines(self.filename)
+        self._pos = 0
+        self._bpos = 0
+
+        finder = MetaTagFinder(self.meta_search_limit)
+        yfm_lines = None
+        yfm = ''
+        self._first_line = None
+        for line, byte_length in self._lines:
+            match = BOUNDARY_PATTERN.match(line)
+            if match and line[match.end():match.end() + 1] not in ('', '\n'):
+                # heading with a title ends the header
+                self._first_line = (line, byte_length)
+                break
+            if self._pos == 0 and line.startswith('---'):
+                yfm_lines = []
+            if yfm_lines is not None:
+                if self._pos >= 5 and line.startswith('---'):
+                    yfm = ''.join(yfm_lines) + '---\n'
+                    yfm_lines = None
+                else:
+                    yfm_lines.append(line)
+            finder.feed(line)
+            self._advance(line, byte_length)
+
+        self.header_yfm = yfm
+        self.header_tag = finder.tag
+        header = Chunk(title='',
+                       level=0,
+                       content=yfm + (finder.tag or ''),
+                       start=0,
+                       end=None)
+        return header, self._iter_chunks(yfm_offset, header)
+
+    def get_main_section(self, header: Chunk) -> Section:
+        '''
+        Create the main Section object from the header metadata, the same way
+        as generate.get_section does. YFM is parsed even if the meta tag
+        overrides it, so errors in it are reported in both cases.
+        '''
+        yfm_data = get_meta_dict_from_yfm(self.header_yfm)
+        tag_data = get_meta_dict_from_meta_tag(self.header_tag or '')
+        data = tag_data if tag_data is not None else yfm_data
+        return Section(0, header.start, header.end, data, title='')
+
+    def _advance(self, line: str, byte_length: int):
+        self._pos += len(line)
+        self._bpos += byte_length
+
+    def _iter_chunks(self, yfm_offset: int, header: Chunk):
+        current = None
+        pending = None
+
+        def lines():
+            if self._first_line:
+                yield self._first_line
+            yield from self._lines
+
+        for line, byte_length in lines():
+            match = BOUNDARY_PATTERN.match(line) if self._pos >= yfm_offset else None
+            if match:
+                if current:
+                    if pending is None:  # heading has some content
+                        yield self._close(current, self._pos)
+                    current = None
+                level = len(match.group('level'))
+                title = line[level + 1:-1]
+                if title and line.endswith('\n'):
+                    current = (title, level, self._pos, MetaTagFinder(self.meta_search_limit))
+                    pending = True
+                    self.byte_offsets[self._pos] = self._bpos
+            elif current:
+                pending = None
+                current[3].feed(line)
+            self._advance(line, byte_length)
+
+        self.length = self._pos
+        header.end = self._pos
+        self.byte_offsets[self._pos] = self._bpos
+        if current:
+            yield self._close(current, self._pos)
+
+    def _close(self, current: tuple, end: int) -> Chunk:
+        title, level, start, finder = current
+        self.byte_offsets[end] = self._bpos
+        return Chunk(title, level, finder.tag or '', start, end)
+
+
+def get_main_section_from_file(filename: str or PosixPath,
+                               meta_search_limit: int or None = None) -> Section:
+    '''
+    Parse chapter file in streaming mode and build the tree of its meta
+    sections, including byte offsets.
+
+    :param filename: path to the chapter file.
+    :param meta_search_limit: if specified, meta tags are only looked for
+                              within this number of characters from the
+                              beginning of each section.
+
+    :returns: the main Section object with all subsections attached.
+    '''
+    logger.debug('Parsing chapter %s in streaming mode', filename)
+    stream = ChapterStream(filename, meta_search_limit)
+    header, chunks = stream.get_header_and_chunks()
+    main_section = stream.get_main_section(header)
+    # search limit is already applied by the stream
+    for section in iter_sections(header, chunks, main_section=main_section):
+        pass
+    main_section = section
+    # header end is only known when the whole file is read
+    main_section.end = stream.length
+    for section in [main_section, *main_section.iter_children()]:
+        section.start_byte = stream.byte_offsets[section.start]
+        section.end_byte = stream.byte_offsets[section.end]
+    return main_section
@@ -1,54 +1,246 @@
 import re
 import yaml
 
+from bisect import bisect_left
+from copy import deepcopy
+from datetime import date
+from datetime import datetime
+from functools import lru_cache
 from logging import getLogger
 
 from .patterns import CHUNK_PATTERN
+from .patterns import DECIMAL_FLOAT_PATTERN
+from .patterns import DECIMAL_INT_PATTERN
 from .patterns import HEADER_PATTERN
+from .patterns import ID_WORD_PATTERN
+from .patterns import LIBYAML_UNSAFE_SOURCE_PATTERN
+from .patterns import LIBYAML_UNSAFE_STRING_PATTERN
 from .patterns import META_TAG_PATTERN
 from .patterns import OPTION_PATTERN
+from .patterns import PLAIN_SCALAR_PATTERN
 from .patterns import YFM_PATTERN
 
+try:
+    from yaml import CSafeDumper
+    from yaml import CSafeLoader
+    YAML_BACKEND = 'libyaml'
+except ImportError:
+    CSafeDumper = CSafeLoader = None
+    YAML_BACKEND = 'python'
+
 logger = getLogger('flt.meta')
 
+# Maximum number of distinct meta tag option values remembered
+OPTION_VALUE_CACHE_SIZE = 4096
+
+IMMUTABLE_TYPES = (str, int, float, bool, type(None))
+
+LIBYAML_SAFE_SCALAR_TYPES = (int, float, bool, type(None), date, datetime)
+
+_resolver = yaml.resolver.Resolver()
+
 
 def get_meta_dict_from_yfm(source: str) -> dict:
     '''
     Look for YAML Front Matter and return resulting dict.
-    If there is no YFM — return empty dict.
+    If there is no YFM or it is empty — return empty dict.
     '''
     data = {}
+    if not source.startswith('---'):
+        return data
     yfm_match = YFM_PATTERN.search(source)
     if yfm_match:
-        logger.debug(f'Found YFM:\n{yfm_match.group("yaml")}')
-        data = yaml.load(yfm_match.group('yaml'), yaml.Loader)
+        logger.debug('Found YFM:\n%s', yfm_match.group('yaml'))
+        data = load_yaml(yfm_match.group('yaml'))
+        if data is None:
+            data = {}
     return data
 
 
-def get_meta_dict_from_meta_tag(source: str) -> dict or None:
+def load_yaml(source: str):
+    '''
+    Load YAML source the same way as `yaml.load(source, yaml.Loader)` does,
+    but using libyaml, when it is available.
+
+    Sources which libyaml may load differently, sources with python-specific
+    tags and invalid sources (to get the same error) are loaded by the
+    pure-Python loader.
+
+    :param source: YAML source string.
+
+    :returns: loaded object.
+    '''
+    if CSafeLoader is not None and not _is_libyaml_unsafe_source(source):
+        try:
+            return yaml.load(source, CSafeLoader)
+        except yaml.YAMLError:
+            pass
+    return yaml.load(source, yaml.Loader)
+
+
+def _is_libyaml_unsafe_source(source: str) -> bool:
+    if LIBYAML_UNSAFE_SOURCE_PATTERN.search(source):
+        return True
+    # libyaml is more permissive to `? ` in flow collections
+    return '? ' in source and ('[' in source or '{' in source)
+
+
+def dump_yaml(data, **kwargs) -> str:
+    '''
+    Dump data into YAML string the same way as `yaml.dump(data, **kwargs)`
+    does, but using libyaml, when it is available.
+
+    Data with strings which libyaml may emit differently and data with
+    objects which are not supported by the safe dumper are dumped by the
+    pure-Python dumper.
+
+    :param data: data to dump.
+    :param kwargs: yaml.dump keyword arguments.
+
+    :returns: YAML string.
+    '''
+    if CSafeDumper is not None and not _is_libyaml_unsafe_data(data):
+        try:
+            return yaml.dump(data, Dumper=CSafeDumper, **kwargs)
+        except yaml.YAMLError:
+            pass
+    return yaml.dump(data, **kwargs)
+
+
+def _is_libyaml_unsafe_data(data) -> bool:
+    stack = [data]
+    while stack:
+        item = stack.pop()
+        type_ = type(item)
+        if type_ is str:
+            if LIBYAML_UNSAFE_STRING_PATTERN.search(item):
+                return True
+        elif type_ is dict:
+            for key, value in item.items():
+                if key == '':
+                    # empty keys are emitted differently
+                    return True
+                stack.append(key)
+                stack.append(value)
+        elif type_ is list:
+            stack.extend(item)
+        elif type_ not in LIBYAML_SAFE_SCALAR_TYPES:
+            # the safe dumper represents other types differently, e.g.
+            # tuples as lists
+            return True
+    return False
+
+
+def get_meta_dict_from_meta_tag(source: str, search_limit: int or None = None) -> dict or None:
     '''
     Look for meta tags in the source resulting dict of metadata.
     If there are no meta tags in source — return None.
     If there are several — choose the first one.
 
     :param source: section source without title
+    :param search_limit: if specified, only meta tags starting within this
+                         number of characters from the beginning of the source
+                         are considered.
 
     :returns: meta dict or None if no meta tags in section.
     '''
     data = None
-    meta_match = META_TAG_PATTERN.search(source)
+    if search_limit is None:
+        meta_match = None
+        if '<meta' in source:
+            meta_match = META_TAG_PATTERN.search(source)
+    else:
+        meta_match = search_meta_tag(source, search_limit)
     if meta_match:
-        logger.debug(f'Found meta tag: \n{meta_match.group(0)}')
-        option_string = meta_match.group('options')
-        if not option_string:
-            data = {}
-        else:
-            data = {option.group('key'): yaml.load(option.group('value'),
-                                                   yaml.Loader)
-                    for option in OPTION_PATTERN.finditer(option_string)}
+        logger.debug('Found meta tag: \n%s', meta_match.group(0))
+        data = get_meta_dict_from_options(meta_match.group('options'))
     return data
 
 
+def get_meta_dict_from_options(option_string: str or None) -> dict:
+    '''
+    Load metadata from the options string of a meta tag.
+
+    :param option_string: options part of the meta tag, or None if the tag
+                          has no options.
+
+    :returns: meta dict.
+    '''
+    if not option_string:
+        return {}
+    return {option.group('key'): load_option_value(option.group('value'))
+            for option in OPTION_PATTERN.finditer(option_string)}
+
+
+def load_option_value(value: str):
+    '''
+    Load meta tag option value the same way as `yaml.load(value, yaml.Loader)`
+    does. Results are memoized, so repeating values are only parsed once.
+
+    :param value: option value string.
+
+    :returns: loaded object. Mutable objects are copied, so the result may be
+              safely changed.
+    '''
+    result = _load_option_value_cached(value)
+    if not isinstance(result, IMMUTABLE_TYPES):
+        result = deepcopy(result)
+    return result
+
+
+@lru_cache(maxsize=OPTION_VALUE_CACHE_SIZE)
+def _load_option_value_cached(value: str):
+    result = parse_scalar(value)
+    if result is NotImplemented:
+        result = load_yaml(value)
+    return result
+
+
+def parse_scalar(value: str):
+    '''
+    Fast parser for the common YAML scalars: plain strings, booleans, nulls,
+    decimal integers and floats. Gives the same results as YAML.
+
+    :param value: option value string.
+
+    :returns: loaded object or NotImplemented if the value is not a simple
+              scalar and must be loaded by YAML.
+    '''
+    if not PLAIN_SCALAR_PATTERN.fullmatch(value):
+        return NotImplemented
+    tag = _resolver.resolve(yaml.ScalarNode, value, (True, False))
+    if tag == 'tag:yaml.org,2002:str':
+        return value
+    elif tag == 'tag:yaml.org,2002:bool':
+        return yaml.constructor.SafeConstructor.bool_values[value.lower()]
+    elif tag == 'tag:yaml.org,2002:null':
+        return None
+    elif tag == 'tag:yaml.org,2002:int' and DECIMAL_INT_PATTERN.fullmatch(value):
+        return int(value)
+    elif tag == 'tag:yaml.org,2002:float' and DECIMAL_FLOAT_PATTERN.fullmatch(value):
+        return float(value)
+    return NotImplemented
+
+
+def search_meta_tag(source: str, search_limit: int) -> re.Match or None:
+    '''
+    Find the first meta tag which starts within search_limit characters from
+    the beginning of the source.
+
+    :param source: section source without title
+    :param search_limit: number of characters to look for the tag start in.
+
+    :returns: META_TAG_PATTERN match object or None.
+    '''
+    pos = source.find('<meta', 0, search_limit + len('<meta'))
+    while pos != -1 and pos < search_limit:
+        meta_match = META_TAG_PATTERN.match(source, pos)
+        if meta_match:
+            return meta_match
+        pos = source.find('<meta', pos + 1, search_limit + len('<meta'))
+    return None
+
+
 def get_header_content(source: str) -> str:
     '''
     Search source for header (content before first heading) and return it.
@@ -104,18 +296,7 @@ def convert_to_id(title: str, existing_ids: list) -> str:
     'get-endpoint-method-id'
     '''
 
-    id_ = ''
-    accum = False
-    for char in title:
-        if char == '_' or char.isalnum():
-            if accum:
-                accum = False
-                id_ += f'-{char.lower()}'
-            else:
-                id_ += char.lower()
-        else:
-            accum = True
-    id_ = id_.strip(' -')
+    id_ = title_to_slug(title)
 
     counter = 1
     result = id_
@@ -126,6 +307,114 @@ def convert_to_id(title: str, existing_ids: list) -> str:
     return result
 
 
+def title_to_slug(title: str) -> str:
+    '''
+    Convert heading into id without checking for uniqueness: words (runs of
+    alphanumeric characters and underscores) are lowercased and joined with
+    dashes.
+
+    >>> title_to_slug('GET /endpoint/method{id}')
+    'get-endpoint-method-id'
+    '''
+    words = ID_WORD_PATTERN.findall(title)
+    # characters are lowercased one by one, so final sigma is not treated
+    # specially
+    return '-'.join(word.lower() if 'Σ' not in word else ''.join(map(str.lower, word))
+                    for word in words)
+
+
+class IdGenerator:
+    '''
+    Generates unique ids from titles the same way as convert_to_id does, but
+    in constant time per id: existing ids are kept in a set, and for each slug
+    the last used counter is remembered, so taken ids are not checked again.
+    '''
+
+    def __init__(self, existing_ids=()):
+        '''
+        :param existing_ids: ids which are already taken.
+        '''
+        self.ids = set(existing_ids)
+        self._counters = {}
+
+    def add(self, id_: str):
+        '''Mark id as taken.'''
+        self.ids.add(id_)
+
+    def generate(self, title: str) -> str:
+        '''
+        Convert title into id, unique among the taken ids, and mark it as
+        taken.
+        '''
+        id_ = title_to_slug(title)
+        # ids are never released, so lower counters are still taken
+        counter = self._counters.get(id_, 1)
+        result = id_ if counter == 1 else f'{id_}-{counter}'
+        while result in self.ids:
+            counter += 1
+            result = f'{id_}-{counter}'
+        self._counters[id_] = counter
+        self.ids.add(result)
+        return result
+
+    def generate_all(self, titles) -> list:
+        '''
+        Convert all titles into unique ids in one pass.
+
+        :param titles: iterable of titles.
+
+        :returns: list of ids in the same order.
+        '''
+        return [self.generate(title) for title in titles]
+
+
+def translate_newlines(source: str) -> str:
+    '''
+    Convert all line endings to '\\n' the same way as reading a file in text
+    mode with universal newlines does.
+    '''
+    if '\r' not in source:
+        return source
+    return source.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def get_byte_offsets(raw_source: str, offsets) -> dict:
+    '''
+    Convert character offsets in the source with translated newlines (see
+    translate_newlines) into byte offsets in the utf8-encoded raw source.
+
+    Each part of the source is encoded once, so the conversion is linear in
+    the source length.
+
+    :param raw_source: source as it is stored in the file (decoded, but with
+                       original line endings).
+    :param offsets: iterable of character offsets in the translated source.
+
+    :returns: dictionary {character offset: byte offset}.
+    '''
+    # positions in the translated source of the '\n' characters which were
+    # '\r\n' in the raw source
+    crlf_positions = []
+    pos = raw_source.find('\r\n')
+    while pos != -1:
+        crlf_positions.append(pos - len(crlf_positions))
+        pos = raw_source.find('\r\n', pos + 2)
+
+    is_ascii = raw_source.isascii()
+    result = {}
+    raw_pos = 0
+    byte_pos = 0
+    for offset in sorted(set(offsets)):
+        raw_offset = offset + bisect_left(crlf_positions, offset)
+        if is_ascii:
+            byte_pos = raw_offset
+        else:
+            byte_pos += len(raw_source[raw_pos:raw_offset].encode('utf8'))
+            raw_pos = raw_offset
+        result[offset] = byte_pos
+    return result
+
+
 def remove_meta(source: str):
     '''
     Remove meta tags from source string. Whitespaces in the beginning of the
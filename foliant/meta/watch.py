@@ -0,0 +1,150 @@
+'''Module defining ChapterWatcher class for tracking changes in chapter files'''
+
+import os
+
+from logging import getLogger
+from threading import Event
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+logger = getLogger('flt.meta')
+
+# time without new changes after which a batch of changes is complete: long
+# enough to merge editor save bursts and checkouts into one batch
+DEFAULT_SETTLE = 0.3
+
+
+class _ChangeHandler(FileSystemEventHandler):
+    '''Sets the event when one of the watched files is touched'''
+
+    def __init__(self, paths: set, event: Event):
+        self.paths = paths
+        self.event = event
+
+    def on_any_event(self, event):
+        if event.is_directory or event.event_type in ('opened', 'closed_no_write'):
+            return
+        for path_ in (event.src_path, getattr(event, 'dest_path', '')):
+            if os.path.abspath(path_) in self.paths:
+                self.event.set()
+                return
+
+
+class ChapterWatcher:
+    '''
+    Polls chapter files and reports the ones which changed since the last
+    poll. File state is determined by its mtime and size, so checking is cheap
+    even for large projects.
+
+    If watchdog is installed, OS file notifications wake the watcher as soon
+    as a file changes, and polling only serves as a fallback.
+    '''
+
+    def __init__(self,
+                 paths: list,
+                 interval: float = 0.05,
+                 settle: float = DEFAULT_SETTLE,
+                 use_notifications: bool = True):
+        '''
+        :param paths: list of chapter paths to watch.
+        :param interval: polling interval in seconds.
+        :param settle: time in seconds since the last seen change after which
+                       a batch of changes is complete.
+        :param use_notifications: use OS file notifications if watchdog is
+                                  installed.
+        '''
+        self.paths = [str(p) for p in paths]
+        self.interval = interval
+        self.settle = settle
+        self._states = {path_: self._get_state(path_) for path_ in self.paths}
+        self._event = Event()
+        self._observer = None
+        if use_notifications and Observer is not None:
+            self._start_observer()
+
+    def _start_observer(self):
+        abs_paths = {os.path.abspath(path_) for path_ in self.paths}
+        handler = _ChangeHandler(abs_paths, self._event)
+        observer = Observer()
+        try:
+            for dir_ in {os.path.dirname(path_) for path_ in abs_paths}:
+                if os.path.isdir(dir_):
+                    observer.schedule(handler, dir_, recursive=False)
+            observer.daemon = True
+            observer.start()
+        except Exception as e:
+            logger.debug(f'File notifications are not available, polling: {e}')
+            return
+        self._observer = observer
+
+    @property
+    def uses_notifications(self) -> bool:
+        '''True if OS file notifications are used'''
+        return self._observer is not None
+
+    @staticmethod
+    def _get_state(path_: str) -> tuple or None:
+        try:
+            stat = os.stat(path_)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def poll(self) -> list:
+        '''
+        Check all files once.
+
+        :returns: list of paths changed since the last poll, in the original
+                  order.
+        '''
+        changed = []
+        for path_ in self.paths:
+            state = self._get_state(path_)
+            if state != self._states[path_]:
+                self._states[path_] = state
+                changed.append(path_)
+        return changed
+
+    def wait(self) -> list:
+        '''
+        Block until some files change. Changes made in quick succession are
+        merged into one batch: the batch is complete when no more changes are
+        seen during the settle time after the last one.
+
+        :returns: list of changed paths, in the original order.
+        '''
+        changed = []
+        while not changed:
+            # a notification cuts the wait short
+            self._event.wait(self.interval)
+            self._event.clear()
+            changed = self.poll()
+        while True:
+            self._event.wait(self.settle)
+            self._event.clear()
+            more = self.poll()
+            if not more:
+                break
+            changed.extend(p for p in more if p not in changed)
+        order = {path_: i for i, path_ in enumerate(self.paths)}
+        return sorted(changed, key=order.__getitem__)
+
+    def close(self):
+        '''Stop the notification observer, if it is running.'''
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+
+    def __iter__(self):
+        ''':yields: batches of changed paths, forever.'''
+        while True:
+            yield self.wait()
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}: {len(self.paths)} files>'
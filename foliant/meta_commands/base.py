@@ -4,7 +4,11 @@ from logging import Logger
 class BaseMetaCommand:
     '''Base meta command.
 
-    All meta commands extensions must inherit from this one.'''
+    All meta commands extensions must inherit from this one.
+
+    Command options are collected from ``defaults``, then from the config
+    section and finally from the options passed in the command line
+    (``context['cli_options']``), later ones taking precedence.'''
     config_section = ''
     defaults = {}
 
@@ -14,7 +18,8 @@ class BaseMetaCommand:
         self.config = context['config']
         self.project_path = context['project_path']
         options = self.config.get(self.config_section, {}) if self.config_section else {}
-        self.options = {**self.defaults, **options}
+        cli_options = context.get('cli_options', {})
+        self.options = {**self.defaults, **options, **cli_options}
         self.quiet = quiet
         self.debug = debug
 
@@ -0,0 +1 @@
+from .command import MetaCommand
@@ -0,0 +1,55 @@
+'''Meta command which compares two meta files'''
+
+import json
+
+from schema import SchemaError
+from yaml import YAMLError
+
+from foliant.meta_commands.base import BaseMetaCommand
+
+from foliant.meta.classes import Meta
+from foliant.meta.classes import MetaDublicateIDError
+from foliant.meta.diff import diff_meta
+
+# errors of loading a missing, unreadable or invalid meta file
+LOAD_ERRORS = (OSError, UnicodeDecodeError, YAMLError, SchemaError, MetaDublicateIDError)
+
+
+class MetaCommand(BaseMetaCommand):
+    '''
+    Meta command which compares two meta files and prints the changes as
+    JSON lines, one event per line.
+    '''
+    defaults = {'filename': 'meta.yml',
+                'old': None,
+                'new': None}
+    config_section = 'meta'
+
+    def _exit_with_error(self, message: str):
+        self.logger.critical(message)
+        exit(message)
+
+    def _load(self, filename: str) -> Meta:
+        meta = Meta()
+        try:
+            meta.load_meta_from_file(filename)
+        except LOAD_ERRORS as e:
+            self._exit_with_error(f'Can\'t load meta file {filename}: {e}')
+        return meta
+
+    def run(self):
+        self.logger.debug('Meta command diff started')
+        if not self.options['old']:
+            self._exit_with_error('Path to the previous meta file is required for the diff command.')
+        old_filename = self.options['old']
+        new_filename = self.options['new'] or self.options['filename']
+        self.logger.debug(f'Comparing {old_filename} with {new_filename}')
+
+        counts = {}
+        for event in diff_meta(self._load(old_filename), self._load(new_filename)):
+            print(json.dumps(event, ensure_ascii=False, default=str))
+            key = f'{event["type"]}s {event["event"]}'
+            counts[key] = counts.get(key, 0) + 1
+        summary = ', '.join(f'{key}: {count}' for key, count in counts.items())
+        self.logger.info(f'Changes: {summary or "none"}')
+        self.logger.debug('Meta command diff finished')
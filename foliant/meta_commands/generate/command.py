@@ -1,50 +1,197 @@
 '''Meta command which generates the meta file'''
 
-import yaml
+import sys
+
+from time import perf_counter
 
 from foliant.meta_commands.base import BaseMetaCommand
 from foliant.utils import spinner
 
+from foliant.meta.cache import ChapterCache
+from foliant.meta.classes import Meta
+from foliant.meta.generate import PARSER_VERSION
+from foliant.meta.generate import get_meta_for_chapter
+from foliant.meta.generate import iter_chapter_paths
 from foliant.meta.generate import load_meta
+from foliant.meta.profiling import Profiler
+from foliant.meta.profiling import phase
+from foliant.meta.tools import YAML_BACKEND
+from foliant.meta.tools import dump_yaml
+from foliant.meta.watch import DEFAULT_SETTLE
+from foliant.meta.watch import ChapterWatcher
 
 
 class MetaCommand(BaseMetaCommand):
     '''Meta command which generates the meta file'''
-    defaults = {'filename': 'meta.yml'}
+    defaults = {'filename': 'meta.yml',
+                'jobs': 1,
+                'use_threads': False,
+                'cache_dir': None,
+                'cache_size_limit': 100,
+                'meta_search_limit': None,
+                'stream_threshold': None,
+                'byte_offsets': False,
+                'watch': False,
+                'watch_interval': 0.05,
+                'watch_settle': DEFAULT_SETTLE,
+                'profile': False,
+                'profile_dump': None,
+                'profile_top': 10}
     config_section = 'meta'
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.meta = None
+        self.cache = None
+        self.profiler = None
+        if self.options['profile'] or self.options['profile_dump']:
+            self.profiler = Profiler(calls=bool(self.options['profile_dump']))
+        if self.options['cache_dir']:
+            self.cache = ChapterCache(
+                self.project_path / self.options['cache_dir'],
+                parser_version=PARSER_VERSION,
+                size_limit=self.options['cache_size_limit'] * 1024 * 1024
+            )
 
     def _gen_meta(self):
         '''Generate meta yaml and return it as string'''
 
         if 'chapters' not in self.config:
             return ''
-        self.meta = load_meta(self.config['chapters'])
+        self.meta = load_meta(self.config['chapters'],
+                              jobs=self.options['jobs'],
+                              use_threads=self.options['use_threads'],
+                              cache=self.cache,
+                              meta_search_limit=self.options['meta_search_limit'],
+                              stream_threshold=self._get_stream_threshold(),
+                              hooks=self.profiler)
+
+    def _get_stream_threshold(self) -> int or None:
+        '''Stream threshold option in bytes'''
+        if self.options['stream_threshold'] is None:
+            return None
+        return int(self.options['stream_threshold'] * 1024 * 1024)
+
+    def _save_meta(self, filename: str):
+        '''Dump generated meta into yaml-file'''
+        self.logger.debug(f'Saving meta to {filename}, YAML backend: {YAML_BACKEND}')
+        with phase(self.profiler, 'to_dict'):
+            data = self.meta.dump(byte_offsets=self.options['byte_offsets'])
+        with phase(self.profiler, 'yaml_dump'):
+            source = dump_yaml(data,
+                               default_flow_style=False,
+                               allow_unicode=True,
+                               sort_keys=False)
+        with open(filename, 'w', encoding='utf8') as f:
+            f.write(source)
+
+    def _report_profile(self):
+        '''Print profiling results and save cProfile statistics'''
+        report = self.profiler.format_report(self.options['profile_top'])
+        self.logger.info(f'Profile:\n{report}')
+        # the report goes to stderr in quiet mode to keep the result pipeable
+        print(report, file=sys.stderr if self.quiet else sys.stdout)
+        if self.options['profile_dump']:
+            dump_path = self.project_path / self.options['profile_dump']
+            self.profiler.dump_stats(dump_path)
+            self.logger.info(f'Profile statistics saved to {dump_path}')
+            if not self.quiet:
+                print(f'Profile statistics: {dump_path}')
+
+    def _update_meta(self, chapters: dict, chapter_paths: list, changed: list):
+        '''
+        Re-parse changed chapters and rebuild meta from the new and the
+        unchanged Chapter objects.
+
+        :param chapters: dictionary {chapter path: Chapter object or None},
+                         updated in place.
+        :param chapter_paths: list of (chapter path, chapter name) tuples in
+                              the correct order.
+        :param changed: list of changed chapter paths.
+        '''
+        names = {str(path_): name for path_, name in chapter_paths}
+        for path_ in changed:
+            self.logger.debug(f'Chapter changed: {path_}')
+            chapters[path_] = get_meta_for_chapter(path_,
+                                                   names[path_],
+                                                   self.cache,
+                                                   self.options['meta_search_limit'],
+                                                   self._get_stream_threshold())
+
+        meta = Meta()
+        for path_, _ in chapter_paths:
+            chapter = chapters.get(str(path_))
+            if chapter:
+                # ids are reassigned from scratch to get the same result as
+                # the full regeneration
+                for section in chapter.iter_sections():
+                    section.id = None
+                meta.add_chapter(chapter)
+        meta.process_ids()
+        self.meta = meta
+
+    def _watch(self, filename: str):
+        '''Regenerate meta each time chapter files change, until interrupted'''
+        chapter_paths = list(iter_chapter_paths(self.config['chapters']))
+        chapters = {chapter.filename: chapter for chapter in self.meta.chapters}
+        watcher = ChapterWatcher([path_ for path_, _ in chapter_paths],
+                                 interval=self.options['watch_interval'],
+                                 settle=self.options['watch_settle'])
+        if not self.quiet:
+            print('Watching for changes, press Ctrl+C to stop.')
+        try:
+            for changed in watcher:
+                start = perf_counter()
+                try:
+                    self._update_meta(chapters, chapter_paths, changed)
+                    self._save_meta(filename)
+                except Exception as e:
+                    self.logger.error(f'Failed to update meta: {e}')
+                    if not self.quiet:
+                        print(f'Failed to update meta: {e}')
+                    continue
+                elapsed = (perf_counter() - start) * 1000
+                self.logger.info(f'Updated {filename} ({len(changed)} changed '
+                                 f'chapters) in {elapsed:.0f} ms')
+                if not self.quiet:
+                    print(f'Updated: {", ".join(changed)} ({elapsed:.0f} ms)')
+        except KeyboardInterrupt:
+            self.logger.debug('Watch mode interrupted')
+        finally:
+            watcher.close()
 
     def run(self):
         self.logger.debug('Meta command generate started')
         filename = self.options['filename']
         result = None
         with spinner(f'Generating metadata', self.logger, self.quiet, self.debug):
-            self._gen_meta()
-            with open(filename, 'w', encoding='utf8') as f:
-                yaml.dump(self.meta.dump(),
-                          f,
-                          default_flow_style=False,
-                          allow_unicode=True,
-                          sort_keys=False)
+            if self.profiler:
+                with self.profiler:
+                    self._gen_meta()
+                    self._save_meta(filename)
+            else:
+                self._gen_meta()
+                self._save_meta(filename)
             result = filename
 
+        if self.profiler:
+            self._report_profile()
+
         if result:
             self.logger.info(f'Result: {result}')
+            if self.cache:
+                cache_stats = f'Cache: {self.cache.hits} hits, {self.cache.misses} misses'
+                self.logger.info(cache_stats)
 
             if not self.quiet:
                 print('─' * 20)
+                if self.cache:
+                    print(cache_stats)
                 print(f'Result: {result}')
             else:
                 print(result)
 
+        if self.options['watch'] and 'chapters' in self.config:
+            self._watch(filename)
+
         self.logger.debug('Meta command generate finished')
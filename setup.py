@@ -15,7 +15,7 @@ setup(
     description=SHORT_DESCRIPTION,
     long_description=LONG_DESCRIPTION,
     long_description_content_type='text/markdown',
-    version='1.3.3',
+    version='1.4.0',
     author='Daniil Minukhin',
     author_email='ddddsa@gmail.com',
     url='https://github.com/foliant-docs/foliantcontrib.meta',
@@ -23,6 +23,7 @@ setup(
               'foliant.cli.meta',
               'foliant.meta_commands',
               'foliant.meta_commands.generate',
+              'foliant.meta_commands.diff',
               ],
     license='MIT',
     platforms='any',
@@ -31,6 +32,9 @@ setup(
         'foliantcontrib.utils>=1.0.2',
         'schema>=0.7.0',
     ],
+    extras_require={
+        'watch': ['watchdog>=2.0'],
+    },
     classifiers=[
         "Development Status :: 5 - Production/Stable",
         "Environment :: Console",
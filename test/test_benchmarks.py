@@ -0,0 +1,70 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from benchmarks.compare import compare_results
+from benchmarks.compare import get_scaling
+from benchmarks.corpus import CorpusConfig
+from benchmarks.corpus import generate_corpus
+from foliant.meta.generate import load_meta
+
+
+def make_results(runs: list) -> dict:
+    ''':param runs: list of tuples (scale, sections, timings).'''
+    return {'runs': [{'scale': scale, 'sections': sections, 'timings': timings}
+                     for scale, sections, timings in runs]}
+
+
+class TestCorpus(TestCase):
+    def read_corpus(self, config: CorpusConfig) -> list:
+        with TemporaryDirectory() as tmp_dir:
+            chapters = generate_corpus(tmp_dir, config)
+            return [(Path(tmp_dir) / name).read_text(encoding='utf8') for name in chapters]
+
+    def test_same_seed(self):
+        config = CorpusConfig(chapters=3, sections=10, seed=1)
+        self.assertEqual(self.read_corpus(config), self.read_corpus(config))
+
+    def test_different_seed(self):
+        self.assertNotEqual(self.read_corpus(CorpusConfig(chapters=3, seed=1)),
+                            self.read_corpus(CorpusConfig(chapters=3, seed=2)))
+
+    def test_scaled_corpus_extends_smaller(self):
+        config = CorpusConfig(chapters=2, sections=10)
+        small = self.read_corpus(config)
+        large = self.read_corpus(config.scaled(2))
+        self.assertEqual(len(large), 4)
+        self.assertEqual(large[:2], small)
+
+    def test_corpus_is_parsed(self):
+        config = CorpusConfig(chapters=2, sections=10, meta_density=1, max_depth=3)
+        with TemporaryDirectory() as tmp_dir:
+            chapters = generate_corpus(tmp_dir, config)
+            meta = load_meta(chapters, Path(tmp_dir))
+        self.assertEqual(len(meta.chapters), 2)
+        sections = list(meta.iter_sections())
+        self.assertEqual(len(sections), 2 * 11)
+        self.assertTrue(all('type' in section.data for section in sections if section.level > 1))
+
+
+class TestCompare(TestCase):
+    def test_regression(self):
+        baseline = make_results([(1, 100, {'generate': 1.0, 'dump': 1.0})])
+        current = make_results([(1, 100, {'generate': 1.1, 'dump': 1.5})])
+        comparison = compare_results(baseline, current, threshold=0.2)
+        regressions = {item['scenario']: item['regression'] for item in comparison}
+        self.assertEqual(regressions, {'generate': False, 'dump': True})
+
+    def test_only_matching_scales(self):
+        baseline = make_results([(1, 100, {'generate': 1.0})])
+        current = make_results([(1, 100, {'generate': 1.0}), (2, 200, {'generate': 5.0})])
+        comparison = compare_results(baseline, current)
+        self.assertEqual([item['scale'] for item in comparison], [1])
+        self.assertFalse(comparison[0]['regression'])
+
+    def test_scaling(self):
+        linear = make_results([(1, 100, {'s': 1.0}), (2, 200, {'s': 2.0}), (4, 400, {'s': 4.0})])
+        quadratic = make_results([(1, 100, {'s': 1.0}), (2, 200, {'s': 4.0})])
+        self.assertAlmostEqual(get_scaling(linear['runs'], 's'), 1.0)
+        self.assertAlmostEqual(get_scaling(quadratic['runs'], 's'), 2.0)
+        self.assertIsNone(get_scaling(linear['runs'][:1], 's'))
@@ -0,0 +1,187 @@
+import os
+import pickle
+import shutil
+
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from foliant.meta.cache import ChapterCache
+from foliant.meta.cache import MetaFileCache
+from foliant.meta.classes import Meta
+from foliant.meta.classes import Section
+from foliant.meta.generate import get_meta_for_chapter
+from foliant.meta.generate import load_meta
+
+from .utils import TEST_DATA_PATH
+
+
+class TestChapterCache(TestCase):
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.cache = ChapterCache(self.tmp_dir.name, parser_version='1')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_key_depends_on_content_and_version(self):
+        other_version = ChapterCache(self.tmp_dir.name, parser_version='2')
+        key = self.cache.get_key('content')
+        self.assertEqual(key, self.cache.get_key('content'))
+        self.assertNotEqual(key, self.cache.get_key('other content'))
+        self.assertNotEqual(key, other_version.get_key('content'))
+
+    def test_set_get(self):
+        section = Section(level=0, start=0, end=100, data={'field': 'value'})
+        section.add_child(Section(level=1, start=10, end=100, data={}, title='child'))
+        key = self.cache.get_key('content')
+        self.assertIsNone(self.cache.get(key))
+        self.cache.set(key, section)
+        cached = self.cache.get(key)
+        self.assertEqual(cached.data, {'field': 'value'})
+        self.assertEqual(cached.children[0].title, 'child')
+        self.assertIs(cached.children[0].parent, cached)
+
+    def test_corrupt_entry(self):
+        key = self.cache.get_key('content')
+        os.makedirs(self.tmp_dir.name, exist_ok=True)
+        with open(os.path.join(self.tmp_dir.name, key + '.pickle'), 'wb') as f:
+            f.write(b'not a pickle')
+        self.assertIsNone(self.cache.get(key))
+
+    def test_prune(self):
+        section = Section(level=0, start=0, end=100, data={'field': 'x' * 1000})
+        for i in range(5):
+            self.cache.set(self.cache.get_key(str(i)), section)
+            os.utime(self.cache._get_entry_path(self.cache.get_key(str(i))), (i, i))
+        entry_size = os.path.getsize(self.cache._get_entry_path(self.cache.get_key('0')))
+        self.cache.size_limit = entry_size * 2
+        self.assertEqual(self.cache.prune(), 3)
+        self.assertIsNone(self.cache.get(self.cache.get_key('0')))
+        self.assertIsNotNone(self.cache.get(self.cache.get_key('4')))
+
+    def test_failed_write(self):
+        section = Section(level=0, start=0, end=100, data={'field': lambda: None})
+        key = self.cache.get_key('content')
+        with self.assertLogs('flt.meta', 'WARNING'):
+            self.cache.set(key, section)
+        self.assertFalse(self.cache.writable)
+        self.assertIsNone(self.cache.get(key))
+        self.assertEqual(os.listdir(self.tmp_dir.name), [])
+
+        # the cache is not written after a failure
+        self.cache.set(key, Section(level=0, start=0, end=100))
+        self.assertEqual(os.listdir(self.tmp_dir.name), [])
+
+    def test_unwritable_cache_dir(self):
+        cache_dir = os.path.join(self.tmp_dir.name, 'file')
+        with open(cache_dir, 'w') as f:
+            f.write('not a directory')
+        cache = ChapterCache(cache_dir, parser_version='1')
+        with self.assertLogs('flt.meta', 'WARNING'):
+            meta = load_meta(['chapter_with_meta.md'], TEST_DATA_PATH / 'load_meta',
+                             cache=cache)
+        self.assertEqual(meta.dump(), load_meta(['chapter_with_meta.md'],
+                                                TEST_DATA_PATH / 'load_meta').dump())
+        self.assertEqual(cache.misses, 1)
+
+
+class TestLoadMetaWithCache(TestCase):
+    maxDiff = None
+
+    def test_hits_and_misses(self):
+        md_root = 'test/test_data/load_meta'
+        chapters = [
+            'chapter_only_yfm.md',
+            'chapter_with_meta.md',
+            'chapter_with_one_meta_tag.md',
+            'chapter_without_meta.md'
+        ]
+        with TemporaryDirectory() as tmp_dir:
+            cache = ChapterCache(tmp_dir, parser_version='1')
+            expected = load_meta(chapters, md_root, cache=cache).dump()
+            self.assertEqual((cache.hits, cache.misses), (0, 4))
+
+            cache = ChapterCache(tmp_dir, parser_version='1')
+            with patch('foliant.meta.generate.get_main_section') as mock_parse:
+                meta = load_meta(chapters, md_root, cache=cache)
+                self.assertFalse(mock_parse.called)
+            self.assertEqual((cache.hits, cache.misses), (4, 0))
+            self.assertEqual(meta.dump(), expected)
+
+    def test_chapter_attributes_not_cached(self):
+        with TemporaryDirectory() as tmp_dir:
+            cache = ChapterCache(tmp_dir, parser_version='1')
+            ch_path = TEST_DATA_PATH / 'chapter.md'
+            get_meta_for_chapter(ch_path, 'first', cache=cache)
+            chapter = get_meta_for_chapter(ch_path, 'second', cache=cache)
+            self.assertEqual(chapter.name, 'second')
+            for section in chapter.iter_sections():
+                self.assertIs(section.chapter, chapter)
+
+
+class TestMetaFileCache(TestCase):
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.filename = os.path.join(self.tmp_dir.name, 'meta.yml')
+        shutil.copy(TEST_DATA_PATH / 'meta3.yml', self.filename)
+        self.cache_filename = os.path.join(self.tmp_dir.name, '.meta.yml.cache')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def load(self, use_cache=True, **kwargs) -> Meta:
+        meta = Meta()
+        meta.load_meta_from_file(self.filename, use_cache=use_cache, **kwargs)
+        return meta
+
+    def test_load_from_cache(self):
+        expected = self.load().dump()
+        self.assertTrue(os.path.exists(self.cache_filename))
+        with patch('foliant.meta.classes.load_yaml') as mock_load:
+            meta = self.load()
+            self.assertFalse(mock_load.called)
+        self.assertEqual(meta.dump(), expected)
+        for chapter in meta:
+            for section in chapter.iter_sections():
+                self.assertIs(section.chapter, chapter)
+
+    def test_invalidated_on_change(self):
+        self.load()
+        with open(self.filename, encoding='utf8') as f:
+            source = f.read()
+        with open(self.filename, 'w', encoding='utf8') as f:
+            f.write(source.replace('title: compound', 'title: Changed title', 1))
+        self.assertIsNone(MetaFileCache(self.filename).load())
+        meta = self.load()
+        titles = [section.title for section in meta.iter_sections()]
+        self.assertIn('Changed title', titles)
+
+    def test_same_mtime_and_size(self):
+        self.load()
+        stat = os.stat(self.filename)
+        with open(self.filename, 'r+b') as f:
+            f.write(b'#')
+        os.utime(self.filename, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertIsNone(MetaFileCache(self.filename).load())
+
+    def test_corrupt_cache(self):
+        expected = self.load().dump()
+        with open(self.cache_filename, 'wb') as f:
+            f.write(b'garbage')
+        self.assertIsNone(MetaFileCache(self.filename).load())
+        self.assertEqual(self.load().dump(), expected)
+
+    def test_no_cache(self):
+        self.load(use_cache=False)
+        self.assertFalse(os.path.exists(self.cache_filename))
+
+    def test_no_cache_by_default(self):
+        Meta().load_meta_from_file(self.filename)
+        self.assertEqual(os.listdir(self.tmp_dir.name), ['meta.yml'])
+
+    def test_failed_save(self):
+        with patch('foliant.meta.cache.pickle.dump', side_effect=pickle.PicklingError('broken')):
+            meta = self.load()
+        self.assertEqual(meta.dump(), self.load(use_cache=False).dump())
+        self.assertEqual(os.listdir(self.tmp_dir.name), ['meta.yml'])
@@ -1,3 +1,5 @@
+import sys
+
 from unittest import TestCase
 
 from .utils import TEST_DATA_PATH
@@ -132,6 +134,65 @@ class TestGetSectionByOffset(TestCase):
         self.assertEqual(chapter.get_section_by_offset(offsets.pop(0)), section2)
         self.assertEqual(chapter.get_section_by_offset(offsets.pop(0)), main_section)
 
+    def test_index_follows_changes(self):
+        main_section = Section(level=0, start=0, end=200, title='Main')
+        chapter = Chapter('some/filename.md', 'name', main_section)
+        child1 = Section(level=1, start=100, end=150, title='Child 1')
+        main_section.add_child(child1)
+        self.assertEqual(chapter.get_section_by_offset(120), child1)
+
+        child2 = Section(level=1, start=150, end=200, title='Child 2')
+        main_section.add_child(child2)
+        self.assertEqual(chapter.get_section_by_offset(170), child2)
+
+        child1.end = 110
+        self.assertEqual(chapter.get_section_by_offset(120), main_section)
+
+    def test_index_follows_children_changes(self):
+        main_section = Section(level=0, start=0, end=200, title='Main')
+        chapter = Chapter('some/filename.md', 'name', main_section)
+        child1 = Section(level=1, start=100, end=150, title='Child 1')
+        main_section.add_child(child1)
+        self.assertEqual(chapter.get_section_by_offset(120), child1)
+
+        main_section.children.remove(child1)
+        self.assertEqual(chapter.get_section_by_offset(120), main_section)
+        self.assertEqual(list(chapter.iter_sections()), [main_section])
+
+        main_section.children = [child1]
+        self.assertEqual(chapter.get_section_by_offset(120), child1)
+        self.assertEqual(list(chapter.iter_sections()), [main_section, child1])
+
+    def test_unsorted_sections(self):
+        main_section = Section(level=0, start=0, end=200, title='Main')
+        chapter = Chapter('some/filename.md', 'name', main_section)
+        child1 = Section(level=1, start=100, end=150, title='Child 1')
+        child2 = Section(level=1, start=10, end=50, title='Child 2')
+        main_section.add_child(child1)
+        main_section.add_child(child2)
+        self.assertEqual(chapter.get_section_by_offset(20), main_section)
+        self.assertEqual(chapter.get_section_by_offset(120), child1)
+
+
+class TestGetSectionsInRange(TestCase):
+    def test_with_children(self):
+        main_section = Section(level=0, start=0, end=200, title='Main')
+        chapter = Chapter('some/filename.md', 'name', main_section)
+        child1 = Section(level=1, start=100, end=150, title='Child 1')
+        child11 = Section(level=2, start=120, end=150, title='Child 11')
+        child2 = Section(level=1, start=150, end=200, title='Child 2')
+        main_section.add_child(child1)
+        child1.add_child(child11)
+        main_section.add_child(child2)
+
+        self.assertEqual(chapter.get_sections_in_range(0, 100), [main_section])
+        self.assertEqual(chapter.get_sections_in_range(110, 130),
+                         [main_section, child1, child11])
+        self.assertEqual(chapter.get_sections_in_range(140, 160),
+                         [main_section, child1, child11, child2])
+        self.assertEqual(chapter.get_sections_in_range(150, 151), [main_section, child2])
+        self.assertEqual(chapter.get_sections_in_range(300, 400), [])
+
 
 class TestIterSections(TestCase):
 
@@ -189,6 +250,38 @@ class TestIterSections(TestCase):
         for section in chapter.iter_sections():
             self.assertEqual(section, sections.pop(0))
 
+    def test_follows_changes(self):
+        main_section = Section(level=0, start=0, end=200, title='Main')
+        chapter = Chapter('some/filename.md', 'name', main_section)
+        self.assertEqual(list(chapter.iter_sections()), [main_section])
+
+        child = Section(level=1, start=100, end=200, title='Child')
+        main_section.add_child(child)
+        self.assertEqual(list(chapter.iter_sections()), [main_section, child])
+
+        new_main_section = Section(level=0, start=0, end=200, title='New main')
+        chapter.main_section = new_main_section
+        self.assertEqual(list(chapter.iter_sections()), [new_main_section])
+
+    def test_deep_nesting(self):
+        depth = sys.getrecursionlimit() + 100
+        main_section = Section(level=0, start=0, end=200, title='Main')
+        section = main_section
+        for level in range(1, depth):
+            child = Section(level=level, start=0, end=200, title=f'Child {level}')
+            section.add_child(child)
+            section = child
+        chapter = Chapter('some/filename.md', 'name', main_section)
+        levels = [section.level for section in chapter.iter_sections()]
+        self.assertEqual(levels, list(range(depth)))
+
+        chapter_dict = chapter.to_dict()
+        section_dict = chapter_dict['section']
+        for level in range(depth):
+            self.assertEqual(section_dict['level'], level)
+            section_dict = section_dict['children'][0] if section_dict['children'] else None
+        self.assertIsNone(section_dict)
+
 
 class TestToDict(TestCase):
 
@@ -1,15 +1,23 @@
+import os
 import yaml
 
+from pathlib import Path
+from schema import SchemaError
+from tempfile import TemporaryDirectory
 from unittest import TestCase
+from unittest.mock import patch
 
 from .utils import TEST_DATA_PATH
 from foliant.meta.classes import Chapter
 from foliant.meta.classes import Meta
 from foliant.meta.classes import MetaChapterDoesNotExistError
 from foliant.meta.classes import MetaDublicateIDError
+from foliant.meta.classes import MetaSchemaError
 from foliant.meta.classes import MetaSectionDoesNotExistError
+from foliant.meta.classes import SECTION_SCHEMA
 from foliant.meta.classes import Section
 from foliant.meta.generate import load_meta
+from foliant.meta.lazy import read_chapter_source
 
 
 class TestLoadMetaFromFile(TestCase):
@@ -36,6 +44,190 @@ class TestLoadMetaFromFile(TestCase):
         meta.load_meta_from_file(TEST_DATA_PATH / 'meta3.yml')
         self.assertEqual(meta.dump(), source)
 
+    def test_trusted(self):
+        for name in ('meta1.yml', 'meta2.yml', 'meta3.yml'):
+            with self.subTest(name=name):
+                meta = Meta()
+                meta.load_meta_from_file(TEST_DATA_PATH / name, use_cache=False)
+                trusted_meta = Meta()
+                trusted_meta.load_meta_from_file(TEST_DATA_PATH / name,
+                                                 use_cache=False,
+                                                 trusted=True)
+                self.assertEqual(trusted_meta.dump(), meta.dump())
+
+
+class TestValidation(TestCase):
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.filename = os.path.join(self.tmp_dir.name, 'meta.yml')
+        with open(TEST_DATA_PATH / 'meta3.yml', encoding='utf8') as f:
+            self.source = yaml.load(f, yaml.Loader)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def load(self, source: dict):
+        with open(self.filename, 'w', encoding='utf8') as f:
+            yaml.dump(source, f)
+        meta = Meta()
+        meta.load_meta_from_file(self.filename, use_cache=False)
+
+    def test_wrong_type(self):
+        section = self.source['chapters'][0]['section']['children'][0]
+        section['start'] = '10'
+        with self.assertRaises(SchemaError) as cm:
+            self.load(self.source)
+        self.assertIsInstance(cm.exception, MetaSchemaError)
+        self.assertIn(f"section 'compound' > '{section['title']}'", str(cm.exception))
+        self.assertIn("Key 'start' error", str(cm.exception))
+
+    def test_nested_location(self):
+        section = self.source['chapters'][0]['section']['children'][0]
+        child = dict(section, title='Child', level=section['level'] + 1, children=[])
+        sibling = dict(child, title='Sibling', end='10')
+        section['children'] = [child, sibling]
+        with self.assertRaisesRegex(MetaSchemaError,
+                                    "section 'compound' > 'Subsection' > 'Sibling'.*Key 'end' error"):
+            self.load(self.source)
+
+    def test_missing_key(self):
+        del self.source['chapters'][0]['section']['id']
+        with self.assertRaisesRegex(MetaSchemaError, "'compound'.*Missing key: 'id'"):
+            self.load(self.source)
+
+    def test_wrong_key(self):
+        self.source['chapters'][0]['extra'] = 1
+        with self.assertRaisesRegex(MetaSchemaError, "Chapter #0: Wrong key 'extra'"):
+            self.load(self.source)
+
+    def test_bool_as_int_same_as_schema(self):
+        self.source['chapters'][0]['section']['level'] = False
+        try:
+            SECTION_SCHEMA.validate(self.source['chapters'][0]['section'])
+        except SchemaError:
+            with self.assertRaises(MetaSchemaError):
+                self.load(self.source)
+        else:
+            self.load(self.source)
+
+    def test_bool_as_int(self):
+        self.source['chapters'][0]['section']['level'] = False
+        with patch('foliant.meta.classes.BOOL_IS_INT', True):
+            self.load(self.source)
+        with patch('foliant.meta.classes.BOOL_IS_INT', False):
+            with self.assertRaises(MetaSchemaError):
+                self.load(self.source)
+
+
+class TestFind(TestCase):
+    def setUp(self):
+        self.meta = Meta()
+        self.sections = []
+        for name, types in (('first', ['api', 'guide']), ('second', ['api', None])):
+            main_section = Section(level=0, start=0, end=100, data={'type': 'chapter'})
+            for ind, type_ in enumerate(types):
+                data = {'confluence': {'page_id': ind}} if type_ else {}
+                if type_:
+                    data['type'] = type_
+                child = Section(level=1, start=ind * 10, end=ind * 10 + 10,
+                                data=data, title=f'{name} {ind}')
+                main_section.add_child(child)
+                self.sections.append(child)
+            self.meta.add_chapter(Chapter(filename=f'{name}.md', name=name,
+                                          main_section=main_section))
+
+    def check(self):
+        first_api, guide, second_api, no_data = self.sections
+        self.assertEqual(self.meta.find(type='api'), [first_api, second_api])
+        self.assertEqual(self.meta.find('confluence.page_id'), [first_api, guide, second_api])
+        self.assertEqual(self.meta.find('type', **{'confluence.page_id': 1}), [guide])
+        self.assertEqual(self.meta.find(type='api', **{'confluence.page_id': 1}), [])
+        self.assertEqual(self.meta.find(confluence={'page_id': 0}), [first_api, second_api])
+        self.assertEqual(self.meta.find(type='unknown'), [])
+        self.assertEqual(len(self.meta.find()), 6)
+
+    def test_without_index(self):
+        self.check()
+
+    def test_with_index(self):
+        self.meta.index_data()
+        self.check()
+
+    def test_index_follows_changes(self):
+        self.meta.index_data()
+        self.sections[1].data = {'type': 'api'}
+        self.assertEqual(self.meta.find(type='api'), self.sections[:3])
+
+        self.sections[0].data['type'] = 'guide'
+        self.meta.index_data()
+        self.assertEqual(self.meta.find(type='api'), self.sections[1:3])
+
+
+class TestLazyLoading(TestCase):
+    def load(self, name: str) -> Meta:
+        meta = Meta()
+        meta.load_meta_from_file(TEST_DATA_PATH / name, lazy=True)
+        return meta
+
+    def test_same_as_eager(self):
+        for name in ('meta1.yml', 'meta2.yml', 'meta3.yml'):
+            with self.subTest(name=name):
+                expected = Meta()
+                expected.load_meta_from_file(TEST_DATA_PATH / name, use_cache=False)
+                meta = self.load(name)
+                self.assertEqual(len(meta), len(expected))
+                self.assertEqual([s.id for s in meta.iter_sections()],
+                                 [s.id for s in expected.iter_sections()])
+                self.assertEqual(meta.dump(), expected.dump())
+
+    def test_chapters_loaded_on_demand(self):
+        with patch('foliant.meta.classes.read_chapter_source',
+                   wraps=read_chapter_source) as mock_read:
+            meta = self.load('meta2.yml')
+            self.assertEqual(mock_read.call_count, 0)
+
+            chapter = meta.get_chapter('src/balancer/balancer.md')
+            self.assertEqual(chapter.name, 'balancer')
+            self.assertIs(meta[1], chapter)
+            self.assertEqual(mock_read.call_count, 1)
+
+            self.assertEqual(meta[-1].name, meta.chapters[-1].name)
+            self.assertEqual(mock_read.call_count, len(meta))
+
+    def test_get_by_id(self):
+        meta = self.load('meta3.yml')
+        self.assertEqual(meta.get_by_id('subsection').id, 'subsection')
+        with self.assertRaises(MetaSectionDoesNotExistError):
+            meta.get_by_id('nonexistant_id')
+
+    def test_get_by_id_uses_index_when_loaded(self):
+        meta = self.load('meta3.yml')
+        with self.assertRaises(MetaSectionDoesNotExistError):
+            meta.get_by_id('nonexistant_id')
+        with patch.object(Meta, 'iter_sections', autospec=True,
+                          side_effect=Meta.iter_sections) as mock_iter:
+            section = meta.get_by_id('subsection')
+            meta.get_by_id('subsection')
+            self.assertEqual(mock_iter.call_count, 1)  # building the index
+        self.assertEqual(section.id, 'subsection')
+
+    def test_wrong_chapter(self):
+        with self.assertRaises(MetaChapterDoesNotExistError):
+            self.load('meta2.yml').get_chapter('wrong/chapter/path')
+
+    def test_other_layouts(self):
+        with open(TEST_DATA_PATH / 'meta2.yml', encoding='utf8') as f:
+            source = yaml.load(f, yaml.Loader)
+        with TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, 'meta.yml')
+            for kwargs in ({'sort_keys': True}, {'default_flow_style': True}):
+                with self.subTest(kwargs=kwargs):
+                    with open(filename, 'w') as f:
+                        yaml.dump(source, f, **kwargs)
+                    meta = Meta()
+                    meta.load_meta_from_file(filename, use_cache=False, lazy=True)
+                    self.assertEqual(meta.dump(), source)
+
 
 class TestProcessIds(TestCase):
     def test_load_sample_file(self):
@@ -173,6 +365,72 @@ class TestGetChapter(TestCase):
         chapter = self.meta.get_chapter(filename)
         self.assertTrue(chapter.filename.endswith('chapter_with_meta.md'))
 
+    def test_query_resolved_once(self):
+        self.meta.get_chapter('test/test_data/load_meta/chapter_only_yfm.md')
+        with patch.object(Path, 'resolve', autospec=True,
+                          side_effect=Path.resolve) as mock_resolve:
+            chapter = self.meta.get_chapter('test/test_data/load_meta/chapter_with_meta.md')
+            self.assertEqual(mock_resolve.call_count, 1)
+        self.assertTrue(chapter.filename.endswith('chapter_with_meta.md'))
+
+    def test_by_name(self):
+        chapter = self.meta.get_chapter_by_name('chapter_with_meta.md')
+        self.assertTrue(chapter.filename.endswith('chapter_with_meta.md'))
+        with self.assertRaises(MetaChapterDoesNotExistError):
+            self.meta.get_chapter_by_name('wrong_name.md')
+
+    def test_index_follows_changes(self):
+        self.meta.get_chapter('test/test_data/load_meta/chapter_with_meta.md')
+        new_chapter = Chapter(filename='test/test_data/new.md', name='new.md',
+                              main_section=Section(level=0, start=0, end=0))
+        self.meta.add_chapter(new_chapter)
+        self.assertIs(self.meta.get_chapter('test/test_data/new.md'), new_chapter)
+        self.assertIs(self.meta.get_chapter_by_name('new.md'), new_chapter)
+
+        new_chapter.filename = 'test/test_data/renamed.md'
+        self.assertIs(self.meta.get_chapter('test/test_data/renamed.md'), new_chapter)
+        with self.assertRaises(MetaChapterDoesNotExistError):
+            self.meta.get_chapter('test/test_data/new.md')
+
+        new_chapter.name = 'renamed.md'
+        self.assertIs(self.meta.get_chapter_by_name('renamed.md'), new_chapter)
+        with self.assertRaises(MetaChapterDoesNotExistError):
+            self.meta.get_chapter_by_name('new.md')
+
+    def test_miss_does_not_rebuild(self):
+        self.meta.get_chapter('test/test_data/load_meta/chapter_only_yfm.md')
+        with patch.object(Path, 'resolve', autospec=True,
+                          side_effect=Path.resolve) as mock_resolve:
+            for _ in range(3):
+                with self.assertRaises(MetaChapterDoesNotExistError):
+                    self.meta.get_chapter('wrong/chapter/path')
+            self.assertEqual(mock_resolve.call_count, 3)
+
+    def test_rename_resolves_changed_chapter(self):
+        self.meta.get_chapter('test/test_data/load_meta/chapter_only_yfm.md')
+        chapter = self.meta.chapters[0]
+        original = chapter.filename
+        with patch.object(Path, 'resolve', autospec=True,
+                          side_effect=Path.resolve) as mock_resolve:
+            chapter.filename = 'test/test_data/renamed.md'
+            self.assertEqual(mock_resolve.call_count, 1)
+        self.assertIs(self.meta.get_chapter('test/test_data/renamed.md'), chapter)
+
+        duplicate = Chapter(filename=original, name='duplicate.md',
+                            main_section=Section(level=0, start=0, end=0))
+        self.meta.add_chapter(duplicate)
+        chapter.filename = original
+        self.assertIs(self.meta.get_chapter(original), chapter)
+
+    def test_name_index_without_resolve(self):
+        with patch.object(Path, 'resolve', autospec=True,
+                          side_effect=Path.resolve) as mock_resolve:
+            chapter = self.meta.get_chapter_by_name('chapter_with_meta.md')
+            self.meta.chapters[0].name = 'renamed.md'
+            self.assertEqual(mock_resolve.call_count, 0)
+        self.assertTrue(chapter.filename.endswith('chapter_with_meta.md'))
+        self.assertIs(self.meta.get_chapter_by_name('renamed.md'), self.meta.chapters[0])
+
 
 class TestGetByID(TestCase):
     def test_id_exists(self):
@@ -188,3 +446,36 @@ class TestGetByID(TestCase):
         id_ = 'nonexistant_id'
         with self.assertRaises(MetaSectionDoesNotExistError):
             section = meta.get_by_id(id_)
+
+    def test_index_follows_changes(self):
+        meta = Meta()
+        meta.load_meta_from_file(TEST_DATA_PATH / 'meta3.yml', use_cache=False)
+        section = meta.get_by_id('subsection')
+        section.id = 'renamed'
+        self.assertIs(meta.get_by_id('renamed'), section)
+        with self.assertRaises(MetaSectionDoesNotExistError):
+            meta.get_by_id('subsection')
+
+        child = Section(level=section.level + 1, start=0, end=0, title='child')
+        child.id = 'new_child'
+        section.add_child(child)
+        self.assertIs(meta.get_by_id('new_child'), child)
+
+        chapter = Chapter(filename='new.md', name='new',
+                          main_section=Section(level=0, start=0, end=0, data={'id': 'new_main'}))
+        meta.add_chapter(chapter)
+        meta.process_ids()
+        self.assertIs(meta.get_by_id('new_main'), chapter.main_section)
+
+        section.parent.children.remove(section)
+        with self.assertRaises(MetaSectionDoesNotExistError):
+            meta.get_by_id('renamed')
+
+    def test_index_of_other_meta_kept(self):
+        meta = Meta()
+        meta.load_meta_from_file(TEST_DATA_PATH / 'meta3.yml', use_cache=False)
+        other = Meta()
+        other.load_meta_from_file(TEST_DATA_PATH / 'meta1.yml', use_cache=False)
+        id_index = meta._get_id_index()
+        other.get_by_id(next(other.iter_sections()).id).id = 'renamed'
+        self.assertIs(meta._get_id_index(), id_index)
@@ -1,8 +1,15 @@
+import os
+
+from tempfile import TemporaryDirectory
 from unittest import TestCase
 from unittest.mock import Mock
+from unittest.mock import patch
 
 from foliant.meta.classes import MetaHierarchyError
+from foliant.meta.classes import MetaSectionNoByteOffsetsError
 from foliant.meta.classes import Section
+from foliant.meta.generate import get_meta_for_chapter
+from foliant.meta.sources import source_cache
 
 
 class TestAddChild(TestCase):
@@ -92,6 +99,16 @@ class TestToDict(TestCase):
         }
         self.assertEqual(section.to_dict(), expected)
 
+    def test_byte_offsets(self):
+        section = Section(level=0, start=0, end=100, title='Main Title',
+                          start_byte=0, end_byte=120)
+        section.id = '1'
+        self.assertEqual((section.to_dict()['start_byte'], section.to_dict()['end_byte']),
+                         (0, 120))
+        result = section.to_dict(byte_offsets=False)
+        self.assertNotIn('start_byte', result)
+        self.assertNotIn('end_byte', result)
+
     def test_with_children(self):
         parent = Section(level=0,
                          start=0,
@@ -198,3 +215,86 @@ class TestIterChildren(TestCase):
         children = [child1, child11, child12, child2, child3]
         for child in parent.iter_children():
             self.assertEqual(child, children.pop(0))
+
+
+class TestSlots(TestCase):
+    def test_no_dict(self):
+        section = Section(level=0, start=0, end=100, title='Title')
+        self.assertFalse(hasattr(section, '__dict__'))
+        with self.assertRaises(AttributeError):
+            section.unknown = 'value'
+
+
+class TestGetSource(TestCase):
+    source = ('---\r\ntitle: Заголовок\r\n---\r\n\r\n'
+              '# Первый\r\n\r\n<meta id="first"></meta>\r\n\r\nТекст ✓\r\n\r\n'
+              '## Second\r\n\r\n<meta id="second"></meta>\r\n\r\ntext\r\n'
+              '# Третий\r\n\r\n<meta id="third"></meta>\r\n\r\nend\r\n')
+
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.filename = os.path.join(self.tmp_dir.name, 'chapter.md')
+        with open(self.filename, 'w', encoding='utf8', newline='') as f:
+            f.write(self.source)
+        self.chapter = get_meta_for_chapter(self.filename)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_byte_offsets(self):
+        raw = self.source.encode('utf8')
+        for section in self.chapter.iter_sections():
+            start_byte, end_byte = section.byte_span
+            self.assertEqual(section.get_source_bytes(), raw[start_byte:end_byte])
+        first = self.chapter.main_section.children[0]
+        self.assertTrue(first.get_source_bytes().startswith('# Первый'.encode('utf8')))
+        self.assertTrue(first.get_source_bytes().endswith(b'text\r\n'))
+
+    def test_same_as_char_offsets(self):
+        with open(self.filename, encoding='utf8') as f:
+            translated = f.read()
+        for section in self.chapter.iter_sections():
+            self.assertEqual(section.get_source(without_meta=False),
+                             translated[section.start:section.end])
+
+    def test_without_byte_offsets(self):
+        section = self.chapter.main_section.children[1]
+        expected = section.get_source()
+        section.start_byte = section.end_byte = None
+        self.assertIsNone(section.byte_span)
+        self.assertEqual(section.get_source(), expected)
+        with self.assertRaises(MetaSectionNoByteOffsetsError):
+            section.get_source_bytes()
+
+    def test_large_chapter(self):
+        expected = [section.get_source() for section in self.chapter.iter_sections()]
+        size_limit = source_cache.size_limit
+        source_cache.size_limit = 10
+        try:
+            result = [section.get_source() for section in self.chapter.iter_sections()]
+        finally:
+            source_cache.size_limit = size_limit
+        self.assertEqual(result, expected)
+
+    def test_large_chapter_without_byte_offsets(self):
+        expected = [section.get_source() for section in self.chapter.iter_sections()]
+        expected_iter = list(self.chapter.iter_sources())
+        for section in self.chapter.iter_sections():
+            section.start_byte = section.end_byte = None
+        size_limit = source_cache.size_limit
+        source_cache.size_limit = 10
+        try:
+            with patch('foliant.meta.sources.MetaSpans') as mock_spans:
+                result = [section.get_source() for section in self.chapter.iter_sections()]
+                result_iter = list(self.chapter.iter_sources())
+                mock_spans.assert_not_called()
+        finally:
+            source_cache.size_limit = size_limit
+        self.assertEqual(result, expected)
+        self.assertEqual(result_iter, expected_iter)
+
+    def test_iter_sources(self):
+        for without_meta in (True, False):
+            expected = [(section, section.get_source(without_meta))
+                        for section in self.chapter.iter_sections()]
+            self.assertEqual(list(self.chapter.iter_sources(without_meta)), expected)
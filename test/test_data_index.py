@@ -0,0 +1,33 @@
+from unittest import TestCase
+
+from foliant.meta.data_index import EXISTS
+from foliant.meta.data_index import iter_data_items
+from foliant.meta.data_index import matches
+
+
+class TestIterDataItems(TestCase):
+    def test_nested(self):
+        data = {'type': 'api', 'confluence': {'page_id': 5, 'space': {'key': 'DOC'}}}
+        self.assertEqual(sorted(iter_data_items(data), key=lambda item: item[0]),
+                         [('confluence', data['confluence']),
+                          ('confluence.page_id', 5),
+                          ('confluence.space', {'key': 'DOC'}),
+                          ('confluence.space.key', 'DOC'),
+                          ('type', 'api')])
+
+    def test_empty(self):
+        self.assertEqual(list(iter_data_items({})), [])
+
+
+class TestMatches(TestCase):
+    data = {'type': 'api', 'tags': ['a', 'b'], 'confluence': {'page_id': 5}}
+
+    def test_values(self):
+        self.assertTrue(matches(self.data, [('type', 'api'), ('confluence.page_id', 5)]))
+        self.assertTrue(matches(self.data, [('tags', ['a', 'b'])]))
+        self.assertFalse(matches(self.data, [('type', 'api'), ('confluence.page_id', 6)]))
+
+    def test_exists(self):
+        self.assertTrue(matches(self.data, [('confluence.page_id', EXISTS)]))
+        self.assertFalse(matches(self.data, [('confluence.title', EXISTS)]))
+        self.assertTrue(matches(self.data, []))
@@ -0,0 +1,124 @@
+from unittest import TestCase
+
+from foliant.meta.classes import Chapter
+from foliant.meta.classes import Meta
+from foliant.meta.classes import Section
+from foliant.meta.diff import diff_meta
+from foliant.meta.diff import get_unordered
+
+
+def make_meta(chapters: list) -> Meta:
+    '''
+    :param chapters: list of tuples (chapter name, list of tuples
+                     (section id, level, data, length)). Section ids are set
+                     in data, as if they were set in meta tags.
+    '''
+    meta = Meta()
+    for name, sections in chapters:
+        main_section = Section(level=0, start=0, end=1000, title=name)
+        main_section.id = f'{name}-main'
+        parents = [main_section]
+        for id_, level, data, length in sections:
+            section = Section(level=level, start=0, end=length,
+                              data={'id': id_, **data}, title=id_.title())
+            section.id = id_
+            while parents[-1].level >= level:
+                parents.pop()
+            parents[-1].add_child(section)
+            parents.append(section)
+        meta.add_chapter(Chapter(filename=f'src/{name}.md', name=name,
+                                 main_section=main_section))
+    return meta
+
+
+class TestGetUnordered(TestCase):
+    def test_sorted(self):
+        self.assertEqual(get_unordered([]), set())
+        self.assertEqual(get_unordered([0, 1, 5]), set())
+
+    def test_moved(self):
+        self.assertEqual(get_unordered([1, 2, 0]), {2})
+        self.assertEqual(get_unordered([3, 0, 1, 2]), {0})
+        self.assertEqual(len(get_unordered([4, 3, 2, 1, 0])), 4)
+
+
+class TestDiffMeta(TestCase):
+    old = [('intro', [('overview', 1, {}, 100),
+                      ('usage', 1, {'type': 'guide'}, 100),
+                      ('options', 2, {}, 50)]),
+           ('api', [('get', 1, {'type': 'api'}, 100),
+                    ('post', 1, {'type': 'api'}, 100),
+                    ('delete', 1, {'type': 'api'}, 100)]),
+           ('old', [])]
+
+    def test_no_changes(self):
+        self.assertEqual(list(diff_meta(make_meta(self.old), make_meta(self.old))), [])
+
+    def test_chapters(self):
+        new = [self.old[1], ('new', []), self.old[0]]
+        events = list(diff_meta(make_meta(self.old), make_meta(new)))
+        self.assertEqual(events[:3], [
+            {'event': 'removed', 'type': 'chapter', 'name': 'old',
+             'filename': 'src/old.md', 'position': 2},
+            {'event': 'added', 'type': 'chapter', 'name': 'new',
+             'filename': 'src/new.md', 'position': 1},
+            {'event': 'moved', 'type': 'chapter', 'name': 'api', 'from': 1, 'to': 0},
+        ])
+        self.assertEqual([event['id'] for event in events[3:]], ['old-main', 'new-main'])
+
+    def test_sections(self):
+        new = [('intro', [('overview', 1, {}, 120),
+                          ('usage', 1, {'type': 'tutorial'}, 100),
+                          ('new', 2, {}, 10)]),
+               ('api', [('delete', 1, {'type': 'api'}, 100),
+                        ('get', 1, {'type': 'api'}, 100),
+                        ('post', 1, {'type': 'api'}, 100),
+                        ('options', 2, {}, 50)]),
+               ('old', [])]
+        events = list(diff_meta(make_meta(self.old), make_meta(new)))
+        self.assertEqual(events, [
+            {'event': 'changed', 'type': 'section', 'id': 'overview', 'chapter': 'intro',
+             'fields': {'length': [100, 120]}},
+            {'event': 'changed', 'type': 'section', 'id': 'usage', 'chapter': 'intro',
+             'fields': {'data': [{'id': 'usage', 'type': 'guide'},
+                                 {'id': 'usage', 'type': 'tutorial'}]}},
+            {'event': 'added', 'type': 'section', 'id': 'new', 'chapter': 'intro',
+             'parent': 'usage', 'title': 'New'},
+            {'event': 'moved', 'type': 'section', 'id': 'delete',
+             'from': {'chapter': 'api', 'parent': 'api-main'},
+             'to': {'chapter': 'api', 'parent': 'api-main'}},
+            {'event': 'moved', 'type': 'section', 'id': 'options',
+             'from': {'chapter': 'intro', 'parent': 'usage'},
+             'to': {'chapter': 'api', 'parent': 'post'}},
+        ])
+
+    def test_generated_ids(self):
+        def make_generated_meta(titles: list, main_title: str = 'API') -> Meta:
+            meta = Meta()
+            main_section = Section(level=0, start=0, end=1000, title=main_title)
+            for title, child_title in titles:
+                section = Section(level=1, start=0, end=100, title=title)
+                section.add_child(Section(level=2, start=0, end=50, title=child_title))
+                main_section.add_child(section)
+            meta.add_chapter(Chapter(filename='src/api.md', name='api',
+                                     main_section=main_section))
+            meta.process_ids()
+            return meta
+
+        old = make_generated_meta([('Get', 'Parameters'), ('Post', 'Parameters')])
+        new = make_generated_meta([('Get', 'Params'), ('Post', 'Parameters')])
+        self.assertEqual(list(diff_meta(old, new)), [
+            {'event': 'removed', 'type': 'section', 'id': 'parameters', 'chapter': 'api',
+             'title': 'Parameters'},
+            {'event': 'added', 'type': 'section', 'id': 'params', 'chapter': 'api',
+             'parent': 'get', 'title': 'Params'},
+            {'event': 'changed', 'type': 'section', 'id': 'parameters', 'chapter': 'api',
+             'fields': {'id': ['parameters-2', 'parameters']}},
+        ])
+
+        renamed = make_generated_meta([('Get', 'Parameters'), ('Post', 'Parameters')],
+                                      main_title='API Reference')
+        self.assertEqual(list(diff_meta(old, renamed)), [
+            {'event': 'changed', 'type': 'section', 'id': 'api-reference', 'chapter': 'api',
+             'fields': {'id': ['api', 'api-reference'], 'title': ['API', 'API Reference']}},
+        ])
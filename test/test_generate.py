@@ -5,9 +5,12 @@ from unittest import TestCase
 from unittest.mock import patch
 
 from foliant.meta.generate import Chunk
+from foliant.meta.generate import MetaChapterParseError
 from foliant.meta.generate import fix_chunk_ends
+from foliant.meta.generate import get_header_and_chunks
 from foliant.meta.generate import get_meta_for_chapter
 from foliant.meta.generate import get_section
+from foliant.meta.generate import iter_sections
 from foliant.meta.generate import load_meta
 from foliant.meta.generate import split_by_headings
 
@@ -55,6 +58,52 @@ class TestFixChunkEnds(TestCase):
             self.assertEqual((chunk.start, chunk.end), (start, end))
 
 
+class TestIterSections(TestCase):
+    def make_chunks(self, levels, with_meta):
+        pos = list(range(0, 100 * (len(levels) + 1), 100))
+        header = Chunk(title='', level=0, content='', start=0, end=pos[-1])
+        chunks = (Chunk(title=f'Title {i}',
+                        level=level,
+                        content='<meta></meta>' if meta else '',
+                        start=start,
+                        end=end)
+                  for i, (level, meta, start, end) in enumerate(zip(levels,
+                                                                     with_meta,
+                                                                     pos[:-1],
+                                                                     pos[1:])))
+        return header, chunks
+
+    def test_yield_order_and_ends(self):
+        header, chunks = self.make_chunks([1, 2, 3, 1, 2],
+                                          [True, True, True, True, False])
+        sections = list(iter_sections(header, chunks))
+        self.assertEqual([s.title for s in sections],
+                         ['Title 2', 'Title 1', 'Title 0', 'Title 3', ''])
+        self.assertEqual([(s.start, s.end) for s in sections],
+                         [(200, 300), (100, 300), (0, 300), (300, 500), (0, 500)])
+        main_section = sections[-1]
+        self.assertTrue(main_section.is_main())
+        self.assertEqual([c.title for c in main_section.children],
+                         ['Title 0', 'Title 3'])
+
+    def test_parent_without_meta_between(self):
+        header, chunks = self.make_chunks([2, 1, 3],
+                                          [True, False, True])
+        sections = list(iter_sections(header, chunks))
+        main_section = sections[-1]
+        self.assertEqual(len(main_section.children), 1)
+        self.assertEqual(main_section.children[0].children[0].title, 'Title 2')
+        self.assertEqual(main_section.children[0].end, 100)
+
+    def test_deep_run(self):
+        levels = [1] + [4] * 10000
+        header, chunks = self.make_chunks(levels, [True] * len(levels))
+        sections = list(iter_sections(header, chunks))
+        main_section = sections[-1]
+        self.assertEqual(len(main_section.children[0].children), 10000)
+        self.assertEqual(main_section.children[0].end, 100 * len(levels))
+
+
 class TestSplitByHeadings(TestCase):
     def test_split_by_headings(self):
         source = get_test_data_text('split_by_headings.md')
@@ -221,6 +270,27 @@ class TestGetSection(TestCase):
         self.assertFalse(mock_yfm.called)
         self.assertTrue(mock_tag.called)
 
+    def test_scanned_meta_tag(self):
+        content = 'Text <meta field="value" num="1"></meta> and <meta other="x"></meta>'
+        header, chunks = get_header_and_chunks(f'# Title\n\n{content}')
+        chunk = next(chunks)
+        self.assertEqual(chunk.meta_tag, (6, 41, 'field="value" num="1"'))
+        with patch('foliant.meta.generate.get_meta_dict_from_meta_tag') as mock_tag:
+            section = get_section(chunk)
+            self.assertFalse(mock_tag.called)
+        self.assertEqual(section.data, {'field': 'value', 'num': 1})
+
+    def test_scanned_meta_tag_search_limit(self):
+        header, chunks = get_header_and_chunks('# Title\n\nText <meta a="1"></meta>')
+        chunk = next(chunks)
+        self.assertIsNone(get_section(chunk, meta_search_limit=6))
+        self.assertEqual(get_section(chunk, meta_search_limit=7).data, {'a': 1})
+
+    def test_scanned_without_meta_tag(self):
+        header, chunks = get_header_and_chunks('<meta a="1"></meta>\n# Title\n\nText')
+        self.assertEqual(header.meta_tag, (0, 19, 'a="1"'))
+        self.assertIsNone(next(chunks).meta_tag)
+
 
 class TestGetMetaForChapter(TestCase):
     def test_nonexisting_file(self):
@@ -285,6 +355,15 @@ class TestGetMetaForChapter(TestCase):
         self.assertEqual(main_section.data, expected_data)
         self.assertEqual(len(main_section.children), 0)
 
+    def test_no_meta_markers(self):
+        ch_path = TEST_DATA_PATH / 'load_meta/chapter_without_meta.md'
+        with patch('foliant.meta.generate.get_header_and_chunks') as mock_split:
+            chapter = get_meta_for_chapter(ch_path)
+            self.assertFalse(mock_split.called)
+        self.assertEqual(chapter.main_section.data, {})
+        self.assertEqual(chapter.main_section.title, 'Heading')
+        self.assertEqual(chapter.main_section.children, [])
+
     def test_chapter_only_meta_tag(self):
         ch_path = TEST_DATA_PATH / 'chapter_only_meta_tag.md'
         expected_data = {'field1': 'value1', 'field2': True}
@@ -310,3 +389,27 @@ class TestLoadMeta(TestCase):
             expected = yaml.load(f, yaml.Loader)
         meta = load_meta(chapters, md_root)
         self.assertEqual(meta.dump(), expected)
+
+    def test_folder_parallel(self):
+        md_root = 'test/test_data/load_meta'
+        chapters = [
+            'chapter_only_yfm.md',
+            'chapter_with_meta.md',
+            'chapter_with_one_meta_tag.md',
+            'chapter_without_meta.md'
+        ]
+        with open('test/test_data/load_meta.yml') as f:
+            expected = yaml.load(f, yaml.Loader)
+        meta_processes = load_meta(chapters, md_root, jobs=2)
+        self.assertEqual(meta_processes.dump(), expected)
+        meta_threads = load_meta(chapters, md_root, jobs=0, use_threads=True)
+        self.assertEqual(meta_threads.dump(), expected)
+
+    def test_worker_error_points_to_chapter(self):
+        md_root = 'test/test_data/load_meta'
+        chapters = ['chapter_only_yfm.md', 'chapter_with_meta.md']
+        with patch('foliant.meta.generate.get_main_section',
+                   side_effect=ValueError('broken')):
+            with self.assertRaisesRegex(MetaChapterParseError,
+                                        'chapter_only_yfm.md.*broken'):
+                load_meta(chapters, md_root, jobs=2, use_threads=True)
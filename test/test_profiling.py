@@ -0,0 +1,106 @@
+import os
+import yaml
+
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from foliant.meta.generate import load_meta
+from foliant.meta.profiling import MetaHooks
+from foliant.meta.profiling import NULL_PHASE
+from foliant.meta.profiling import Profiler
+from foliant.meta.profiling import phase
+
+MD_ROOT = 'test/test_data/load_meta'
+CHAPTERS = [
+    'chapter_only_yfm.md',
+    'chapter_with_meta.md',
+    'chapter_with_one_meta_tag.md',
+    'chapter_without_meta.md',
+    'missing_chapter.md'
+]
+
+
+class RecordingHooks(MetaHooks):
+    def __init__(self):
+        self.events = []
+
+    def chapter_start(self, name):
+        self.events.append(('chapter_start', name))
+
+    def chapter_finish(self, name, chapter, elapsed):
+        self.events.append(('chapter_finish', name, chapter is not None))
+
+    def phase_start(self, phase):
+        self.events.append(('phase_start', phase))
+
+    def phase_finish(self, phase, elapsed):
+        self.events.append(('phase_finish', phase))
+
+
+class TestHooks(TestCase):
+    def test_phase_without_hooks(self):
+        self.assertIs(phase(None, 'read'), NULL_PHASE)
+
+    def test_same_result(self):
+        with open('test/test_data/load_meta.yml') as f:
+            expected = yaml.load(f, yaml.Loader)
+        meta = load_meta(CHAPTERS, MD_ROOT, jobs=2, hooks=RecordingHooks())
+        self.assertEqual(meta.dump(), expected)
+
+    def test_events(self):
+        hooks = RecordingHooks()
+        load_meta(CHAPTERS, MD_ROOT, hooks=hooks)
+        starts = [event[1] for event in hooks.events if event[0] == 'chapter_start']
+        self.assertEqual(starts, CHAPTERS)
+        self.assertEqual(hooks.events[:4], [('chapter_start', 'chapter_only_yfm.md'),
+                                            ('phase_start', 'read'),
+                                            ('phase_finish', 'read'),
+                                            ('phase_start', 'split')])
+        self.assertIn(('chapter_finish', 'chapter_with_meta.md', True), hooks.events)
+        self.assertIn(('chapter_finish', 'missing_chapter.md', False), hooks.events)
+        self.assertEqual(hooks.events[-2:], [('phase_start', 'process_ids'),
+                                             ('phase_finish', 'process_ids')])
+
+    def test_chapter_without_meta_is_not_split(self):
+        hooks = RecordingHooks()
+        load_meta(['chapter_without_meta.md'], MD_ROOT, hooks=hooks)
+        phases = [event[1] for event in hooks.events if event[0] == 'phase_finish']
+        self.assertEqual(phases, ['read', 'byte_offsets', 'process_ids'])
+
+
+class TestProfiler(TestCase):
+    def test_timings(self):
+        with Profiler() as profiler:
+            meta = load_meta(CHAPTERS, MD_ROOT, hooks=profiler)
+        self.assertEqual(profiler.phases['read'][0], 4)
+        self.assertEqual(profiler.phases['process_ids'][0], 1)
+        self.assertEqual(set(profiler.chapters), set(CHAPTERS))
+        self.assertEqual(profiler.chapters['missing_chapter.md']['sections'], 0)
+        self.assertGreater(profiler.total, 0)
+
+        chapter = meta.get_chapter_by_name('chapter_with_meta.md')
+        record = profiler.chapters['chapter_with_meta.md']
+        self.assertEqual(record['sections'], len(list(chapter.iter_sections())))
+        self.assertEqual(set(record['phases']), {'read', 'split', 'sections', 'byte_offsets'})
+        self.assertLessEqual(sum(record['phases'].values()), record['time'])
+
+        slowest = profiler.get_slowest_chapters(2)
+        self.assertEqual(len(slowest), 2)
+        self.assertGreaterEqual(slowest[0][1]['time'], slowest[1][1]['time'])
+
+        report = profiler.format_report(top=1)
+        self.assertIn('process_ids', report)
+        self.assertIn(slowest[0][0], report)
+        self.assertNotIn(slowest[1][0], report)
+
+    def test_dump_stats(self):
+        with Profiler(calls=True) as profiler:
+            load_meta(CHAPTERS, MD_ROOT, hooks=profiler)
+        with TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, 'profile.out')
+            profiler.dump_stats(filename)
+            self.assertGreater(os.path.getsize(filename), 0)
+
+    def test_dump_stats_without_calls(self):
+        with self.assertRaises(ValueError):
+            Profiler().dump_stats('profile.out')
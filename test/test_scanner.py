@@ -0,0 +1,88 @@
+from unittest import TestCase
+
+from foliant.meta.patterns import META_TAG_PATTERN
+from foliant.meta.scanner import compare_with_regex
+from foliant.meta.scanner import find_yfm
+from foliant.meta.scanner import iter_scanned_chunks
+from foliant.meta.scanner import scan
+from foliant.meta.tools import get_header_content
+from foliant.meta.tools import iter_chunks
+
+from .utils import TEST_DATA_PATH
+from .utils import get_test_data_text
+
+
+TRICKY_SOURCES = [
+    '',
+    '# Heading without line break',
+    '# Heading\n',
+    '# Heading\n## Heading right after heading\n\ncontent\n',
+    '#\n# \n####### Too deep\n# Title\ncontent\n',
+    '---\nfield: value\n# comment: in yfm\n---\n\n# Heading\n\ntext\n\n---\n\ntext\n',
+    '---\nfield: value\n---\n# Heading\n<meta field="value"></meta>\n',
+    'text <<meta></meta> <meta a="1" b="2">body</meta>\n# Heading\n<meta>\n# Next\n</meta>\n',
+    '# Heading\n<meta field="value">\n<meta></meta>\n',
+    '# Heading\n```\n# code comment\n```\n<meta></meta>\n',
+]
+
+
+class TestScan(TestCase):
+    def assertSameAsRegex(self, source):
+        result = scan(source)
+        self.assertEqual(list(iter_scanned_chunks(source, result)),
+                         list(iter_chunks(source)))
+        header = get_header_content(source)
+        self.assertEqual(source[:result.header_end], header)
+
+        def tag_span(start, end):
+            match = META_TAG_PATTERN.search(source[start:end])
+            if match:
+                return (match.start() + start,
+                        match.end() + start,
+                        match.group('options'))
+        self.assertEqual(result.header_meta, tag_span(0, result.header_end))
+        for _, _, _, content_start, end, meta_tag in result.chunks:
+            self.assertEqual(meta_tag, tag_span(content_start, end))
+
+    def test_test_data(self):
+        for path_ in sorted(TEST_DATA_PATH.glob('**/*.md')):
+            with self.subTest(path=path_.name):
+                self.assertSameAsRegex(path_.read_text(encoding='utf8'))
+
+    def test_tricky_sources(self):
+        for source in TRICKY_SOURCES:
+            with self.subTest(source=source):
+                self.assertSameAsRegex(source)
+
+    def test_meta_tag_spans(self):
+        source = '# Heading\n\n<meta field="value"></meta>\n'
+        result = scan(source)
+        start, end, options = result.chunks[0][5]
+        self.assertEqual(source[start:end], '<meta field="value"></meta>')
+        self.assertEqual(options, 'field="value"')
+
+
+class TestFindYfm(TestCase):
+    def test_no_yfm(self):
+        self.assertEqual(find_yfm('# Heading\n---\n'), (None, 0))
+
+    def test_yfm(self):
+        source = get_test_data_text('split_by_headings.md')
+        yfm, offset = find_yfm(source)
+        self.assertEqual(source[slice(*yfm)], '---\nfield: value\n#commented: field\n---')
+        self.assertEqual(offset, yfm[1])
+
+    def test_greedy_offset(self):
+        source = '---\nfield: value\n---\n\ntext\n---\n# Heading\n'
+        yfm, offset = find_yfm(source)
+        self.assertEqual(yfm, (0, 20))
+        self.assertEqual(offset, 30)
+
+
+class TestCompareWithRegex(TestCase):
+    def test_stats(self):
+        source = get_test_data_text('split_by_headings.md')
+        stats = compare_with_regex(source, repeat=1)
+        self.assertGreater(stats['regex']['passes'], stats['scanner']['passes'])
+        for name in ('scanner', 'regex'):
+            self.assertIn('chars_per_second', stats[name])
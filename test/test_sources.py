@@ -0,0 +1,89 @@
+import os
+
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from foliant.meta.sources import ChapterSourceCache
+from foliant.meta.sources import MetaSpans
+from foliant.meta.tools import remove_meta
+
+
+class TestChapterSourceCache(TestCase):
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.paths = []
+        for name in ('a.md', 'b.md', 'c.md'):
+            path_ = os.path.join(self.tmp_dir.name, name)
+            self.write(path_, f'# {name}\r\n\r\ntext\r\n', 1)
+            self.paths.append(path_)
+        self.cache = ChapterSourceCache()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, path_, content, mtime):
+        with open(path_, 'w', newline='') as f:
+            f.write(content)
+        os.utime(path_, (mtime, mtime))
+
+    def test_read_once(self):
+        for _ in range(3):
+            self.assertEqual(self.cache.get(self.paths[0]), '# a.md\n\ntext\n')
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 1))
+
+    def test_changed_file(self):
+        self.cache.get(self.paths[0])
+        self.write(self.paths[0], '# changed\n', 2)
+        self.assertEqual(self.cache.get(self.paths[0]), '# changed\n')
+        self.assertEqual(self.cache.misses, 2)
+        self.assertEqual(self.cache.size, os.path.getsize(self.paths[0]))
+
+    def test_size_limit(self):
+        file_size = os.path.getsize(self.paths[0])
+        self.cache.size_limit = file_size * 2
+        for path_ in self.paths:
+            self.cache.get(path_)
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.size, file_size * 2)
+
+        # least recently used file is removed
+        self.cache.get(self.paths[1])
+        self.cache.get(self.paths[0])
+        self.assertEqual(self.cache.misses, 4)
+        self.cache.get(self.paths[1])
+        self.assertEqual(self.cache.hits, 2)
+
+    def test_large_file(self):
+        self.cache.size_limit = 5
+        self.assertFalse(self.cache.fits(self.paths[0]))
+        self.assertEqual(self.cache.get(self.paths[0]), '# a.md\n\ntext\n')
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.get_with_spans(self.paths[0]), ('# a.md\n\ntext\n', None))
+
+    def test_spans_cached(self):
+        source, spans = self.cache.get_with_spans(self.paths[0])
+        self.assertIs(self.cache.get_with_spans(self.paths[0])[1], spans)
+        self.write(self.paths[0], 'changed <meta a="1"></meta>', 2)
+        source, spans = self.cache.get_with_spans(self.paths[0])
+        self.assertEqual(len(spans), 1)
+
+
+class TestMetaSpans(TestCase):
+    source = ('---\ntitle: Title\n<meta a="1"></meta>\n---\n\n  <meta b="2"></meta>\n'
+              '# First\n\n<meta id="first"></meta>\n\ntext <<meta></meta>\n'
+              '## Second\n\n<meta id="second">\n# Third\n</meta>\n\nend\n')
+
+    def test_same_as_remove_meta(self):
+        spans = MetaSpans(self.source)
+        self.assertEqual(len(spans), 4)
+        length = len(self.source)
+        for start in range(-1, length + 2):
+            for end in range(start - 1, length + 2):
+                self.assertEqual(spans.remove_meta(self.source, start, end),
+                                 remove_meta(self.source[start:end]))
+
+    def test_no_meta(self):
+        source = '# Title\n\ntext\n'
+        spans = MetaSpans(source)
+        self.assertEqual(len(spans), 0)
+        self.assertEqual(spans.remove_meta(source, 0, len(source)), source)
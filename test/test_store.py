@@ -0,0 +1,73 @@
+from unittest import TestCase
+
+from .utils import TEST_DATA_PATH
+from foliant.meta.classes import Meta
+from foliant.meta.classes import MetaSectionDoesNotExistError
+from foliant.meta.store import SectionStore
+from foliant.meta.store import SectionView
+from foliant.meta.store import StoreChapter
+
+
+def get_fields(section):
+    return (section.id, section.title, section.level, section.span,
+            section.byte_span, section.data, section.is_main(),
+            section.parent.id if section.parent else None,
+            [child.id for child in section.children],
+            section.chapter.name, section.filename)
+
+
+class TestSectionStore(TestCase):
+    def setUp(self):
+        self.meta = Meta()
+        self.meta.load_meta_from_file(TEST_DATA_PATH / 'meta3.yml', use_cache=False)
+        self.store = SectionStore(self.meta)
+
+    def test_same_sections(self):
+        sections = list(self.meta.iter_sections())
+        views = list(self.store.iter_sections())
+        self.assertEqual(len(views), len(sections))
+        self.assertEqual(len(self.store), len(sections))
+        for section, view in zip(sections, views):
+            self.assertIsInstance(view, SectionView)
+            self.assertEqual(get_fields(view), get_fields(section))
+
+    def test_same_chapters(self):
+        self.assertEqual([chapter.to_dict() for chapter in self.store.chapters],
+                         [chapter.to_dict() for chapter in self.meta])
+
+    def test_get_by_id(self):
+        for section in self.meta.iter_sections():
+            view = self.store.get_by_id(section.id)
+            self.assertEqual(get_fields(view), get_fields(section))
+        with self.assertRaises(MetaSectionDoesNotExistError):
+            self.store.get_by_id('nonexistent')
+
+    def test_views(self):
+        self.assertEqual(self.store[0], self.store[0])
+        self.assertIs(self.store[0], self.store.chapters[0].main_section)
+        self.assertEqual(self.store[-1], list(self.store.iter_sections())[-1])
+        with self.assertRaises(IndexError):
+            self.store[len(self.store)]
+
+    def test_read_only(self):
+        view = self.store[1]
+        with self.assertRaises(AttributeError):
+            view.title = 'new title'
+        with self.assertRaises(AttributeError):
+            view.add_child(self.store[2])
+
+    def test_views_not_kept(self):
+        chapter = self.store.chapters[0]
+        self.assertIsInstance(chapter, StoreChapter)
+        sections = list(chapter.iter_sections())
+        self.assertIsNone(chapter._sections)
+        self.assertEqual(list(chapter.iter_sections()), sections)
+        self.assertFalse(hasattr(sections[-1], '__dict__'))
+        self.assertEqual(SectionView.__slots__, ['_store', '_ind'])
+
+    def test_chapter_methods(self):
+        for chapter, original in zip(self.store.chapters, self.meta):
+            offset = original.main_section.end // 2
+            self.assertEqual(chapter.get_section_by_offset(offset).id,
+                             original.get_section_by_offset(offset).id)
+            self.assertIs(chapter.main_section.chapter, chapter)
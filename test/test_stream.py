@@ -0,0 +1,100 @@
+import os
+
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from foliant.meta.cache import ChapterCache
+from foliant.meta.classes import Chapter
+from foliant.meta.generate import get_meta_for_chapter
+from foliant.meta.generate import load_meta
+from foliant.meta.stream import MetaTagFinder
+from foliant.meta.stream import get_main_section_from_file
+
+from .utils import TEST_DATA_PATH
+
+
+class TestMetaTagFinder(TestCase):
+    def feed(self, finder, text):
+        for line in text.splitlines(keepends=True):
+            finder.feed(line)
+        return finder.tag
+
+    def test_multiline_tag(self):
+        finder = MetaTagFinder()
+        text = 'text <<meta>\n<meta\n  field="value">\ncontent\n</meta>\n'
+        self.assertEqual(self.feed(finder, text), '<meta\n  field="value"></meta>')
+
+    def test_search_limit(self):
+        text = 'some text\n<meta field="value"></meta>\n'
+        self.assertIsNone(self.feed(MetaTagFinder(search_limit=10), text))
+        self.assertEqual(self.feed(MetaTagFinder(search_limit=11), text),
+                         '<meta field="value"></meta>')
+
+
+class TestGetMainSectionFromFile(TestCase):
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def assert_same_as_regular(self, filename, meta_search_limit=None):
+        expected = get_meta_for_chapter(filename, meta_search_limit=meta_search_limit)
+        main_section = get_main_section_from_file(filename, meta_search_limit)
+        Chapter(filename=str(filename), name=str(filename), main_section=main_section)
+        self.assertEqual(main_section.to_dict(), expected.main_section.to_dict())
+
+    def test_test_data(self):
+        for name in ('chapter.md', 'chapter_only_meta_tag.md',
+                     'chapter_only_yfm.md', 'empty_chapter.md',
+                     'split_by_headings.md'):
+            with self.subTest(name=name):
+                self.assert_same_as_regular(TEST_DATA_PATH / name)
+                self.assert_same_as_regular(TEST_DATA_PATH / name, 20)
+
+    def test_crlf_and_unicode(self):
+        source = ('---\r\nfield: значение\r\n---\r\n\r\n'
+                  '# Заголовок\r\n\r\n<meta id="one"></meta>\r\n\r\n'
+                  '## Sub\r\n\r\n```\r\n# not a heading\r\n```\r\n\r\n'
+                  '<meta\r\n  field2="value"></meta>\r\n\r\n'
+                  '# Last\r\n\r\nтекст\r\n')
+        filename = os.path.join(self.tmp_dir.name, 'chapter.md')
+        with open(filename, 'w', encoding='utf8', newline='') as f:
+            f.write(source)
+        self.assert_same_as_regular(filename)
+        self.assert_same_as_regular(filename, 5)
+
+    def test_empty_yfm(self):
+        sources = ['---\n\n---\n# Title\n\ntext\n',
+                   '---\n~\n# Heading in YFM\n---\n# Title\n\ntext\n',
+                   '---\n\n---\n<meta field="value"></meta>\n\n# Title\n']
+        filename = os.path.join(self.tmp_dir.name, 'chapter.md')
+        for source in sources:
+            with self.subTest(source=source):
+                with open(filename, 'w', encoding='utf8') as f:
+                    f.write(source)
+                self.assert_same_as_regular(filename)
+        self.assertEqual(get_main_section_from_file(filename).data, {'field': 'value'})
+
+    def test_load_meta_stream_threshold(self):
+        chapters = ['chapter_with_meta.md', 'chapter_without_meta.md']
+        md_root = TEST_DATA_PATH / 'load_meta'
+        expected = load_meta(chapters, md_root)
+        cache = ChapterCache(self.tmp_dir.name, parser_version='1')
+        for _ in range(2):
+            meta = load_meta(chapters, md_root, cache=cache, stream_threshold=0)
+            self.assertEqual(meta.dump(), expected.dump())
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+
+
+class TestGetFileKey(TestCase):
+    def test_same_as_get_key(self):
+        with TemporaryDirectory() as tmp_dir:
+            cache = ChapterCache(tmp_dir, parser_version='1')
+            filename = os.path.join(tmp_dir, 'chapter.md')
+            with open(filename, 'w', encoding='utf8', newline='') as f:
+                f.write('# Заголовок\r\n\r\ntext\n')
+            with open(filename, encoding='utf8', newline='') as f:
+                content = f.read()
+            self.assertEqual(cache.get_file_key(filename, 'opt', block_size=4),
+                             cache.get_key(content, 'opt'))
@@ -1,11 +1,21 @@
+import yaml
+
 from unittest import TestCase
+from unittest.mock import patch
 
+from foliant.meta.tools import IdGenerator
 from foliant.meta.tools import convert_to_id
+from foliant.meta.tools import dump_yaml
+from foliant.meta.tools import get_byte_offsets
 from foliant.meta.tools import get_header_content
 from foliant.meta.tools import get_meta_dict_from_meta_tag
 from foliant.meta.tools import get_meta_dict_from_yfm
 from foliant.meta.tools import iter_chunks
+from foliant.meta.tools import load_option_value
+from foliant.meta.tools import load_yaml
+from foliant.meta.tools import parse_scalar
 from foliant.meta.tools import remove_meta
+from foliant.meta.tools import title_to_slug
 
 
 class TestGetMetaDictFromYfm(TestCase):
@@ -56,6 +66,10 @@ content
                                'subfield2': True}}
         self.assertEqual(get_meta_dict_from_yfm(source), expected)
 
+    def test_yfm_empty(self):
+        self.assertEqual(get_meta_dict_from_yfm('---\n\n---\n# Caption\n'), {})
+        self.assertEqual(get_meta_dict_from_yfm('---\n~\n---\n'), {})
+
     def test_yfm_missing(self):
         source = '''# First caption
 
@@ -127,6 +141,17 @@ Lorem ipsum dolor sit amet, consectetur.
         source = '''Lorem ipsum dolor sit amet.'''
         self.assertIsNone(get_meta_dict_from_meta_tag(source))
 
+    def test_search_limit(self):
+        source = 'Lorem ipsum.\n<meta field="value"></meta>\n'
+        self.assertEqual(get_meta_dict_from_meta_tag(source, search_limit=14),
+                         {'field': 'value'})
+        self.assertIsNone(get_meta_dict_from_meta_tag(source, search_limit=13))
+
+    def test_search_limit_skips_broken_tag(self):
+        source = '<<meta></meta> <meta a="1"></meta>' + ' ' * 100 + '<meta b="2"></meta>'
+        self.assertEqual(get_meta_dict_from_meta_tag(source, search_limit=50),
+                         {'a': 1})
+
     def test_meta_tag_error(self):
         source = '''
 Lorem ipsum dolor sit amet.
@@ -153,6 +178,74 @@ Lorem ipsum dolor sit amet, consectetur.
         self.assertEqual(get_meta_dict_from_meta_tag(source), expected)
 
 
+class TestLoadOptionValue(TestCase):
+    def test_same_as_yaml(self):
+        values = ['true', 'Yes', 'off', 'null', '~', '42', '-0', '0x1F', '010',
+                  '1_000', '3.14', '-1.5e+3', '.inf', '1e5', 'Some title',
+                  'Заголовок', 'a: b', '[1, 2]', '{a: 1}', '2001-12-14',
+                  "it's", ' spaces ', '# comment', 'a #b', '-', '---']
+        for value in values:
+            with self.subTest(value=value):
+                expected = yaml.load(value, yaml.Loader)
+                self.assertEqual(load_option_value(value), expected)
+                self.assertIs(type(load_option_value(value)), type(expected))
+
+    def test_fast_path(self):
+        self.assertIs(parse_scalar('true'), True)
+        self.assertEqual(parse_scalar('42'), 42)
+        self.assertEqual(parse_scalar('Some title'), 'Some title')
+        self.assertIs(parse_scalar('[1, 2]'), NotImplemented)
+        self.assertIs(parse_scalar('0x1F'), NotImplemented)
+
+    def test_mutable_values_are_copied(self):
+        first = load_option_value('[1, 2]')
+        first.append(3)
+        self.assertEqual(load_option_value('[1, 2]'), [1, 2])
+
+
+class TestLoadYaml(TestCase):
+    sources = ['field1: value1\nfield2: [1, 2.5, true]\nfield3:\n  - Заголовок\n',
+               'anchor: &a {x: 1}\nalias: *a\n',
+               'tab:\tvalue\n',
+               'tuple: !!python/tuple [1, 2]\n',
+               'block: |#\n  text\n',
+               'empty_tag: !\nlist: [!, ! x]\n']
+
+    def test_same_as_yaml(self):
+        for source in self.sources:
+            with self.subTest(source=source):
+                try:
+                    expected = yaml.load(source, yaml.Loader)
+                except yaml.YAMLError as e:
+                    with self.assertRaises(e.__class__):
+                        load_yaml(source)
+                else:
+                    self.assertEqual(load_yaml(source), expected)
+
+    def test_pure_python_fallback(self):
+        with patch('foliant.meta.tools.CSafeLoader', None):
+            self.assertEqual(load_yaml(self.sources[0]),
+                             yaml.load(self.sources[0], yaml.Loader))
+
+
+class TestDumpYaml(TestCase):
+    kwargs = {'default_flow_style': False, 'allow_unicode': True, 'sort_keys': False}
+    data = [{'title': 'Заголовок', 'level': 1, 'data': {'list': [1, 2.5, None]}},
+            {'multiline': 'line1\n  line2\tend ' * 10, '': 'empty key'},
+            {'emoji': '\U0001F600', 'tuple': (1, 2)}]
+
+    def test_same_as_yaml(self):
+        for data in self.data:
+            with self.subTest(data=data):
+                self.assertEqual(dump_yaml(data, **self.kwargs),
+                                 yaml.dump(data, **self.kwargs))
+
+    def test_pure_python_fallback(self):
+        with patch('foliant.meta.tools.CSafeDumper', None):
+            self.assertEqual(dump_yaml(self.data[0], **self.kwargs),
+                             yaml.dump(self.data[0], **self.kwargs))
+
+
 class TestGetHeaderContent(TestCase):
     def test_header_present(self):
         source = '''---
@@ -313,6 +406,23 @@ class TestIterChunks(TestCase):
             next(result)
 
 
+class TestGetByteOffsets(TestCase):
+    def test_ascii(self):
+        self.assertEqual(get_byte_offsets('abc\ndef', [0, 4, 7]),
+                         {0: 0, 4: 4, 7: 7})
+
+    def test_unicode_and_crlf(self):
+        raw = 'яя\r\nab\r\n\r\nc\rd'
+        translated = raw.replace('\r\n', '\n').replace('\r', '\n')
+        offsets = range(len(translated) + 1)
+        result = get_byte_offsets(raw, offsets)
+        for offset in offsets:
+            # byte offset points to the same text in the raw source
+            raw_tail = raw.encode('utf8')[result[offset]:].decode('utf8')
+            self.assertEqual(raw_tail.replace('\r\n', '\n').replace('\r', '\n'),
+                             translated[offset:])
+
+
 class TestConvertToId(TestCase):
     def test_spaces(self):
         labels = ['nochange', 'Capital', 'Capital Space', 'trailing ', ' preceding']
@@ -345,6 +455,33 @@ class TestConvertToId(TestCase):
             self.assertIn(added, existing)
 
 
+class TestIdGenerator(TestCase):
+    def test_title_to_slug(self):
+        labels = ['Capital Space', ' preceding', 'Braces (aka parenthesis)', '/slashes/', '']
+        expected_list = ['capital-space', 'preceding', 'braces-aka-parenthesis', 'slashes', '']
+        for label, expected in zip(labels, expected_list):
+            self.assertEqual(title_to_slug(label), expected)
+
+    def test_same_as_convert_to_id(self):
+        existing = ['existing-id', 'existing-2', 'number-1', 'parameters-3']
+        labels = ['existing-id', 'existing', 'existing', 'Number 1',
+                  *['Parameters'] * 5, 'Parameters 2', 'parameters-2']
+        generator = IdGenerator(existing)
+        result = generator.generate_all(labels)
+
+        expected_list = []
+        for label in labels:
+            expected_list.append(convert_to_id(label, existing))
+        self.assertEqual(result, expected_list)
+        self.assertEqual(generator.ids, set(existing))
+
+    def test_added_ids(self):
+        generator = IdGenerator()
+        self.assertEqual(generator.generate('Example'), 'example')
+        generator.add('example-2')
+        self.assertEqual(generator.generate('Example'), 'example-3')
+
+
 class TestRemoveMeta(TestCase):
     def test_no_meta(self):
         source = ('# Title\n\nLorem ipsum dolor sit amet.\n Lorem ipsum dolor sit amet,'
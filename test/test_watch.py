@@ -0,0 +1,76 @@
+import os
+
+from tempfile import TemporaryDirectory
+from threading import Timer
+from time import perf_counter
+from unittest import TestCase
+from unittest import skipIf
+
+from foliant.meta.watch import DEFAULT_SETTLE
+from foliant.meta.watch import ChapterWatcher
+from foliant.meta.watch import Observer
+
+
+class TestChapterWatcher(TestCase):
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.paths = []
+        for name in ('a.md', 'b.md', 'c.md'):
+            path_ = os.path.join(self.tmp_dir.name, name)
+            with open(path_, 'w') as f:
+                f.write('# Title\n')
+            self.paths.append(path_)
+        self.watcher = ChapterWatcher(self.paths, interval=0.01, settle=0.002,
+                                      use_notifications=False)
+
+    def tearDown(self):
+        self.watcher.close()
+        self.tmp_dir.cleanup()
+
+    def touch(self, path_, content, mtime):
+        with open(path_, 'w') as f:
+            f.write(content)
+        os.utime(path_, (mtime, mtime))
+
+    def test_no_changes(self):
+        self.assertEqual(self.watcher.poll(), [])
+
+    def test_changes_in_original_order(self):
+        self.touch(self.paths[2], 'changed', 1)
+        self.touch(self.paths[0], 'changed', 1)
+        self.assertEqual(self.watcher.poll(), [self.paths[0], self.paths[2]])
+        self.assertEqual(self.watcher.poll(), [])
+
+    def test_removed_and_created(self):
+        os.remove(self.paths[1])
+        self.assertEqual(self.watcher.poll(), [self.paths[1]])
+        self.touch(self.paths[1], 'new', 1)
+        self.assertEqual(self.watcher.poll(), [self.paths[1]])
+
+    def test_wait(self):
+        self.touch(self.paths[1], 'changed', 1)
+        self.assertEqual(self.watcher.wait(), [self.paths[1]])
+
+    def test_default_settle(self):
+        watcher = ChapterWatcher(self.paths, use_notifications=False)
+        self.assertEqual(watcher.settle, DEFAULT_SETTLE)
+        self.assertGreaterEqual(watcher.settle, watcher.interval)
+
+    def test_batch(self):
+        self.touch(self.paths[2], 'changed', 1)
+        Timer(0.001, self.touch, (self.paths[0], 'changed', 1)).start()
+        self.watcher.settle = 0.05
+        self.assertEqual(self.watcher.wait(), [self.paths[0], self.paths[2]])
+
+    @skipIf(Observer is None, 'watchdog is not installed')
+    def test_notifications(self):
+        watcher = ChapterWatcher(self.paths, interval=5)
+        try:
+            self.assertTrue(watcher.uses_notifications)
+            Timer(0.05, self.touch, (self.paths[1], 'changed', 1)).start()
+            start = perf_counter()
+            self.assertEqual(watcher.wait(), [self.paths[1]])
+            # the change is noticed without waiting for the polling interval
+            self.assertLess(perf_counter() - start, 4)
+        finally:
+            watcher.close()